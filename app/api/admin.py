@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Query
+from typing import Optional
+import logging
+
+from app.schemas.admin import CacheStats, CacheInvalidation, SlowQueryReport
+from app.utils.cache import response_cache
+from app.utils.metrics import TimedRoute
+from app.utils.slow_queries import slow_query_log
+
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    route_class=TimedRoute
+)
+
+# Initialize a logger for this module
+logger = logging.getLogger("app.api.admin")
+
+
+@router.get("/cache", response_model=CacheStats)
+async def get_cache_stats():
+    """
+    Retrieve the size of the response cache and its hit, miss and eviction counters per endpoint.
+
+    Returns:
+        CacheStats: The state of the response cache.
+    """
+    return CacheStats(**response_cache.stats())
+
+
+@router.post("/cache/invalidate", response_model=CacheInvalidation)
+async def invalidate_cache(
+        endpoint: Optional[str] = Query(None, description="Only drop the cached results of this endpoint")
+):
+    """
+    Drop cached results, e.g. after the database was restored from a backup.
+
+    Invalidating every endpoint bumps the data version of the cache.
+
+    Args:
+        endpoint (Optional[str]): The endpoint whose results are dropped; all endpoints when omitted.
+
+    Returns:
+        CacheInvalidation: The new data version and the number of dropped results.
+    """
+    logger.info(f"Invalidating cached results of {endpoint or 'all endpoints'}")
+    invalidated = response_cache.invalidate(endpoint)
+    return CacheInvalidation(data_version=response_cache.data_version, invalidated=invalidated)
+
+
+@router.get("/slow_queries", response_model=SlowQueryReport)
+async def get_slow_queries(
+        limit: int = Query(10, ge=1, le=100, description="Number of slowest executions to return")
+):
+    """
+    List the queries that ran past the slow-query threshold since startup, worst first.
+
+    The full records, plans included, are also written to the slow-query log file.
+
+    Args:
+        limit (int): The number of slowest executions to return.
+
+    Returns:
+        SlowQueryReport: The per-query aggregates and the slowest executions.
+    """
+    return SlowQueryReport(
+        threshold_ms=slow_query_log.threshold_ms if slow_query_log.enabled else 0,
+        queries=slow_query_log.stats(),
+        slowest=slow_query_log.worst(limit)
+    )
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Response
+import logging
+
+from app.db.session import check_readiness
+from app.schemas.health import Readiness
+
+
+router = APIRouter(
+    tags=["Health"]
+)
+
+# Initialize a logger for this module
+logger = logging.getLogger("app.api.health")
+
+
+@router.get("/ready", response_model=Readiness, responses={503: {"model": Readiness}})
+async def get_readiness(response: Response):
+    """
+    Readiness probe: whether the database connection pool is open and the primary answers.
+
+    `/` only tells that the process is up; a load balancer should send traffic once this probe succeeds,
+    i.e. after the startup pre-warmed `DB_POOL_MIN_SIZE` connections, and stop while the database is down.
+
+    Returns:
+        Readiness: The readiness of the application, with status 503 when it is not ready.
+    """
+    readiness = await check_readiness()
+    if not readiness["ready"]:
+        logger.warning(f"Not ready: {readiness['error']}")
+        response.status_code = 503
+    return Readiness(**readiness)
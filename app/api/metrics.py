@@ -0,0 +1,40 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+import logging
+
+from app.db import session
+from app.utils.admission import admission
+from app.utils.cache import response_cache
+from app.utils.metrics import render_metrics
+
+
+router = APIRouter(
+    tags=["Health"]
+)
+
+# Initialize a logger for this module
+logger = logging.getLogger("app.api.metrics")
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Expose the request, phase, row, error, pool, admission and cache metrics in the Prometheus text format.
+
+    The phase latencies split each request into pool acquire, query execute, fetch, model construction
+    (or fast JSON encoding) and response serialization, per route.
+
+    Returns:
+        PlainTextResponse: The metrics in the Prometheus text exposition format.
+    """
+    pool_router = session.pool_router
+    members = pool_router.members if pool_router is not None else []
+    pool_stats = {member.name: member.pool.get_stats() for member in members}
+    replica_states = {member.name: (member.healthy, member.lag) for member in members if not member.is_primary}
+    content = render_metrics(
+        pool_stats, session.DB_POOL_MAX_SIZE, response_cache.stats(), replica_states, admission.stats()
+    )
+    return PlainTextResponse(content, media_type=PROMETHEUS_CONTENT_TYPE)
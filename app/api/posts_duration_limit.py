@@ -1,16 +1,20 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
-import psycopg2.extras
+from fastapi import APIRouter, HTTPException, Query, Response
+from typing import List, Optional
+import psycopg
 import logging
 
-from app.db.session import get_db_connection, release_db_connection
+from app.db.session import run_with_connection
 from app.schemas.posts import DurationLimit
 from app.services.posts_duration_limit import get_posts_duration_limit_service
+from app.utils.cache import response_cache
+from app.utils.metrics import TimedRoute
+from app.utils.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
 
 
 router = APIRouter(
     prefix="/v2",
-    tags=["Posts"]
+    tags=["Posts"],
+    route_class=TimedRoute
 )
 
 # Initialize a logger for this module
@@ -18,9 +22,11 @@ logger = logging.getLogger("app.api.posts")
 
 
 @router.get("/posts/q1/", response_model=List[DurationLimit])
-def get_posts_duration_limit(
-    duration: float = Query(..., ge=0.0, description="Maximum duration in minutes a post was open"),
-    limit: int = Query(..., ge=1, le=100, description="Number of posts to return")
+async def get_posts_duration_limit(
+        response: Response,
+        duration: float = Query(..., ge=0.0, description="Maximum duration in minutes a post was open"),
+        limit: int = Query(..., ge=1, le=100, description="Number of posts to return"),
+        cursor: Optional[str] = Query(None, description="Token from the X-Next-Cursor header")
 ):
     """
     Retrieve a list of the most recently resolved posts that were open for a maximum duration.
@@ -31,36 +37,42 @@ def get_posts_duration_limit(
     Args:
         duration (float): Maximum duration in minutes a post was open.
         limit (int): Number of posts to return.
+        cursor (Optional[str]): Continuation token returned with the previous page.
 
     Returns:
         List[DurationLimit]: A list of recently resolved posts matching the criteria.
 
     Raises:
         HTTPException:
+            - 400: If the cursor is invalid.
             - 404: If no posts match the criteria.
             - 500: If an internal server error occurs.
+            - 503: If no database connection could be obtained in time.
+            - 504: If the query runs past the latency budget of the route.
     """
     logger.info(f"Fetching {limit} most recently resolved posts with duration <= {duration} minutes")
-    connection = get_db_connection()
     try:
-        # Fetch recent resolved posts using the service
-        recent_posts = get_posts_duration_limit_service(connection, duration, limit)
+        after = decode_cursor(cursor, descending=True)
+    except ValueError as e:
+        logger.warning(e)
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    try:
+        # Fetch recent resolved posts using the service, answered from the response cache when possible
+        recent_posts = await response_cache.get_or_load(
+            "posts_duration_limit", {"duration": duration, "limit": limit, "cursor": cursor},
+            lambda: run_with_connection(get_posts_duration_limit_service, duration, limit, after)
+        )
         if not recent_posts:
             logger.warning(f"No resolved posts found with duration <= {duration} minutes")
             raise HTTPException(status_code=404, detail="No resolved posts found matching the criteria.")
+        if len(recent_posts) == limit:
+            last = recent_posts[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.closeddate, last.id)
         logger.info(f"Retrieved {len(recent_posts)} posts")
         return recent_posts
 
-    except psycopg2.Error as e:
+    except psycopg.Error as e:
         # Log the database error and raise a 500 Internal Server Error
         logger.error(f"Database error while fetching recent resolved posts: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    except FileNotFoundError as e:
-        # Log the file not found error and raise a 500 Internal Server Error
-        logger.error(f"SQL query file not found: {e}")
-        raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    finally:
-        # Ensure the connection is released back to the pool
-        release_db_connection(connection)
@@ -1,16 +1,21 @@
-from fastapi import APIRouter, HTTPException, Path, Query
-from typing import List
-import psycopg2.extras
+from fastapi import APIRouter, HTTPException, Path, Query, Response
+from typing import List, Optional
+import psycopg
 import logging
 
-from app.db.session import get_db_connection, release_db_connection
+from app.db.session import run_with_connection
 from app.schemas.posts import IdLimit
-from app.services.posts_id_limit import get_posts_id_limit_service
+from app.services.posts_id_limit import get_posts_id_limit_service, get_posts_id_limit_json_service
+from app.utils.cache import response_cache
+from app.utils.fast_json import fast_json_enabled
+from app.utils.metrics import TimedRoute
+from app.utils.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
 
 
 router = APIRouter(
     prefix="/v2",
-    tags=["Posts"]
+    tags=["Posts"],
+    route_class=TimedRoute
 )
 
 # Initialize a logger for this module
@@ -18,48 +23,63 @@ logger = logging.getLogger("app.api.posts")
 
 
 @router.get("/posts/{post_id}", response_model=List[IdLimit])
-def get_posts(
+async def get_posts(
+        response: Response,
         post_id: int = Path(..., description="Starting thread post id"),
         limit: int = Query(1, ge=1, le=100, description="Number of posts to return"),
+        max_depth: Optional[int] = Query(None, ge=1, description="Maximum level of the posts, 1 is the starting post"),
+        cursor: Optional[str] = Query(None, description="Token from the X-Next-Cursor header"),
 ):
     """
     Retrieve a post within a thread, starting from a specific post and including all its descendant posts.
 
     The details of each post in the thread, including its hierarchical level for reconstructing the thread structure.
+    The thread is read from the precomputed post_thread closure table in creation order.
 
     Args:
         post_id (int): The post id starting the thread.
         limit (int): Maximum number of posts to return.
+        max_depth (Optional[int]): Maximum level of the returned posts, the whole thread when omitted.
+        cursor (Optional[str]): Continuation token returned with the previous page.
 
     Returns:
         List[IdLimit]: A thread of posts.
 
     Raises:
         HTTPException:
+            - 400: If the cursor is invalid.
             - 404: If no thread exists.
             - 500: If an internal server error occurs.
+            - 503: If no database connection could be obtained in time.
+            - 504: If the query runs past the latency budget of the route.
     """
     logger.info(f"Fetching post with {post_id}")
-    connection = get_db_connection()
     try:
-        # Fetch posts with tags using the service function
-        posts = get_posts_id_limit_service(connection, post_id, limit)
+        after = decode_cursor(cursor, descending=False)
+    except ValueError as e:
+        logger.warning(e)
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    try:
+        # Rows are encoded straight to JSON by the service when the fast JSON path is enabled
+        fast_json = fast_json_enabled("posts_id_limit")
+        service = get_posts_id_limit_json_service if fast_json else get_posts_id_limit_service
+        # Fetch posts with tags using the service function, answered from the response cache when possible
+        posts = await response_cache.get_or_load(
+            "posts_id_limit",
+            {"post_id": post_id, "limit": limit, "max_depth": max_depth, "cursor": cursor, "fast_json": fast_json},
+            lambda: run_with_connection(service, post_id, limit, after, max_depth)
+        )
         if not posts:
             logger.warning(f"No thread found matching starting post id '{post_id}'.")
             raise HTTPException(status_code=404, detail="No thread found.")
+        if len(posts) == limit:
+            last = posts.last if fast_json else posts[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.creationdate, last.id)
         logger.info(f"Retrieved {len(posts)} posts")
-        return posts
+        return posts.response(response) if fast_json else posts
 
-    except psycopg2.Error as e:
+    except psycopg.Error as e:
         # Log the database error and raise a 500 Internal Server Error
         logger.error(f"Database error while fetching posts: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    except FileNotFoundError as e:
-        # Log the file not found error and raise a 500 Internal Server Error
-        logger.error(f"SQL query file not found: {e}")
-        raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    finally:
-        # Ensure the connection is released back to the pool
-        release_db_connection(connection)
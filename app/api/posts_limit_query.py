@@ -1,16 +1,21 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
-import psycopg2.extras
+from fastapi import APIRouter, HTTPException, Query, Response
+from typing import List, Optional
+import psycopg
 import logging
 
-from app.db.session import get_db_connection, release_db_connection
-from app.schemas.posts import LimitQuery
-from app.services.posts_limit_query import get_posts_limit_query_service
+from app.db.session import run_with_connection
+from app.schemas.posts import LimitQuery, SearchMode
+from app.services.posts_limit_query import get_posts_limit_query_service, get_posts_limit_query_json_service
+from app.utils.cache import response_cache
+from app.utils.fast_json import fast_json_enabled
+from app.utils.metrics import TimedRoute
+from app.utils.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
 
 
 router = APIRouter(
     prefix="/v2",
-    tags=["Posts"]
+    tags=["Posts"],
+    route_class=TimedRoute
 )
 
 # Initialize a logger for this module
@@ -18,46 +23,64 @@ logger = logging.getLogger("app.api.posts")
 
 
 @router.get("/posts/q2/", response_model=List[LimitQuery])
-def get_posts(
+async def get_posts(
+        response: Response,
         limit: int = Query(10, ge=1, le=100, description="Number of posts to return"),
-        query: str = Query("", description="Search query for filtering posts by title or body")
+        cursor: Optional[str] = Query(None, description="Token from the X-Next-Cursor header"),
+        query: str = Query("", description="Search query for filtering posts by title or body"),
+        mode: SearchMode = Query(SearchMode.substring, description="Search mode: substring, fulltext or ranked")
 ):
     """
     Retrieve a list of posts ordered from newest to oldest, including associated tags.
 
+    The `ranked` search mode orders the posts by relevance to the query instead and is not paginated.
+
     Args:
         limit (int): Number of posts to return (1-100).
+        cursor (Optional[str]): Continuation token returned with the previous page.
         query (str): Search query to filter posts by title or body.
+        mode (SearchMode): Substring match, full-text match or full-text match ranked by relevance.
 
     Returns:
         List[PostWithTags]: A list of posts with associated tags matching the criteria.
 
     Raises:
         HTTPException:
+            - 400: If the cursor is invalid or given with the ranked search mode.
             - 404: If no posts match the criteria.
             - 500: If an internal server error occurs.
+            - 503: If no database connection could be obtained in time.
+            - 504: If the query runs past the latency budget of the route.
     """
-    logger.info(f"Fetching {limit} most recent posts with query '{query}'")
-    connection = get_db_connection()
+    logger.info(f"Fetching {limit} most recent posts with {mode.value} query '{query}'")
+    if cursor is not None and mode == SearchMode.ranked:
+        raise HTTPException(status_code=400, detail="Ranked search results are not paginated.")
+    try:
+        after = decode_cursor(cursor, descending=True)
+    except ValueError as e:
+        logger.warning(e)
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
     try:
-        # Fetch posts with tags using the service function
-        posts = get_posts_limit_query_service(connection, query, limit)
+        # Rows are encoded straight to JSON by the service when the fast JSON path is enabled
+        fast_json = fast_json_enabled("posts_limit_query")
+        service = get_posts_limit_query_json_service if fast_json else get_posts_limit_query_service
+        # Fetch posts with tags using the service function, answered from the response cache when possible
+        posts = await response_cache.get_or_load(
+            "posts_limit_query",
+            {"query": query, "limit": limit, "mode": mode, "cursor": cursor, "fast_json": fast_json},
+            lambda: run_with_connection(service, query, limit, mode, after)
+        )
         if not posts:
             logger.warning(f"No posts found matching query '{query}' with limit {limit}")
             raise HTTPException(status_code=404, detail="No posts found matching the criteria.")
+        if len(posts) == limit and mode != SearchMode.ranked:
+            last = posts.last if fast_json else posts[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.creationdate, last.id)
         logger.info(f"Retrieved {len(posts)} posts")
-        return posts
+        return posts.response(response) if fast_json else posts
 
-    except psycopg2.Error as e:
+    except psycopg.Error as e:
         # Log the database error and raise a 500 Internal Server Error
         logger.error(f"Database error while fetching posts: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    except FileNotFoundError as e:
-        # Log the file not found error and raise a 500 Internal Server Error
-        logger.error(f"SQL query file not found: {e}")
-        raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    finally:
-        # Ensure the connection is released back to the pool
-        release_db_connection(connection)
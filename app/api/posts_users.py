@@ -1,32 +1,89 @@
-from fastapi import APIRouter, HTTPException, Path
-from typing import List
-import psycopg2.extras
+from fastapi import APIRouter, Header, HTTPException, Path, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import psycopg
 import logging
 
-from app.db.session import get_db_connection, release_db_connection
-from app.schemas.posts import Users
-from app.services.posts_users import get_posts_users_service
+from app.db.session import run_with_connection
+from app.schemas.posts import PostUsers, Users
+from app.services.posts_users import (
+    get_posts_users_service, get_posts_users_batch_service, stream_posts_users_service
+)
+from app.utils.batch import BATCH_MAX_IDS, parse_batch_ids
+from app.utils.cache import response_cache
+from app.utils.metrics import TimedRoute
+from app.utils.streaming import STREAM_RESPONSES, negotiate_stream_format
 
 
 router = APIRouter(
     prefix="/v2",
-    tags=["Posts"]
+    tags=["Posts"],
+    route_class=TimedRoute
 )
 
 # Initialize a logger for this module
 logger = logging.getLogger("app.api.posts_users")
 
 
-@router.get("/posts/{post_id}/users", response_model=List[Users])
-def get_posts_users(post_id: int = Path(..., ge=1, description="The ID of the post")):
+@router.get("/posts/users", response_model=List[PostUsers])
+async def get_posts_users_batch(
+    ids: str = Query(..., description=f"Comma separated IDs of the posts, at most {BATCH_MAX_IDS}"),
+):
+    """
+    Retrieve the discussants of several posts with a single query.
+
+    Each post of the batch lists its users as `/v2/posts/{post_id}/users` does; posts without
+    comments have an empty list. Duplicate ids are returned once.
+
+    Args:
+        ids (str): The comma separated unique identifiers of the posts.
+
+    Returns:
+        List[PostUsers]: The discussants of each post, in the order of the requested ids.
+
+    Raises:
+        HTTPException:
+            - 400 if the ids are malformed or more than the batch size limit.
+            - 500 if an internal server error occurs.
+    """
+    try:
+        post_ids = parse_batch_ids(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    logger.info(f"Fetching users for {len(post_ids)} posts.")
+    try:
+        # Execute the batch service function, answered from the response cache when possible
+        posts = await response_cache.get_or_load(
+            "posts_users_batch", {"post_ids": post_ids},
+            lambda: run_with_connection(get_posts_users_batch_service, post_ids)
+        )
+        logger.info(f"Retrieved users for {len(posts)} posts")
+        return posts
+
+    except psycopg.Error as e:
+        # Log the database error and raise a 500 Internal Server Error
+        logger.error(f"Database error while fetching users for post IDs {post_ids}: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+@router.get("/posts/{post_id}/users", response_model=List[Users], responses=STREAM_RESPONSES)
+async def get_posts_users(
+    post_id: int = Path(..., ge=1, description="The ID of the post"),
+    accept: Optional[str] = Header(None, description="`application/x-ndjson` or `text/csv` streams the rows"),
+):
     """
     Retrieve a list of all discussants (users who have commented) on a specific post.
 
     The users are sorted by the time of their most recent comment on the post,
     starting with the newest and ending with the oldest.
 
+    With `Accept: application/x-ndjson` or `text/csv` the rows are streamed from a server-side cursor
+    instead of being returned as a JSON array.
+
     Args:
         post_id (int): The unique identifier of the post.
+        accept (Optional[str]): The Accept header, selecting a streamed NDJSON or CSV response.
 
     Returns:
         List[Users]: A list of Users schemas representing the users.
@@ -37,26 +94,28 @@ def get_posts_users(post_id: int = Path(..., ge=1, description="The ID of the po
             - 500 if an internal server error occurs.
     """
     logger.info(f"Fetching friends for user ID: {post_id}.")
-    connection = get_db_connection()
     try:
-        # Execute the service function to get friends
-        posts = get_posts_users_service(connection, post_id)
+        media_type = negotiate_stream_format(accept)
+        if media_type is not None:
+            # Stream the rows straight from a server-side cursor, bypassing the response cache
+            stream = await stream_posts_users_service(post_id, media_type)
+            if stream is None:
+                logger.warning(f"No users found for post ID: {post_id}")
+                raise HTTPException(status_code=404, detail="No users found for post ID.")
+            return StreamingResponse(stream, media_type=media_type)
+
+        # Execute the service function to get friends, answered from the response cache when possible
+        posts = await response_cache.get_or_load(
+            "posts_users", {"post_id": post_id},
+            lambda: run_with_connection(get_posts_users_service, post_id)
+        )
         if not posts:
             logger.warning(f"No users found for post ID: {post_id}")
             raise HTTPException(status_code=404, detail="No users found for post ID.")
         logger.info(f"Retrieved {len(posts)} users for post ID: {post_id}")
         return posts
 
-    except psycopg2.Error as e:
+    except psycopg.Error as e:
         # Log the database error and raise a 500 Internal Server Error
         logger.error(f"Database error while fetching users for post ID {post_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    except FileNotFoundError as e:
-        # Log the file not found error and raise a 500 Internal Server Error
-        logger.error(e)
-        raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    finally:
-        # Ensure the connection is released back to the pool
-        release_db_connection(connection)
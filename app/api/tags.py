@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Query
+from typing import List
+import logging
+
+from app.schemas.tags import TagEntry
+from app.services.tag_dictionary import tag_dictionary
+from app.utils.metrics import TimedRoute
+
+
+router = APIRouter(
+    prefix="/v2",
+    tags=["Tags"],
+    route_class=TimedRoute
+)
+
+# Initialize a logger for this module
+logger = logging.getLogger("app.api.tags")
+
+
+@router.get("/tags", response_model=List[TagEntry])
+async def get_tags(
+        prefix: str = Query(..., min_length=1, max_length=100, description="Beginning of the tag name"),
+        limit: int = Query(10, ge=1, le=100, description="Number of tags to return"),
+):
+    """
+    Autocomplete a tag name from the in-process tag dictionary, without querying the database.
+
+    Args:
+        prefix (str): The beginning of the tag name, matched case-insensitively.
+        limit (int): The maximum number of tags to return.
+
+    Returns:
+        List[TagEntry]: The tags starting with the prefix in name order, empty when none matches.
+    """
+    tags = tag_dictionary.complete(prefix, limit)
+    logger.debug(f"Completed tag prefix '{prefix}' with {len(tags)} tags")
+    return tags
@@ -1,25 +1,35 @@
-from fastapi import APIRouter, HTTPException, Path, Query
-from typing import List
-import psycopg2.extras
+from fastapi import APIRouter, Header, HTTPException, Path, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import psycopg
 import logging
 
-from app.db.session import get_db_connection, release_db_connection
+from app.db.session import run_with_connection
 from app.schemas.tags import CommentsCount
-from app.services.tags_comments_count import get_tags_comments_count_service
+from app.services.tag_dictionary import tag_dictionary
+from app.services.tags_comments_count import (
+    get_tags_comments_count_service, get_tags_comments_count_snapshot_service, stream_tags_comments_count_service
+)
+from app.services.tags_snapshot import snapshot_backend
+from app.utils.cache import response_cache
+from app.utils.metrics import TimedRoute
+from app.utils.streaming import STREAM_RESPONSES, negotiate_stream_format
 
 
 router = APIRouter(
     prefix="/v2",
-    tags=["Tags"]
+    tags=["Tags"],
+    route_class=TimedRoute
 )
 
 # Initialize a logger for this module
 logger = logging.getLogger("app.api.tags_comments_count")
 
-@router.get("/tags/{tag_name}/comments/", response_model=List[CommentsCount])
-def get_tags_stats(
+@router.get("/tags/{tag_name}/comments/", response_model=List[CommentsCount], responses=STREAM_RESPONSES)
+async def get_tags_stats(
         tag_name: str = Path(..., description="The name of the tag"),
         comments_count: int = Query(1, ge=1, le=100, description="Number of posts to return"),
+        accept: Optional[str] = Header(None, description="`application/x-ndjson` or `text/csv` streams the rows"),
 ):
     """
     Retrieve the response time statistics between comments on a specific post.
@@ -28,9 +38,14 @@ def get_tags_stats(
     consecutive comments, and the cumulative average response time as more
     comments are added.
 
+    With `Accept: application/x-ndjson` or `text/csv` the rows are streamed from a server-side cursor
+    instead of being returned as a JSON array. With `TAGS_ANALYTICS_BACKEND=snapshot` the statistics are
+    computed from the columnar snapshot instead of the database.
+
     Args:
         tag_name (str): The name of the tag to analyze.
         comments_count (int): The number of posts to return.
+        accept (Optional[str]): The Accept header, selecting a streamed NDJSON or CSV response.
 
     Returns:
         List[CommentsCount]: A list of TagStats objects representing each day of the week.
@@ -39,12 +54,34 @@ def get_tags_stats(
         HTTPException:
             - 404: If no statistics are found for the specified tag.
             - 500: If an internal server error occurs.
+            - 503: If no database connection could be obtained in time.
+            - 504: If the query runs past the latency budget of the route.
     """
     logger.info(f"Fetching post comments' statistics for tag: {tag_name} with more than {comments_count} comments.")
-    connection = get_db_connection()
+    tag_ids = tag_dictionary.resolve(tag_name)
+    if not tag_ids:
+        logger.warning(f"Unknown tag: {tag_name}")
+        raise HTTPException(status_code=404, detail="No statistics found for the specified tag.")
+
     try:
-        # Fetch tag statistics using the service
-        tag_stats = get_tags_comments_count_service(connection, tag_name, comments_count)
+        snapshot = snapshot_backend()
+        media_type = negotiate_stream_format(accept)
+        if media_type is not None:
+            # Stream the rows straight from a server-side cursor, bypassing the response cache
+            stream = await stream_tags_comments_count_service(tag_ids, comments_count, media_type, snapshot)
+            if stream is None:
+                logger.warning(f"No statistics found for the post with tag: {tag_name}"
+                               f" with more than {comments_count} comments.")
+                raise HTTPException(status_code=404, detail="No statistics found for the specified tag.")
+            return StreamingResponse(stream, media_type=media_type)
+
+        # Fetch tag statistics using the service, answered from the response cache when possible
+        tag_stats = await response_cache.get_or_load(
+            "tags_comments_count", {"tag_ids": tag_ids, "comments_count": comments_count},
+            lambda: get_tags_comments_count_snapshot_service(snapshot, tag_ids, comments_count)
+            if snapshot is not None
+            else run_with_connection(get_tags_comments_count_service, tag_ids, comments_count)
+        )
         if not tag_stats:
             logger.warning(f"No statistics found for the post with tag: {tag_name}"
                            f" with more than {comments_count} comments.")
@@ -53,16 +90,7 @@ def get_tags_stats(
                     f" with more than {comments_count} comments.")
         return tag_stats
 
-    except psycopg2.Error as e:
+    except psycopg.Error as e:
         # Log the database error and raise a 500 Internal Server Error
         logger.error(f"Database error while fetching stats for the post with tag '{tag_name}': {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    except FileNotFoundError as e:
-        # Log the file not found error and raise a 500 Internal Server Error
-        logger.error(e)
-        raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    finally:
-        # Ensure the connection is released back to the pool
-        release_db_connection(connection)
@@ -1,26 +1,33 @@
-from fastapi import APIRouter, HTTPException, Path, Query
-from typing import List
-import psycopg2.extras
+from fastapi import APIRouter, HTTPException, Path, Query, Response
+from typing import List, Optional
+import psycopg
 import logging
 
-from app.db.session import get_db_connection, release_db_connection
+from app.db.session import run_with_connection
 from app.schemas.tags import CommentsPosLim
-from app.services.tags_comments_count import get_tags_comments_count_service
-from app.services.tags_comments_pos_lim import get_tags_comments_pos_lim_service
+from app.services.tag_dictionary import tag_dictionary
+from app.services.tags_comments_pos_lim import get_tags_comments_pos_lim_service, get_tags_comments_pos_lim_json_service
+from app.utils.cache import response_cache
+from app.utils.fast_json import fast_json_enabled
+from app.utils.metrics import TimedRoute
+from app.utils.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
 
 router = APIRouter(
     prefix="/v2",
-    tags=["Tags"]
+    tags=["Tags"],
+    route_class=TimedRoute
 )
 
 # Initialize a logger for this module
 logger = logging.getLogger("app.api.tags_comments_pos_lim")
 
 @router.get("/tags/{tag_name}/comments/{position}", response_model=List[CommentsPosLim])
-def get_tags_comments_pos_lim(
+async def get_tags_comments_pos_lim(
+        response: Response,
         tag_name: str = Path(..., description="The name of the tag"),
         position: int = Path(..., description="Position of the comment"),
         limit: int = Query(1, ge=1, le=100, description="Number of comments"),
+        cursor: Optional[str] = Query(None, description="Token from the X-Next-Cursor header"),
 ):
     """
     Retrieve the comment at a specific position within posts that are tagged with a given tag.
@@ -32,36 +39,51 @@ def get_tags_comments_pos_lim(
         tag_name (str): The name of the tag to analyze.
         position (int): The position of the comment.
         limit (int): The maximum number of comments to return.
+        cursor (Optional[str]): Continuation token returned with the previous page.
 
     Returns:
         List[CommentsPosLim]: A list of CommentsPosLim objects representing comments.
 
     Raises:
         HTTPException:
+            - 400: If the cursor is invalid.
             - 404: If no comments are found for the specified tag.
             - 500: If an internal server error occurs.
+            - 503: If no database connection could be obtained in time.
+            - 504: If the query runs past the latency budget of the route.
     """
     logger.info(f"Fetching comments for tag: {tag_name} at the position {position}.")
-    connection = get_db_connection()
     try:
-        # Fetch tag statistics using the service
-        comments = get_tags_comments_pos_lim_service(connection, tag_name, position, limit)
+        after = decode_cursor(cursor, descending=False)
+    except ValueError as e:
+        logger.warning(e)
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    tag_ids = tag_dictionary.resolve(tag_name)
+    if not tag_ids:
+        logger.warning(f"Unknown tag: {tag_name}")
+        raise HTTPException(status_code=404, detail="No comments found for the specified tag.")
+
+    try:
+        # Rows are encoded straight to JSON by the service when the fast JSON path is enabled
+        fast_json = fast_json_enabled("tags_comments_pos_lim")
+        service = get_tags_comments_pos_lim_json_service if fast_json else get_tags_comments_pos_lim_service
+        # Fetch tag statistics using the service, answered from the response cache when possible
+        comments = await response_cache.get_or_load(
+            "tags_comments_pos_lim",
+            {"tag_ids": tag_ids, "position": position, "limit": limit, "cursor": cursor, "fast_json": fast_json},
+            lambda: run_with_connection(service, tag_ids, position, limit, after)
+        )
         if not comments:
             logger.warning(f"No comments with tag: {tag_name} at the position {position}.")
             raise HTTPException(status_code=404, detail="No comments found for the specified tag.")
+        if len(comments) == limit:
+            last = comments.last if fast_json else comments[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.creationdate, last.comment_id)
         logger.info(f"Retrieved comments with tag: {tag_name} at the position {position}.")
-        return comments
+        return comments.response(response) if fast_json else comments
 
-    except psycopg2.Error as e:
+    except psycopg.Error as e:
         # Log the database error and raise a 500 Internal Server Error
         logger.error(f"Database error while fetching comments with tag '{tag_name}': {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    except FileNotFoundError as e:
-        # Log the file not found error and raise a 500 Internal Server Error
-        logger.error(e)
-        raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    finally:
-        # Ensure the connection is released back to the pool
-        release_db_connection(connection)
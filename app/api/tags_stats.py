@@ -1,28 +1,39 @@
-from fastapi import APIRouter, HTTPException, Path
+from fastapi import APIRouter, HTTPException, Path, Response
+from datetime import timezone
+from email.utils import format_datetime
 from typing import List
-import psycopg2.extras
+import psycopg
 import logging
 
-from app.db.session import get_db_connection, release_db_connection
+from app.db.session import run_with_connection
 from app.schemas.tags import Stats
-from app.services.tags_stats import get_tags_stats_service
+from app.services.tag_dictionary import tag_dictionary
+from app.services.tags_snapshot import snapshot_backend
+from app.services.tags_stats import get_tags_stats_service, get_tags_stats_snapshot_service
+from app.utils.cache import response_cache
+from app.utils.metrics import TimedRoute
 
 
 router = APIRouter(
     prefix="/v2",
-    tags=["Tags"]
+    tags=["Tags"],
+    route_class=TimedRoute
 )
 
 # Initialize a logger for this module
 logger = logging.getLogger("app.api.tags_stats")
 
 @router.get("/tags/{tag_name}/stats", response_model=List[Stats])
-def get_tags_stats(tag_name: str = Path(..., description="The name of the tag")):
+async def get_tags_stats(response: Response, tag_name: str = Path(..., description="The name of the tag")):
     """
     Retrieve the percentage of posts with a particular tag for each day of the week.
 
     The percentage is calculated as the number of posts with the specified tag divided by the total number of posts
     published on each day of the week, presented on a scale of 0 - 100 and rounded to two decimal places.
+    The statistics come from a precomputed summary, or are computed from the columnar snapshot with
+    `TAGS_ANALYTICS_BACKEND=snapshot`; the `Last-Modified` header tells when it was last refreshed or exported.
+    The tag name is matched by the in-process tag dictionary as an ILIKE pattern (ignoring case, with the
+    `%` and `_` wildcards); a name matching no tag is answered without querying the database.
 
     Args:
         tag_name (str): The name of the tag to analyze.
@@ -34,28 +45,32 @@ def get_tags_stats(tag_name: str = Path(..., description="The name of the tag"))
         HTTPException:
             - 404: If no statistics are found for the specified tag.
             - 500: If an internal server error occurs.
+            - 503: If no database connection could be obtained in time.
+            - 504: If the query runs past the latency budget of the route.
     """
     logger.info(f"Fetching tag statistics for tag: {tag_name}")
-    connection = get_db_connection()
+    tag_ids = tag_dictionary.resolve_pattern(tag_name)
+    if not tag_ids:
+        logger.warning(f"Unknown tag: {tag_name}")
+        raise HTTPException(status_code=404, detail="No statistics found for the specified tag.")
+
     try:
-        # Fetch tag statistics using the service
-        tag_stats = get_tags_stats_service(connection, tag_name)
+        # Fetch tag statistics using the service, answered from the response cache when possible
+        snapshot = snapshot_backend()
+        tag_stats, refreshed_at = await response_cache.get_or_load(
+            "tags_stats", {"tag_ids": tag_ids},
+            lambda: get_tags_stats_snapshot_service(snapshot, tag_ids) if snapshot is not None
+            else run_with_connection(get_tags_stats_service, tag_ids)
+        )
         if not tag_stats:
             logger.warning(f"No statistics found for tag: {tag_name}")
             raise HTTPException(status_code=404, detail="No statistics found for the specified tag.")
+        if refreshed_at is not None:
+            response.headers["Last-Modified"] = format_datetime(refreshed_at.astimezone(timezone.utc), usegmt=True)
         logger.info(f"Retrieved statistics for tag: {tag_name}")
         return tag_stats
 
-    except psycopg2.Error as e:
+    except psycopg.Error as e:
         # Log the database error and raise a 500 Internal Server Error
         logger.error(f"Database error while fetching stats for tag '{tag_name}': {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    except FileNotFoundError as e:
-        # Log the file not found error and raise a 500 Internal Server Error
-        logger.error(e)
-        raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    finally:
-        # Ensure the connection is released back to the pool
-        release_db_connection(connection)
@@ -1,63 +1,136 @@
-from fastapi import APIRouter, HTTPException, Path
-from typing import List
-import psycopg2.extras
+from fastapi import APIRouter, Header, HTTPException, Path, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import psycopg
 import logging
 
-from app.db.session import get_db_connection, release_db_connection
-from app.schemas.users import Friends
-from app.services.users_friends import get_users_friends_service
+from app.db.session import run_with_connection
+from app.schemas.users import Friends, UserFriends, UserIds
+from app.services.users_friends import (
+    get_users_friends_service, get_users_friends_batch_service, stream_users_friends_service
+)
+from app.utils.batch import check_batch_ids
+from app.utils.cache import response_cache
+from app.utils.metrics import TimedRoute
+from app.utils.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.utils.streaming import STREAM_RESPONSES, negotiate_stream_format
 
 # Initialize the APIRouter with a prefix and tags
 router = APIRouter(
     prefix="/v2",
-    tags=["Users"]
+    tags=["Users"],
+    route_class=TimedRoute
 )
 
 # Initialize a logger for this module
 logger = logging.getLogger("app.api.users_friends")
 
-@router.get("/users/{user_id}/friends", response_model=List[Friends])
-def get_users_friends(
-    user_id: int = Path(..., ge=1, description="The ID of the user"),
+@router.get("/users/{user_id}/friends", response_model=List[Friends], responses=STREAM_RESPONSES)
+async def get_users_friends(
+        response: Response,
+        user_id: int = Path(..., ge=1, description="The ID of the user"),
+        limit: Optional[int] = Query(None, ge=1, le=1000, description="Number of friends to return, all when omitted"),
+        cursor: Optional[str] = Query(None, description="Token from the X-Next-Cursor header"),
+        accept: Optional[str] = Header(None, description="`application/x-ndjson` or `text/csv` streams the rows"),
 ):
     """
     Retrieve a paginated list of friends for a specific user.
 
     Friends are defined as users who have commented on posts that the specified user has created or commented on.
-    The list is sorted by the friends' most recent comment dates in descending order.
+    The list is sorted by the friends' most recent comment dates in descending order, and read from the
+    precomputed co-comment graph. When a page is full, the `X-Next-Cursor` header holds the token of the next one.
+
+    With `Accept: application/x-ndjson` or `text/csv` every friend is streamed from a server-side cursor
+    instead of being returned as a JSON array.
 
     Args:
         user_id (int): The unique identifier of the user for whom to retrieve friends.
+        limit (Optional[int]): Maximum number of friends to return, all of them when omitted.
+        cursor (Optional[str]): Continuation token returned with the previous page.
+        accept (Optional[str]): The Accept header, selecting a streamed NDJSON or CSV response.
 
     Returns:
         List[Friend]: A list of Friend schemas representing the friends.
 
     Raises:
         HTTPException:
+            - 400: If the cursor is invalid.
             - 404: If no friends are found for the specified user.
             - 500: If an internal server error occurs during the process.
+            - 503: If no database connection could be obtained in time.
+            - 504: If the query runs past the latency budget of the route.
     """
     logger.info(f"Fetching friends for user ID: {user_id}.")
-    connection = get_db_connection()
     try:
-        # Execute the service function to get friends
-        friends = get_users_friends_service(connection, user_id)
+        after = decode_cursor(cursor, descending=True)
+    except ValueError as e:
+        logger.warning(e)
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    try:
+        media_type = negotiate_stream_format(accept)
+        if media_type is not None:
+            # Stream the rows straight from a server-side cursor, bypassing the response cache
+            stream = await stream_users_friends_service(user_id, media_type)
+            if stream is None:
+                logger.warning(f"No friends found for user ID: {user_id}")
+                raise HTTPException(status_code=404, detail="No friends found for the specified user.")
+            return StreamingResponse(stream, media_type=media_type)
+
+        # Execute the service function to get friends, answered from the response cache when possible
+        friends = await response_cache.get_or_load(
+            "users_friends", {"user_id": user_id, "limit": limit, "cursor": cursor},
+            lambda: run_with_connection(get_users_friends_service, user_id, limit, after)
+        )
         if not friends:
             logger.warning(f"No friends found for user ID: {user_id}")
             raise HTTPException(status_code=404, detail="No friends found for the specified user.")
+        if len(friends) == limit:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(friends[-1].last_comment_date, friends[-1].user_id)
         logger.info(f"Retrieved {len(friends)} friends for user ID: {user_id}")
         return friends
 
-    except psycopg2.Error as e:
+    except psycopg.Error as e:
         # Log the database error and raise a 500 Internal Server Error
         logger.error(f"Database error while fetching friends for user ID {user_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
-    except FileNotFoundError as e:
-        # Log the file not found error and raise a 500 Internal Server Error
-        logger.error(e)
-        raise HTTPException(status_code=500, detail="Internal Server Error")
 
-    finally:
-        # Ensure the connection is released back to the pool
-        release_db_connection(connection)
+@router.post("/users/friends:batch", response_model=List[UserFriends])
+async def get_users_friends_batch(body: UserIds):
+    """
+    Retrieve the friends of several users with a single query.
+
+    Each user of the batch lists its friends as `/v2/users/{user_id}/friends` does; users without
+    friends have an empty list. Duplicate ids are returned once.
+
+    Args:
+        body (UserIds): The unique identifiers of the users.
+
+    Returns:
+        List[UserFriends]: The friends of each user, in the order of the requested ids.
+
+    Raises:
+        HTTPException:
+            - 400 if the ids are invalid or more than the batch size limit.
+            - 500 if an internal server error occurs.
+    """
+    try:
+        user_ids = check_batch_ids(body.ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    logger.info(f"Fetching friends for {len(user_ids)} users.")
+    try:
+        # Execute the batch service function, answered from the response cache when possible
+        friends = await response_cache.get_or_load(
+            "users_friends_batch", {"user_ids": user_ids},
+            lambda: run_with_connection(get_users_friends_batch_service, user_ids)
+        )
+        logger.info(f"Retrieved friends for {len(friends)} users")
+        return friends
+
+    except psycopg.Error as e:
+        # Log the database error and raise a 500 Internal Server Error
+        logger.error(f"Database error while fetching friends for user IDs {user_ids}: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -1,23 +1,27 @@
 from fastapi import APIRouter, HTTPException, Path
 from typing import List
-import psycopg2.extras
+import psycopg
 import logging
 
-from app.db.session import get_db_connection, release_db_connection
+from app.db.session import run_with_connection
 from app.schemas.users import IdBadgeHistory
-from app.services.users_id_badge_hist import get_users_id_badge_hist
+from app.services.users_id_badge_hist import get_users_id_badge_hist, get_users_id_badge_hist_json
+from app.utils.cache import response_cache
+from app.utils.fast_json import fast_json_enabled
+from app.utils.metrics import TimedRoute
 
 # Initialize the APIRouter with a prefix and tags
 router = APIRouter(
     prefix="/v2",
-    tags=["Users"]
+    tags=["Users"],
+    route_class=TimedRoute
 )
 
 # Initialize a logger for this module
 logger = logging.getLogger("app.api.users_id_badge_hist")
 
 @router.get("/users/{user_id}/badge_history", response_model=List[IdBadgeHistory])
-def get_users_friends(
+async def get_users_friends(
     user_id: int = Path(..., ge=1, description="The ID of the user"),
 ):
     """
@@ -39,28 +43,26 @@ def get_users_friends(
         HTTPException:
             - 404: If no badge history are found for the specified user.
             - 500: If an internal server error occurs during the process.
+            - 503: If no database connection could be obtained in time.
+            - 504: If the query runs past the latency budget of the route.
     """
     logger.info(f"Fetching badge history for user ID: {user_id}.")
-    connection = get_db_connection()
     try:
-        # Execute the service function to get friends
-        badge_hist = get_users_id_badge_hist(connection, user_id)
+        # Rows are encoded straight to JSON by the service when the fast JSON path is enabled
+        fast_json = fast_json_enabled("users_id_badge_hist")
+        service = get_users_id_badge_hist_json if fast_json else get_users_id_badge_hist
+        # Execute the service function to get friends, answered from the response cache when possible
+        badge_hist = await response_cache.get_or_load(
+            "users_id_badge_hist", {"user_id": user_id, "fast_json": fast_json},
+            lambda: run_with_connection(service, user_id)
+        )
         if not badge_hist:
             logger.warning(f"No badge history found for user ID: {user_id}")
             raise HTTPException(status_code=404, detail="No badge history found for the specified user.")
         logger.info(f"Retrieved {len(badge_hist)} badges for user ID: {user_id}")
-        return badge_hist
+        return badge_hist.response() if fast_json else badge_hist
 
-    except psycopg2.Error as e:
+    except psycopg.Error as e:
         # Log the database error and raise a 500 Internal Server Error
         logger.error(f"Database error while fetching badge history for user ID {user_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    except FileNotFoundError as e:
-        # Log the file not found error and raise a 500 Internal Server Error
-        logger.error(e)
-        raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    finally:
-        # Ensure the connection is released back to the pool
-        release_db_connection(connection)
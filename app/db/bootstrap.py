@@ -0,0 +1,320 @@
+import os
+import re
+import time
+import shlex
+import logging
+import argparse
+import subprocess
+import psycopg
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from psycopg import sql
+
+from app.db.migrations import migrate
+from app.db.session import DB_NAME, DB_PASSWORD, DB_USER, get_conninfo
+
+# Initialize logger
+logger = logging.getLogger("app.db.bootstrap")
+
+# Custom-format archive restored into an empty database, as seen by the restore command
+BOOTSTRAP_BACKUP = os.getenv("BOOTSTRAP_BACKUP", "data/superuser.backup")
+# Command running pg_restore, e.g. `docker compose exec -T db pg_restore` when it is only installed in the db container
+BOOTSTRAP_RESTORE_COMMAND = os.getenv("BOOTSTRAP_RESTORE_COMMAND", "pg_restore")
+# Parallel jobs of the data and post-data restores, and connections vacuuming and prewarming the tables
+BOOTSTRAP_JOBS = int(os.getenv("BOOTSTRAP_JOBS", "4"))
+# Relations loaded into shared buffers, with their indexes, by the prewarm phase
+BOOTSTRAP_PREWARM_RELATIONS = [
+    name.strip() for name in os.getenv("BOOTSTRAP_PREWARM_RELATIONS", "posts,comments,post_tags").split(",")
+    if name.strip()
+]
+
+# Phases in the order they run; the prewarm phase is optional and never recorded as done,
+# since the buffer cache does not survive a restart of the database
+RESTORE_PHASES = ("pre-data", "data", "post-data")
+PHASES = RESTORE_PHASES + ("migrate", "analyze", "prewarm")
+
+# Key of the advisory lock serializing concurrent bootstraps
+BOOTSTRAP_LOCK_KEY = 5_140_002
+
+# Entries of the archive table of contents holding table rows or sequence values
+TOC_DATA_ENTRY = re.compile(r"^\d+; \d+ \d+ (TABLE DATA|SEQUENCE SET) (\S+) (\S+) ")
+
+# Errors of a resumed restore re-creating the objects of its interrupted run
+ALREADY_EXISTS = re.compile(r"already exists|multiple primary keys")
+
+
+class PhaseRecord(NamedTuple):
+    completed: bool
+    seconds: Optional[float]
+
+
+class PhaseTiming(NamedTuple):
+    phase: str
+    status: str
+    seconds: Optional[float]
+
+
+def get_phase_state(conn: psycopg.Connection) -> Dict[str, PhaseRecord]:
+    """
+    Create the bookkeeping table if needed and return the phases started so far.
+
+    A database restored before the bootstrap existed (any table besides the bookkeeping one)
+    has its restore phases recorded as done, untimed.
+
+    Returns:
+        Dict[str, PhaseRecord]: Whether each started phase completed and the seconds it took.
+    """
+    exists = conn.execute("SELECT to_regclass('bootstrap_phases') IS NOT NULL").fetchone()[0]
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS bootstrap_phases (
+            phase text PRIMARY KEY,
+            started_at timestamptz NOT NULL DEFAULT now(),
+            completed_at timestamptz,
+            seconds double precision
+        )
+        """
+    )
+    if not exists and conn.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_stat_user_tables WHERE relname <> 'bootstrap_phases')"
+    ).fetchone()[0]:
+        logger.info("Database already contains data, skipping the restore phases")
+        for phase in RESTORE_PHASES:
+            conn.execute(
+                "INSERT INTO bootstrap_phases (phase, completed_at) VALUES (%s, now())", (phase,)
+            )
+    return {
+        phase: PhaseRecord(completed_at is not None, seconds)
+        for phase, completed_at, seconds in conn.execute(
+            "SELECT phase, completed_at, seconds FROM bootstrap_phases"
+        )
+    }
+
+
+def run_restore(command: List[str], args: List[str], resumed: bool) -> None:
+    """
+    Run pg_restore, logging its messages.
+
+    pg_restore carries on past failed statements and exits with 1. On a resumed run the objects
+    created before the interruption fail with "already exists", which is expected; any other error
+    stops the bootstrap.
+
+    Raises:
+        RuntimeError: If pg_restore failed.
+    """
+    env = {**os.environ, "PGPASSWORD": DB_PASSWORD or ""}
+    result = subprocess.run(command + args, env=env, capture_output=True, text=True)
+    for line in result.stderr.splitlines():
+        logger.warning(line)
+    if result.returncode == 0:
+        return
+    errors = [line for line in result.stderr.splitlines() if "ERROR:" in line]
+    if resumed and result.returncode == 1 and errors and all(ALREADY_EXISTS.search(line) for line in errors):
+        logger.info(f"Skipped {len(errors)} objects restored before the interruption")
+        return
+    raise RuntimeError(f"pg_restore exited with {result.returncode}")
+
+
+def list_data_entries(command: List[str], backup: str) -> List[tuple]:
+    """
+    Return the (kind, schema, name) of the table rows and sequence values held by the archive.
+    """
+    result = subprocess.run(command + ["--list", backup], capture_output=True, text=True, check=True)
+    return [match.groups() for match in map(TOC_DATA_ENTRY.match, result.stdout.splitlines()) if match]
+
+
+def pending_data_tables(conn: psycopg.Connection, command: List[str], backup: str) -> List[str]:
+    """
+    Return the tables and sequences whose data an interrupted data phase still has to restore.
+
+    Each table is loaded by a single COPY, which an interruption rolls back, so a table holding rows
+    is complete. Sequence values are always set again.
+    """
+    pending = []
+    for kind, schema, name in list_data_entries(command, backup):
+        if kind == "TABLE DATA" and conn.execute(
+            sql.SQL("SELECT EXISTS (SELECT 1 FROM {})").format(sql.Identifier(schema, name))
+        ).fetchone()[0]:
+            continue
+        pending.append(name)
+    return pending
+
+
+def run_parallel(statements: Sequence[sql.Composable], jobs: int) -> List[Optional[tuple]]:
+    """
+    Run statements over `jobs` autocommit connections and return the first row of each, None for utility statements.
+    """
+    def execute(statement: sql.Composable) -> Optional[tuple]:
+        with psycopg.connect(get_conninfo(), autocommit=True) as conn:
+            logger.info(f"Running {statement.as_string(conn)}")
+            cursor = conn.execute(statement)
+            return cursor.fetchone() if cursor.description else None
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        return list(executor.map(execute, statements))
+
+
+def vacuum_analyze(conn: psycopg.Connection, jobs: int) -> None:
+    """
+    Vacuum and analyze every table, largest first, so that the planner has statistics and
+    the visibility map allows index-only scans.
+    """
+    tables = conn.execute(
+        "SELECT schemaname, relname FROM pg_stat_user_tables ORDER BY pg_total_relation_size(relid) DESC"
+    ).fetchall()
+    run_parallel(
+        [sql.SQL("VACUUM (ANALYZE) {}").format(sql.Identifier(schema, name)) for schema, name in tables], jobs
+    )
+
+
+def prewarm(conn: psycopg.Connection, relations: List[str], jobs: int) -> None:
+    """
+    Load the relations and their indexes into shared buffers with pg_prewarm.
+    """
+    try:
+        conn.execute("CREATE EXTENSION IF NOT EXISTS pg_prewarm")
+    except psycopg.Error as e:
+        logger.warning(f"pg_prewarm is not available, not prewarming: {e}")
+        return
+    targets = []
+    for relation in relations:
+        if conn.execute("SELECT to_regclass(%s)", (relation,)).fetchone()[0] is None:
+            logger.warning(f"Relation {relation} does not exist, not prewarming it")
+            continue
+        targets.append(relation)
+        targets.extend(
+            row[0] for row in conn.execute(
+                "SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = %s::regclass", (relation,)
+            )
+        )
+    statements = [sql.SQL("SELECT pg_prewarm({})").format(sql.Literal(target)) for target in targets]
+    blocks = sum(row[0] for row in run_parallel(statements, jobs))
+    shared_buffers = conn.execute(
+        "SELECT pg_size_bytes(current_setting('shared_buffers')) / current_setting('block_size')::int"
+    ).fetchone()[0]
+    logger.info(f"Prewarmed {blocks} blocks of {len(targets)} relations")
+    if blocks > shared_buffers:
+        logger.warning(
+            f"The prewarmed relations ({blocks} blocks) do not fit in shared_buffers ({shared_buffers} blocks)"
+        )
+
+
+def bootstrap(backup: str, restore_command: str, jobs: int,
+              prewarm_relations: Optional[List[str]] = None) -> List[PhaseTiming]:
+    """
+    Restore the backup into the database, apply the migrations, vacuum and analyze the tables
+    and optionally prewarm the hot relations, skipping the phases completed by a previous run.
+
+    The schema is restored first, then the rows with `jobs` parallel COPYs, then the indexes and
+    constraints, built `jobs` at a time once the rows are loaded.
+
+    Args:
+        backup (str): The path of the custom-format archive, as seen by the restore command.
+        restore_command (str): The command running pg_restore.
+        jobs (int): The number of parallel jobs.
+        prewarm_relations (Optional[List[str]]): The relations to prewarm, None to skip the phase.
+
+    Returns:
+        List[PhaseTiming]: The status and duration of each phase.
+    """
+    command = shlex.split(restore_command)
+    restore_args = ["--no-owner", "--no-privileges", "-U", DB_USER, "-d", DB_NAME]
+    timings = []
+    with psycopg.connect(get_conninfo(), autocommit=True) as conn:
+        conn.execute("SELECT pg_advisory_lock(%s)", (BOOTSTRAP_LOCK_KEY,))
+        try:
+            state = get_phase_state(conn)
+            for phase in PHASES:
+                if phase == "prewarm" and prewarm_relations is None:
+                    continue
+                record = state.get(phase)
+                if record is not None and record.completed and phase != "prewarm":
+                    timings.append(PhaseTiming(phase, "done earlier", record.seconds))
+                    continue
+
+                resumed = phase in state
+                if resumed:
+                    logger.info(f"Resuming the interrupted {phase} phase")
+                else:
+                    logger.info(f"Starting the {phase} phase")
+                conn.execute(
+                    "INSERT INTO bootstrap_phases (phase) VALUES (%s) "
+                    "ON CONFLICT (phase) DO UPDATE SET started_at = now(), completed_at = NULL, seconds = NULL",
+                    (phase,)
+                )
+                start = time.perf_counter()
+
+                if phase == "pre-data":
+                    run_restore(command, restore_args + ["--section=pre-data", backup], resumed)
+                elif phase == "data":
+                    selection = []
+                    if resumed:
+                        selection = [f"--table={name}" for name in pending_data_tables(conn, command, backup)]
+                    if not resumed or selection:
+                        run_restore(command, restore_args + ["--section=data", f"--jobs={jobs}", *selection, backup],
+                                    resumed)
+                elif phase == "post-data":
+                    run_restore(command, restore_args + ["--section=post-data", f"--jobs={jobs}", backup], resumed)
+                elif phase == "migrate":
+                    # The analyze phase covers every table
+                    migrate(analyze=False)
+                elif phase == "analyze":
+                    vacuum_analyze(conn, jobs)
+                elif phase == "prewarm":
+                    prewarm(conn, prewarm_relations, jobs)
+
+                seconds = time.perf_counter() - start
+                if phase != "prewarm":
+                    conn.execute(
+                        "UPDATE bootstrap_phases SET completed_at = now(), seconds = %s WHERE phase = %s",
+                        (seconds, phase)
+                    )
+                logger.info(f"Completed the {phase} phase in {seconds:.1f}s")
+                timings.append(PhaseTiming(phase, "resumed" if resumed else "done", seconds))
+        finally:
+            conn.execute("SELECT pg_advisory_unlock(%s)", (BOOTSTRAP_LOCK_KEY,))
+    return timings
+
+
+def print_timings(timings: List[PhaseTiming]) -> None:
+    for timing in timings:
+        seconds = f"{timing.seconds:9.1f}s" if timing.seconds is not None else f"{'-':>10}"
+        print(f"{timing.phase:<10} {timing.status:<13} {seconds}")
+    print(f"{'total':<10} {'':<13} {sum(timing.seconds or 0 for timing in timings):9.1f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Restore the backup into an empty database with parallel jobs, apply the migrations, "
+                    "vacuum and analyze the tables and optionally prewarm them. An interrupted run resumes "
+                    "at the phase it stopped in."
+    )
+    parser.add_argument("--backup", default=BOOTSTRAP_BACKUP, help="Archive path as seen by the restore command")
+    parser.add_argument("--restore-command", default=BOOTSTRAP_RESTORE_COMMAND, help="Command running pg_restore")
+    parser.add_argument("--jobs", type=int, default=BOOTSTRAP_JOBS, help="Parallel restore, vacuum and prewarm jobs")
+    parser.add_argument("--prewarm", action="store_true", help="Load the hot relations into shared buffers")
+    parser.add_argument("--prewarm-relations", default=",".join(BOOTSTRAP_PREWARM_RELATIONS),
+                        help="Comma separated relations to prewarm with their indexes")
+    parser.add_argument("--status", action="store_true", help="Show the recorded phases and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    if args.status:
+        with psycopg.connect(get_conninfo(), autocommit=True) as conn:
+            state = get_phase_state(conn)
+        print_timings([
+            PhaseTiming(phase, "done" if state[phase].completed else "interrupted", state[phase].seconds)
+            if phase in state else PhaseTiming(phase, "pending", None)
+            for phase in PHASES if phase != "prewarm"
+        ])
+        return
+
+    relations = [name.strip() for name in args.prewarm_relations.split(",") if name.strip()] if args.prewarm else None
+    print_timings(bootstrap(args.backup, args.restore_command, args.jobs, relations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import os
+import re
+import logging
+import argparse
+import psycopg
+
+from typing import List, NamedTuple
+
+from app.db.session import get_conninfo
+
+# Initialize logger
+logger = logging.getLogger("app.db.migrations")
+
+# Directory holding the versioned migration files (NNNN_description.sql)
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'migrations')
+
+MIGRATION_FILENAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+# Migrations starting with this marker run statement by statement outside a transaction,
+# which CREATE INDEX CONCURRENTLY requires
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+
+# Statements are terminated by a semicolon at the end of a line (before an optional comment),
+# outside of $$-quoted bodies
+STATEMENT_END = re.compile(r";\s*(?:--.*)?$")
+
+# Tables whose indexes or columns a migration changes, analyzed once the migrations are applied
+CHANGED_TABLE = re.compile(
+    r"\b(?:CREATE\s+(?:UNIQUE\s+)?INDEX\b[^;]*?\bON\s+(?:ONLY\s+)?|ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?)([\w.]+)",
+    re.IGNORECASE
+)
+
+# Key of the advisory lock serializing concurrent runners (e.g. several workers migrating on startup)
+MIGRATION_LOCK_KEY = 5_140_001
+
+# Apply the pending migrations when the application starts (see app.main)
+RUN_MIGRATIONS_ON_STARTUP = os.getenv("RUN_MIGRATIONS_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    sql: str
+
+    @property
+    def transactional(self) -> bool:
+        return not self.sql.lstrip().startswith(NO_TRANSACTION_MARKER)
+
+    def statements(self) -> List[str]:
+        """
+        Split the migration into statements, dropping the comment-only chunks.
+        """
+        statements, lines, in_body = [], [], False
+        for line in self.sql.splitlines():
+            lines.append(line)
+            if line.count("$$") % 2:
+                in_body = not in_body
+            if not in_body and STATEMENT_END.search(line):
+                statements.append("\n".join(lines))
+                lines = []
+        statements.append("\n".join(lines))
+
+        return [
+            statement.strip().rstrip(";")
+            for statement in statements
+            if any(line.strip() and not line.strip().startswith("--") for line in statement.splitlines())
+        ]
+
+    def changed_tables(self) -> List[str]:
+        """
+        Return the tables the migration indexes or alters.
+        """
+        return sorted({table.lower() for table in CHANGED_TABLE.findall(self.sql)})
+
+
+def load_migrations() -> List[Migration]:
+    """
+    Read the migration files ordered by version.
+
+    Returns:
+        List[Migration]: The available migrations.
+
+    Raises:
+        ValueError: If two migration files share a version.
+    """
+    migrations = {}
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILENAME.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Duplicate migration version {version}: '{filename}'.")
+        with open(os.path.join(MIGRATIONS_DIR, filename), 'r') as file:
+            migrations[version] = Migration(version, match.group(2), file.read())
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def get_applied_versions(conn: psycopg.Connection) -> set:
+    """
+    Create the bookkeeping table if needed and return the versions already applied.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version integer PRIMARY KEY,
+            name text NOT NULL,
+            applied_at timestamptz NOT NULL DEFAULT now()
+        )
+        """
+    )
+    return {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+
+def check_valid_indexes(conn: psycopg.Connection, migration: Migration) -> None:
+    """
+    Fail if an index of the migration is invalid.
+
+    An interrupted `CREATE INDEX CONCURRENTLY` leaves an invalid index behind, which
+    `IF NOT EXISTS` then silently accepts on the next run.
+
+    Raises:
+        RuntimeError: If the migration names an invalid index.
+    """
+    invalid = [
+        row[0] for row in conn.execute(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid"
+        )
+        if re.search(rf"\b{re.escape(row[0])}\b", migration.sql)
+    ]
+    if invalid:
+        raise RuntimeError(
+            f"Migration {migration.version:04d}_{migration.name} left invalid indexes {invalid}, "
+            f"drop them and run the migrations again."
+        )
+
+
+def analyze_tables(conn: psycopg.Connection, tables: List[str]) -> None:
+    """
+    Refresh the planner statistics of the given tables.
+    """
+    for table in tables:
+        logger.info(f"Analyzing {table}")
+        conn.execute(f"ANALYZE {table}")
+
+
+def apply_migration(conn: psycopg.Connection, migration: Migration) -> None:
+    """
+    Apply a single migration and record its version.
+
+    Args:
+        conn (psycopg.Connection): An autocommit database connection.
+        migration (Migration): The migration to apply.
+    """
+    logger.info(f"Applying migration {migration.version:04d}_{migration.name}")
+    if migration.transactional:
+        with conn.transaction():
+            for statement in migration.statements():
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (migration.version, migration.name)
+            )
+    else:
+        for statement in migration.statements():
+            conn.execute(statement)
+        check_valid_indexes(conn, migration)
+        conn.execute(
+            "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+            (migration.version, migration.name)
+        )
+
+
+def migrate(analyze: bool = True) -> List[Migration]:
+    """
+    Apply every pending migration in version order, then analyze the tables they changed.
+
+    Args:
+        analyze (bool): Whether to run ANALYZE on the changed tables.
+
+    Returns:
+        List[Migration]: The migrations that were applied.
+    """
+    applied = []
+    with psycopg.connect(get_conninfo(), autocommit=True) as conn:
+        conn.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+        try:
+            applied_versions = get_applied_versions(conn)
+            for migration in load_migrations():
+                if migration.version in applied_versions:
+                    continue
+                apply_migration(conn, migration)
+                applied.append(migration)
+            if analyze and applied:
+                analyze_tables(conn, sorted({table for migration in applied for table in migration.changed_tables()}))
+        finally:
+            conn.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+    logger.info(f"Applied {len(applied)} migrations")
+    return applied
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply the database migrations from the 'migrations' directory.")
+    parser.add_argument("--list", action="store_true", help="Show the migrations and whether they are applied")
+    parser.add_argument("--no-analyze", action="store_true", help="Skip ANALYZE of the changed tables")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    if args.list:
+        with psycopg.connect(get_conninfo(), autocommit=True) as conn:
+            applied_versions = get_applied_versions(conn)
+        for migration in load_migrations():
+            status = "applied" if migration.version in applied_versions else "pending"
+            print(f"{migration.version:04d}_{migration.name}: {status}")
+        return
+
+    migrate(analyze=not args.no_analyze)
+
+
+if __name__ == "__main__":
+    main()
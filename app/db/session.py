@@ -1,10 +1,18 @@
 import os
-import psycopg2
+import asyncio
+import psycopg
 import logging
+from itertools import count
 
-from psycopg2 import pool
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool, PoolTimeout, TooManyRequests
 from dotenv import load_dotenv
 
+from app.utils.admission import Overloaded, admission
+from app.utils.metrics import BACKGROUND_ROUTE, current_route, phase_timer, record_rejection
+
 # Initialize logger
 logger = logging.getLogger("app.database")
 
@@ -19,6 +27,54 @@ DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
+# Connection pool sizing
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+
+# Connection lifecycle: pooled connections are closed past this age or idle time (seconds), and
+# checked with a round trip before being handed out so that connections broken by a database
+# restart are replaced instead of failing the request
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "3600"))
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "600"))
+DB_POOL_CHECK_ON_CHECKOUT = os.getenv("DB_POOL_CHECK_ON_CHECKOUT", "true").lower() == "true"
+
+# Startup connection attempts: seconds each attempt waits for `DB_POOL_MIN_SIZE` connections, number of
+# retries, and delay before the first retry, doubled after each failed attempt up to DB_CONNECT_MAX_BACKOFF
+DB_CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+DB_CONNECT_RETRIES = int(os.getenv("DB_CONNECT_RETRIES", "5"))
+DB_CONNECT_BACKOFF = float(os.getenv("DB_CONNECT_BACKOFF", "1"))
+DB_CONNECT_MAX_BACKOFF = float(os.getenv("DB_CONNECT_MAX_BACKOFF", "30"))
+
+# Seconds the readiness probe waits for a connection of the primary
+DB_READINESS_TIMEOUT = float(os.getenv("DB_READINESS_TIMEOUT", "2"))
+
+# Read replicas as comma separated host[:port] entries, sharing the credentials and database name of the primary
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host.strip()]
+# How reads are spread over the healthy replicas: round_robin or least_connections
+DB_ROUTING_STRATEGY = os.getenv("DB_ROUTING_STRATEGY", "round_robin")
+# Seconds between two health checks of the replicas, 0 disables them (replicas are then always used)
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5"))
+# Seconds a health check may wait for a replica connection
+DB_REPLICA_CHECK_TIMEOUT = float(os.getenv("DB_REPLICA_CHECK_TIMEOUT", "2"))
+# Seconds a request waits for a connection of a busy replica before the primary serves it
+DB_REPLICA_CHECKOUT_TIMEOUT = float(os.getenv("DB_REPLICA_CHECKOUT_TIMEOUT", "0.5"))
+# Replication lag in seconds past which a replica stops receiving reads until it catches up
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "30"))
+# Route templates always served by the primary, comma separated (e.g. /v2/tags/{tag_name}/stats)
+DB_PRIMARY_ROUTES = {
+    route.strip() for route in os.getenv("DB_PRIMARY_ROUTES", "").split(",") if route.strip()
+}
+
+ROUTING_STRATEGIES = ("round_robin", "least_connections")
+
+# Replication lag of a server: 0 on a primary and on a replica that has replayed everything it received
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(extract(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
 # Verify that all required environment variables are set
 missing_vars = []
 for var in ["DB_USER", "DB_PASSWORD", "DB_HOST", "DB_PORT", "DB_NAME"]:
@@ -29,56 +85,358 @@ if missing_vars:
     logger.error(f"Missing environment variables: {', '.join(missing_vars)}")
     raise EnvironmentError(f"Missing environment variables: {', '.join(missing_vars)}")
 
-# Configure database connection pool
-try:
-    connection_pool = psycopg2.pool.SimpleConnectionPool(
-        minconn=1,
-        maxconn=20,
+if DB_ROUTING_STRATEGY not in ROUTING_STRATEGIES:
+    raise EnvironmentError(
+        f"DB_ROUTING_STRATEGY must be one of {', '.join(ROUTING_STRATEGIES)}, got {DB_ROUTING_STRATEGY!r}"
+    )
+
+
+def get_conninfo(host: Optional[str] = None, port: Optional[str] = None) -> str:
+    """
+    Builds the libpq connection string from the environment variables.
+
+    Args:
+        host (Optional[str]): The host to connect to instead of `DB_HOST`, e.g. a replica.
+        port (Optional[str]): The port to connect to instead of `DB_PORT`.
+
+    Returns:
+        str: The connection string for the database.
+    """
+    return make_conninfo(
         user=DB_USER,
         password=DB_PASSWORD,
-        host=DB_HOST,
-        port=DB_PORT,
-        database=DB_NAME
+        host=host or DB_HOST,
+        port=port or DB_PORT,
+        dbname=DB_NAME
+    )
+
+
+class PoolMember:
+    """
+    A connection pool of the primary or of a replica, with the routing state of its server.
+
+    Attributes:
+        name (str): `primary` or the host[:port] of the replica.
+        pool (AsyncConnectionPool): The connection pool.
+        is_primary (bool): Whether the pool connects to the primary.
+        healthy (bool): Whether reads may be routed to the pool.
+        lag (Optional[float]): The replication lag in seconds seen by the last health check.
+        in_use (int): The connections currently checked out of the pool.
+    """
+    __slots__ = ("name", "pool", "is_primary", "healthy", "lag", "in_use")
+
+    def __init__(self, name: str, pool: AsyncConnectionPool, is_primary: bool):
+        self.name = name
+        self.pool = pool
+        self.is_primary = is_primary
+        self.healthy = is_primary
+        self.lag: Optional[float] = 0.0 if is_primary else None
+        self.in_use = 0
+
+    def eject(self, reason: str) -> None:
+        if self.healthy:
+            logger.warning(f"Replica {self.name} ejected from the read rotation: {reason}")
+        self.healthy = False
+
+    def admit(self) -> None:
+        if not self.healthy:
+            logger.info(f"Replica {self.name} admitted to the read rotation")
+        self.healthy = True
+
+
+class PoolRouter:
+    """
+    Route each connection request to the primary or to one of the healthy replicas.
+
+    Reads go to the replicas, picked in turn (`round_robin`) or by fewest checked out
+    connections (`least_connections`); the primary serves them when no replica is healthy.
+    Work outside a request (scheduled refreshes, which write) and the routes listed in
+    `DB_PRIMARY_ROUTES` always use the primary.
+    """
+
+    def __init__(self, primary: PoolMember, replicas: List[PoolMember], strategy: str):
+        self.primary = primary
+        self.replicas = replicas
+        self.strategy = strategy
+        self._turns = count()
+
+    @property
+    def members(self) -> List[PoolMember]:
+        return [self.primary, *self.replicas]
+
+    def choose(self, primary: bool = False) -> PoolMember:
+        """
+        Return the pool the next connection of the current request is taken from.
+
+        Args:
+            primary (bool): Whether the connection must come from the primary.
+        """
+        route = current_route()
+        if primary or route == BACKGROUND_ROUTE or route in DB_PRIMARY_ROUTES:
+            return self.primary
+        healthy = [member for member in self.replicas if member.healthy]
+        if not healthy:
+            return self.primary
+        if self.strategy == "least_connections":
+            return min(healthy, key=lambda member: member.in_use)
+        return healthy[next(self._turns) % len(healthy)]
+
+
+# The pools are created in the application lifespan (see app.main); `connection_pool` is the primary pool
+connection_pool: Optional[AsyncConnectionPool] = None
+pool_router: Optional[PoolRouter] = None
+# Pool member and admitted route of each checked out connection, to return it to the pool it came from
+_checked_out: Dict[psycopg.AsyncConnection, Tuple[PoolMember, Optional[str]]] = {}
+
+
+def _new_pool(conninfo: str) -> AsyncConnectionPool:
+    return AsyncConnectionPool(
+        conninfo=conninfo,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        kwargs={"autocommit": True},
+        check=AsyncConnectionPool.check_connection if DB_POOL_CHECK_ON_CHECKOUT else None,
+        max_lifetime=DB_POOL_MAX_LIFETIME,
+        max_idle=DB_POOL_MAX_IDLE,
+        open=False
     )
-    if connection_pool:
+
+
+async def _open_primary_pool() -> AsyncConnectionPool:
+    """
+    Open the pool of the primary, retrying with exponential backoff while the database is unreachable.
+    """
+    delay = DB_CONNECT_BACKOFF
+    for attempt in range(DB_CONNECT_RETRIES + 1):
+        pool = _new_pool(get_conninfo())
+        try:
+            await pool.open(wait=True, timeout=DB_CONNECT_TIMEOUT)
+            return pool
+        except PoolTimeout as error:
+            await pool.close()
+            if attempt == DB_CONNECT_RETRIES:
+                raise
+            logger.warning(
+                f"Database unreachable (attempt {attempt + 1} of {DB_CONNECT_RETRIES + 1}): {error}, "
+                f"retrying in {delay:.0f}s"
+            )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, DB_CONNECT_MAX_BACKOFF)
+
+
+def _replica_conninfo(replica: str) -> str:
+    host, _, port = replica.partition(":")
+    return get_conninfo(host=host, port=port or None)
+
+
+async def open_db_pool() -> AsyncConnectionPool:
+    """
+    Creates the connection pool of the primary, waiting until it holds `DB_POOL_MIN_SIZE` connections
+    (retried with backoff while the database is unreachable), and one pool per replica of
+    `DB_REPLICA_HOSTS`, which receive reads once a health check admits them.
+
+    Returns:
+        AsyncConnectionPool: The opened connection pool of the primary.
+
+    Raises:
+        Exception: If the pool cannot connect to the primary.
+    """
+    global connection_pool, pool_router
+    try:
+        connection_pool = await _open_primary_pool()
         logger.info("Connection pool created successfully")
-except (Exception, psycopg2.DatabaseError) as error:
-    logger.error(f"Error creating connection pool: {error}")
-    raise
+    except (Exception, psycopg.Error) as error:
+        logger.error(f"Error creating connection pool: {error}")
+        raise
 
+    replicas = []
+    for replica in DB_REPLICA_HOSTS:
+        # A replica that is down must not prevent the startup, its pool keeps reconnecting in the background
+        pool = _new_pool(_replica_conninfo(replica))
+        await pool.open(wait=False)
+        replicas.append(PoolMember(replica, pool, is_primary=False))
+    pool_router = PoolRouter(PoolMember("primary", connection_pool, is_primary=True), replicas, DB_ROUTING_STRATEGY)
+    if replicas:
+        logger.info(f"Routing reads over {len(replicas)} replicas ({DB_ROUTING_STRATEGY})")
+        await check_replicas()
+    return connection_pool
 
-def get_db_connection() -> psycopg2.extensions.connection:
+
+async def check_replicas() -> None:
+    """
+    Measure the replication lag of every replica, ejecting from the read rotation the replicas that do
+    not answer or lag more than `DB_REPLICA_MAX_LAG_SECONDS`, and admitting back the ones that caught up.
+    Without scheduled checks (`DB_REPLICA_CHECK_INTERVAL` of 0) the replicas are admitted unchecked.
     """
-    Retrieves a connection from the connection pool.
+    if pool_router is None:
+        return
+    for member in pool_router.replicas:
+        if DB_REPLICA_CHECK_INTERVAL <= 0:
+            member.admit()
+            continue
+        try:
+            async with member.pool.connection(timeout=DB_REPLICA_CHECK_TIMEOUT) as conn:
+                cursor = await conn.execute(REPLICA_LAG_QUERY)
+                member.lag = float((await cursor.fetchone())[0])
+        except (PoolTimeout, TooManyRequests) as e:
+            if member.in_use < DB_POOL_MAX_SIZE:
+                member.lag = None
+                member.eject(f"health check failed: {e}")
+            # Otherwise every connection is serving a request: the replica is busy, not unhealthy
+            continue
+        except Exception as e:
+            member.lag = None
+            member.eject(f"health check failed: {e}")
+            continue
+        if member.lag > DB_REPLICA_MAX_LAG_SECONDS:
+            member.eject(f"replication lag of {member.lag:.1f}s")
+        else:
+            member.admit()
+
+
+async def check_readiness() -> Dict[str, Any]:
+    """
+    Report whether the application can serve queries: the primary pool is open and answers a round trip.
 
     Returns:
-        connection (psycopg2.extensions.connection): A database connection object.
+        Dict[str, Any]: `ready`, and the pool size and healthy replicas when ready, or the error otherwise.
+    """
+    if connection_pool is None or pool_router is None:
+        return {"ready": False, "error": "The connection pool is not open."}
+    try:
+        async with connection_pool.connection(timeout=DB_READINESS_TIMEOUT) as conn:
+            await conn.execute("SELECT 1")
+    except (Exception, psycopg.Error) as e:
+        return {"ready": False, "error": str(e)}
+    return {
+        "ready": True,
+        "pool_size": connection_pool.get_stats().get("pool_size", 0),
+        "replicas": [member.name for member in pool_router.replicas if member.healthy],
+    }
+
+
+async def close_db_pool() -> None:
+    """
+    Closes the connection pools and all the connections they hold.
+    """
+    global connection_pool, pool_router
+    if pool_router is not None:
+        for member in pool_router.replicas:
+            await member.pool.close()
+        pool_router = None
+    if connection_pool is not None:
+        await connection_pool.close()
+        connection_pool = None
+        logger.info("Connection pool closed")
+
+
+async def get_db_connection(primary: bool = False) -> psycopg.AsyncConnection:
+    """
+    Retrieves a connection from the pool the router picks for the current request.
+
+    Requests first go through the admission controller, which queues them for a limited time when
+    the connections are all taken; work outside a request is not subject to it. A replica whose
+    connections are all taken for `DB_REPLICA_CHECKOUT_TIMEOUT` hands the request over to the
+    primary; a replica failing to connect is also ejected from the read rotation.
+
+    Args:
+        primary (bool): Whether the connection must come from the primary (e.g. to write).
+
+    Returns:
+        connection (psycopg.AsyncConnection): A database connection object.
 
     Raises:
+        Overloaded: If the request was not admitted in time or the pool had no connection for it.
         Exception: If unable to retrieve a connection from the pool.
     """
+    route = current_route()
+    admitted = route if route != BACKGROUND_ROUTE else None
+    member = pool_router.choose(primary)
     try:
-        conn = connection_pool.getconn()
-        if conn:
-            logger.debug("Successfully received connection from pool")
-            return conn
-    except (Exception, psycopg2.DatabaseError) as e:
+        with phase_timer("pool_acquire"):
+            if admitted is not None:
+                await admission.acquire(admitted)
+            if member.is_primary:
+                conn = await member.pool.getconn()
+            else:
+                try:
+                    conn = await member.pool.getconn(timeout=DB_REPLICA_CHECKOUT_TIMEOUT)
+                except (PoolTimeout, TooManyRequests) as e:
+                    # A saturated replica stays in the rotation, only this request moves to the primary
+                    logger.info(f"Replica {member.name} busy, {route} served by the primary: {e}")
+                    member = pool_router.primary
+                    conn = await member.pool.getconn()
+                except psycopg.OperationalError as e:
+                    member.eject(f"connection failed: {e}")
+                    member = pool_router.primary
+                    conn = await member.pool.getconn()
+    except Overloaded as e:
+        logger.warning(f"Request to {route} not admitted: {e.reason}")
+        raise
+    except BaseException as e:
+        if admitted is not None:
+            admission.release(admitted)
+        if isinstance(e, (PoolTimeout, TooManyRequests)):
+            logger.warning(f"No connection available in pool {member.name} for {route}: {e}")
+            record_rejection(route, "pool")
+            raise Overloaded("pool") from None
         logger.error(f"Error getting connection from pool: {e}")
         raise
+    member.in_use += 1
+    _checked_out[conn] = (member, admitted)
+    logger.debug(f"Successfully received connection from pool {member.name}")
+    return conn
 
 
-def release_db_connection(conn) -> None:
+async def release_db_connection(conn) -> None:
     """
-    Releases a connection back to the connection pool.
+    Releases a connection back to the connection pool it was taken from, and its admission capacity.
 
     Args:
-        conn (psycopg2.extensions.connection): The database connection to release.
+        conn (psycopg.AsyncConnection): The database connection to release.
 
     Raises:
         Exception: If unable to release the connection back to the pool.
     """
+    member, admitted = _checked_out.pop(conn)
+    member.in_use -= 1
+    if admitted is not None:
+        admission.release(admitted)
     try:
-        connection_pool.putconn(conn)
-        logger.debug("Connection returned to pool")
-    except (Exception, psycopg2.DatabaseError) as e:
+        await member.pool.putconn(conn)
+        logger.debug(f"Connection returned to pool {member.name}")
+    except (Exception, psycopg.Error) as e:
         logger.error(f"Error returning connection to pool: {e}")
+
+
+@asynccontextmanager
+async def db_connection(primary: bool = False) -> AsyncIterator[psycopg.AsyncConnection]:
+    """
+    Context manager pairing `get_db_connection` with `release_db_connection`.
+
+    Args:
+        primary (bool): Whether the connection must come from the primary (e.g. to write).
+
+    Yields:
+        connection (psycopg.AsyncConnection): A database connection object.
+    """
+    conn = await get_db_connection(primary)
+    try:
+        yield conn
+    finally:
+        await release_db_connection(conn)
+
+
+async def run_with_connection(service: Callable[..., Awaitable], *args: Any) -> Any:
+    """
+    Run a service function with a pooled connection, released as soon as the service returns.
+
+    Args:
+        service (Callable[..., Awaitable]): The service function, taking the connection as first argument.
+        *args: The remaining service arguments.
+
+    Returns:
+        Any: The service result.
+    """
+    async with db_connection() as connection:
+        return await service(connection, *args)
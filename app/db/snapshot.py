@@ -0,0 +1,154 @@
+import os
+import json
+import shutil
+import logging
+import argparse
+import psycopg
+import numpy as np
+
+from typing import Dict, List
+
+from app.db.session import get_conninfo
+from app.utils.sql import load_sql_query
+
+# Initialize logger
+logger = logging.getLogger("app.db.snapshot")
+
+# Directory of the columnar snapshots of the tag analytics, one subdirectory per export and a `current` link
+TAGS_SNAPSHOT_DIR = os.getenv(
+    "TAGS_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'snapshots')
+)
+# Previous exports kept besides the current one, still mapped by the workers that have not reloaded yet
+TAGS_SNAPSHOT_KEEP = int(os.getenv("TAGS_SNAPSHOT_KEEP", "1"))
+
+# Link to the latest export and file describing an export, written once its arrays are complete
+CURRENT_LINK = "current"
+MANIFEST_FILENAME = "manifest.json"
+SNAPSHOT_VERSION = 1
+
+# Arrays of an export, one `<name>.npy` file each:
+# - posts in id order: id, day of the week (0 = Monday) and comment count
+# - tag to posts offsets: the sorted tag ids, and the rows of their posts between consecutive offsets
+# - post to comments offsets: the comments of each post row between consecutive offsets, in creation order
+SNAPSHOT_ARRAYS = (
+    "post_ids", "post_weekdays", "post_comment_counts",
+    "tag_ids", "tag_post_offsets", "tag_post_rows",
+    "comment_offsets", "comment_ids", "comment_created_us",
+)
+
+# Rows fetched from the server-side cursors per round trip
+SNAPSHOT_FETCH_SIZE = 100_000
+
+
+def fetch_columns(conn: psycopg.Connection, filename: str) -> List[np.ndarray]:
+    """
+    Run an export query through a server-side cursor and return its integer columns as arrays.
+    """
+    batches = []
+    with conn.cursor(name=f"export_{os.path.splitext(filename)[0]}") as cursor:
+        cursor.execute(load_sql_query(filename))
+        while rows := cursor.fetchmany(SNAPSHOT_FETCH_SIZE):
+            batches.append(np.array(rows, dtype=np.int64))
+        width = len(cursor.description)
+    table = np.concatenate(batches) if batches else np.empty((0, width), dtype=np.int64)
+    return [table[:, column] for column in range(width)]
+
+
+def build_arrays(conn: psycopg.Connection) -> Dict[str, np.ndarray]:
+    """
+    Read the posts, tag assignments and comments and lay them out as the snapshot arrays.
+    """
+    post_ids, weekdays, comment_counts = fetch_columns(conn, "export_tags_snapshot_posts.sql")
+    logger.info(f"Exported {len(post_ids)} posts")
+    tagged_ids, tagged_posts = fetch_columns(conn, "export_tags_snapshot_post_tags.sql")
+    logger.info(f"Exported {len(tagged_ids)} tag assignments")
+    comment_posts, comment_ids, comment_created_us = fetch_columns(conn, "export_tags_snapshot_comments.sql")
+    logger.info(f"Exported {len(comment_ids)} comments")
+
+    # Both are sorted by tag, then by post, so each tag owns a contiguous run
+    tag_ids, tag_starts = np.unique(tagged_ids, return_index=True)
+    comment_rows = np.searchsorted(post_ids, comment_posts)
+    return {
+        "post_ids": post_ids,
+        "post_weekdays": weekdays.astype(np.int8),
+        "post_comment_counts": comment_counts.astype(np.int32),
+        "tag_ids": tag_ids,
+        "tag_post_offsets": np.append(tag_starts, len(tagged_ids)).astype(np.int64),
+        "tag_post_rows": np.searchsorted(post_ids, tagged_posts).astype(np.int32),
+        "comment_offsets": np.searchsorted(comment_rows, np.arange(len(post_ids) + 1)).astype(np.int64),
+        "comment_ids": comment_ids,
+        "comment_created_us": comment_created_us,
+    }
+
+
+def export_snapshot(directory: str = TAGS_SNAPSHOT_DIR, keep: int = TAGS_SNAPSHOT_KEEP) -> str:
+    """
+    Export a columnar snapshot of the tag analytics data and make it the current one.
+
+    The tables are read in a single repeatable read transaction, so the arrays are consistent with
+    each other. The arrays are saved as `.npy` files, which the workers memory-map read-only: the pages
+    are shared through the page cache. The `current` link is switched atomically once the export is
+    complete, and the exports older than the `keep` previous ones are removed.
+
+    Args:
+        directory (str): The snapshot directory.
+        keep (int): The number of previous exports to keep.
+
+    Returns:
+        str: The path of the new export.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with psycopg.connect(get_conninfo()) as conn:
+        conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+        conn.read_only = True
+        with conn.transaction():
+            exported_at = conn.execute("SELECT now()").fetchone()[0]
+            arrays = build_arrays(conn)
+
+    path = os.path.join(directory, exported_at.strftime("%Y%m%dT%H%M%S%f"))
+    os.makedirs(path)
+    for name in SNAPSHOT_ARRAYS:
+        np.save(os.path.join(path, f"{name}.npy"), arrays[name])
+    with open(os.path.join(path, MANIFEST_FILENAME), 'w') as file:
+        json.dump({
+            "version": SNAPSHOT_VERSION,
+            "exported_at": exported_at.isoformat(),
+            "posts": len(arrays["post_ids"]),
+            "tags": len(arrays["tag_ids"]),
+            "post_tags": len(arrays["tag_post_rows"]),
+            "comments": len(arrays["comment_ids"]),
+        }, file, indent=2)
+
+    link = os.path.join(directory, CURRENT_LINK)
+    temporary_link = f"{link}.{os.getpid()}"
+    os.symlink(os.path.basename(path), temporary_link)
+    os.replace(temporary_link, link)
+    logger.info(f"Snapshot {path} is now current")
+
+    exports = sorted(
+        entry for entry in os.listdir(directory)
+        if os.path.isfile(os.path.join(directory, entry, MANIFEST_FILENAME)) and entry != CURRENT_LINK
+    )
+    for entry in exports[:-(keep + 1)]:
+        logger.info(f"Removing snapshot {entry}")
+        shutil.rmtree(os.path.join(directory, entry))
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Export the columnar snapshot of the posts, tags and comments read by the snapshot "
+                    "backend of the tag analytics endpoints."
+    )
+    parser.add_argument("--directory", default=TAGS_SNAPSHOT_DIR, help="Snapshot directory")
+    parser.add_argument("--keep", type=int, default=TAGS_SNAPSHOT_KEEP, help="Previous exports to keep")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    export_snapshot(args.directory, args.keep)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,26 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 import logging
 
+from app.db.migrations import RUN_MIGRATIONS_ON_STARTUP, migrate
+from app.db.session import (
+    DB_REPLICA_CHECK_INTERVAL, DB_REPLICA_HOSTS, check_replicas, open_db_pool, close_db_pool
+)
+from app.services.tags_comments_count import COMMENT_SEQUENCE_REFRESH_INTERVAL, refresh_comment_sequence
+from app.services.tag_dictionary import TAG_DICTIONARY_REFRESH_INTERVAL, refresh_tag_dictionary
+from app.services.tags_snapshot import TAGS_ANALYTICS_BACKEND, TAGS_SNAPSHOT_RELOAD_INTERVAL, reload_tag_snapshot
+from app.services.tags_stats import TAG_STATS_REFRESH_INTERVAL, refresh_tags_stats_summary
+from app.services.users_friends import USER_INTERACTIONS_REFRESH_INTERVAL, refresh_user_interactions
+from app.utils.sql import sql_registry
+from app.utils.tasks import start_periodic_task, stop_periodic_tasks
+
 # Import routers
 from app.api import (
     posts_users, users_friends, tags_stats,
     posts_duration_limit, posts_limit_query,
     users_id_badge_hist, tags_comments_count,
-    tags_comments_pos_lim, posts_id_limit
+    tags_comments_pos_lim, posts_id_limit, tags, admin, metrics, health
 )
 
 
@@ -16,11 +30,49 @@ logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Apply the pending migrations if enabled, load the SQL queries, open the database connection pools, load
+    the tag dictionary and the tag analytics snapshot if enabled, and start the replica health checks and
+    the background refreshes on startup, stop them and close the pools on shutdown.
+    """
+    if RUN_MIGRATIONS_ON_STARTUP:
+        await asyncio.to_thread(migrate)
+    sql_registry.load()
+    await open_db_pool()
+    await refresh_tag_dictionary()
+    snapshot_backend = TAGS_ANALYTICS_BACKEND == "snapshot"
+    if snapshot_backend:
+        await reload_tag_snapshot()
+    tasks = [
+        start_periodic_task(
+            "replica health check", DB_REPLICA_CHECK_INTERVAL if DB_REPLICA_HOSTS else 0, check_replicas
+        ),
+        start_periodic_task("tag dictionary reload", TAG_DICTIONARY_REFRESH_INTERVAL, refresh_tag_dictionary),
+        start_periodic_task("tag stats summary refresh", TAG_STATS_REFRESH_INTERVAL, refresh_tags_stats_summary),
+        start_periodic_task(
+            "user interactions refresh", USER_INTERACTIONS_REFRESH_INTERVAL, refresh_user_interactions
+        ),
+        start_periodic_task(
+            "comment sequence refresh", COMMENT_SEQUENCE_REFRESH_INTERVAL, refresh_comment_sequence
+        ),
+        start_periodic_task(
+            "tag snapshot reload", TAGS_SNAPSHOT_RELOAD_INTERVAL if snapshot_backend else 0, reload_tag_snapshot
+        ),
+    ]
+    yield
+    await stop_periodic_tasks(tasks)
+    await close_db_pool()
+
+
 # Initialize the FastAPI application
 app = FastAPI(
     title="Stack Exchange API",
     description="API for accessing Stack Exchange Superuser data",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Include routers from different modules
@@ -33,10 +85,14 @@ app.include_router(users_id_badge_hist.router)
 app.include_router(tags_comments_count.router)
 app.include_router(tags_comments_pos_lim.router)
 app.include_router(posts_id_limit.router)
+app.include_router(tags.router)
+app.include_router(admin.router)
+app.include_router(metrics.router)
+app.include_router(health.router)
 
 # Root endpoint for basic health check
 @app.get("/", tags=["Health"])
-def read_root():
+async def read_root():
     """
     Root endpoint to verify that the API is running.
     """
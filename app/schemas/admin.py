@@ -0,0 +1,99 @@
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict
+
+
+class CacheStats(BaseModel):
+    """
+    Schema representing the state of the in-process response cache.
+
+    Attributes:
+        enabled (bool): Whether the cache is enabled.
+        data_version (int): Version of the cached data, bumped on every full invalidation.
+        entries (int): Number of cached results.
+        bytes (int): Approximate size of the cached results in bytes.
+        max_entries (int): Maximum number of cached results.
+        max_bytes (int): Maximum size of the cached results in bytes.
+        endpoints (Dict[str, Dict[str, int]]): Hit, miss, expiration and eviction counters per endpoint.
+    """
+    enabled: bool
+    data_version: int
+    entries: int
+    bytes: int
+    max_entries: int
+    max_bytes: int
+    endpoints: Dict[str, Dict[str, int]]
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CacheInvalidation(BaseModel):
+    """
+    Schema representing the outcome of a cache invalidation.
+
+    Attributes:
+        data_version (int): Version of the cached data after the invalidation.
+        invalidated (int): Number of cached results dropped.
+    """
+    data_version: int
+    invalidated: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SlowQuery(BaseModel):
+    """
+    Schema representing an execution recorded by the slow-query log.
+
+    Attributes:
+        recorded_at (str): When the execution finished, in ISO 8601.
+        query (str): The name of the SQL file.
+        route (str): The route the query ran for.
+        duration_ms (float): The execution time in milliseconds, until the cancellation if it timed out.
+        timed_out (bool): Whether the query was cancelled past its budget instead of finishing.
+        params (Dict[str, Any]): The bound parameters, with the free-text ones redacted.
+        plan (Optional[Any]): The `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)` output, if the execution was sampled
+            (`EXPLAIN (FORMAT JSON)` for a timed out one).
+    """
+    recorded_at: str
+    query: str
+    route: str
+    duration_ms: float
+    timed_out: bool = False
+    params: Dict[str, Any]
+    plan: Optional[Any] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SlowQueryStats(BaseModel):
+    """
+    Schema representing the slow executions of a query.
+
+    Attributes:
+        query (str): The name of the SQL file.
+        count (int): Number of executions past the threshold.
+        mean_duration_ms (float): Mean duration of those executions in milliseconds.
+        max_duration_ms (float): Maximum duration of those executions in milliseconds.
+    """
+    query: str
+    count: int
+    mean_duration_ms: float
+    max_duration_ms: float
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SlowQueryReport(BaseModel):
+    """
+    Schema representing the worst offenders of the slow-query log.
+
+    Attributes:
+        threshold_ms (float): Duration past which executions are recorded, 0 when the log is disabled.
+        queries (List[SlowQueryStats]): Aggregates per query, worst first.
+        slowest (List[SlowQuery]): The slowest recorded executions, slowest first.
+    """
+    threshold_ms: float
+    queries: List[SlowQueryStats]
+    slowest: List[SlowQuery]
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,20 @@
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict
+
+
+class Readiness(BaseModel):
+    """
+    Schema representing whether the application can serve queries.
+
+    Attributes:
+        ready (bool): Whether the connection pool of the primary is open and answers a round trip.
+        pool_size (Optional[int]): Connections opened by the pool of the primary, when ready.
+        replicas (List[str]): The replicas currently receiving reads.
+        error (Optional[str]): Why the application is not ready.
+    """
+    ready: bool
+    pool_size: Optional[int] = None
+    replicas: List[str] = []
+    error: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -1,4 +1,5 @@
 from datetime import datetime
+from enum import Enum
 from typing import List, Optional
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -21,6 +22,20 @@ class Users(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class PostUsers(BaseModel):
+    """
+    Schema representing the discussants of one post of a batch request.
+
+    Attributes:
+        post_id (int): The unique identifier of the post.
+        users (List[Users]): The discussants of the post, empty if it has no comments.
+    """
+    post_id: int
+    users: List[Users]
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class DurationLimit(BaseModel):
     """"
     Schema representing a recently resolved post with its duration of being open.
@@ -41,6 +56,20 @@ class DurationLimit(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class SearchMode(str, Enum):
+    """
+    Matching strategy used to search posts by title or body.
+
+    Attributes:
+        substring: Case-insensitive substring match, ordered from newest to oldest.
+        fulltext: Full-text match of the query words, ordered from newest to oldest.
+        ranked: Full-text match ordered by relevance (ts_rank), then from newest to oldest.
+    """
+    substring = "substring"
+    fulltext = "fulltext"
+    ranked = "ranked"
+
+
 class LimitQuery(BaseModel):
     """
     Schema representing a post with associated tags.
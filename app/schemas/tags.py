@@ -2,6 +2,20 @@ from datetime import datetime
 from pydantic import BaseModel, ConfigDict
 
 
+class TagEntry(BaseModel):
+    """
+    Schema representing a tag matched by the tag name autocompletion.
+
+    Attributes:
+        name (str): The name of the tag.
+        count (int): Number of posts with the tag.
+    """
+    name: str
+    count: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class Stats(BaseModel):
     """
     Schema representing a percentage of the posts with specific tag each day of the week.
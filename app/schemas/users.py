@@ -1,5 +1,8 @@
 from datetime import datetime
-from pydantic import BaseModel, ConfigDict
+from typing import List
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.utils.batch import BATCH_MAX_RAW_IDS
 
 
 class Friends(BaseModel):
@@ -20,6 +23,30 @@ class Friends(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class UserIds(BaseModel):
+    """
+    Schema representing the body of a batch request over users.
+
+    Attributes:
+        ids (List[int]): The unique identifiers of the users, at most `BATCH_MAX_RAW_IDS` before deduplication.
+    """
+    ids: List[int] = Field(..., max_length=BATCH_MAX_RAW_IDS)
+
+
+class UserFriends(BaseModel):
+    """
+    Schema representing the friends of one user of a batch request.
+
+    Attributes:
+        user_id (int): The unique identifier of the user.
+        friends (List[Friends]): The friends of the user, empty if the user has none.
+    """
+    user_id: int
+    friends: List[Friends]
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class IdBadgeHistory(BaseModel):
     """"
     Schema representing the badge history for a user, including the badge earned,
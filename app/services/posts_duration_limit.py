@@ -1,15 +1,24 @@
-from typing import List
-import psycopg2.extras
+from datetime import datetime
+from typing import List, Tuple
+from psycopg.rows import dict_row
 import logging
 
 from app.schemas.posts import DurationLimit
-from app.utils.sql import load_sql_query
+from app.utils.pagination import FIRST_PAGE_DESCENDING
+from app.utils.metrics import phase_timer
+from app.utils.sql import sql_registry, execute_query, fetch_all
 
 # Initialize a logger for this module
 logger = logging.getLogger("app.services.posts_duration_limit")
 
+# SQL query executed by this service
+SQL_QUERY = sql_registry.register("get_posts_duration_limit.sql")
 
-def get_posts_duration_limit_service(connection, duration_in_minutes: float, limit: int) -> List[DurationLimit]:
+
+async def get_posts_duration_limit_service(
+        connection, duration_in_minutes: float, limit: int,
+        after: Tuple[datetime, int] = FIRST_PAGE_DESCENDING
+) -> List[DurationLimit]:
     """
     Business logic to retrieve the most recently resolved posts that were open for a maximum duration.
 
@@ -17,26 +26,27 @@ def get_posts_duration_limit_service(connection, duration_in_minutes: float, lim
         connection: The database connection object.
         duration_in_minutes (float): The maximum duration in minutes a post was open.
         limit (int): The maximum number of posts to retrieve.
+        after (Tuple[datetime, int]): The (closeddate, id) of the last post of the previous page.
 
     Returns:
         List[DurationLimit]: A list of recently resolved posts matching the criteria.
     """
     try:
-        cursor = connection.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
-        # Load the SQL query
-        sql_query = load_sql_query("get_posts_duration_limit.sql")
-        logger.debug(f"Loaded SQL Query: {sql_query}")
+        cursor = connection.cursor(row_factory=dict_row)
 
         # Execute the query with the provided parameters
         logger.debug(f"Executing query with duration_in_minutes: {duration_in_minutes}, limit: {limit}")
-        cursor.execute(sql_query, {'duration_in_minutes': duration_in_minutes, 'limit': limit})
-        rows = cursor.fetchall()
+        await execute_query(cursor, SQL_QUERY, {
+            'duration_in_minutes': duration_in_minutes, 'limit': limit,
+            'after_closeddate': after[0], 'after_id': after[1]
+        })
+        rows = await fetch_all(cursor)
 
         logger.debug(f"Fetched {len(rows)} rows from the database")
 
         # Convert each row into a RecentResolvedPost schema
-        recent_posts = [DurationLimit(**dict(row)) for row in rows]
+        with phase_timer("model"):
+            recent_posts = [DurationLimit(**row) for row in rows]
         return recent_posts
 
     except Exception as e:
@@ -44,4 +54,4 @@ def get_posts_duration_limit_service(connection, duration_in_minutes: float, lim
         raise
 
     finally:
-        cursor.close()
+        await cursor.close()
@@ -1,15 +1,53 @@
-from typing import List
-import psycopg2.extras
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from psycopg.rows import dict_row
 import logging
 
 from app.schemas.posts import IdLimit
-from app.utils.sql import load_sql_query
+from app.utils.fast_json import EncodedRows, RowEncoder, fetch_encoded
+from app.utils.pagination import FIRST_PAGE_ASCENDING
+from app.utils.metrics import phase_timer
+from app.utils.sql import sql_registry, execute_query, fetch_all
 
 # Initialize a logger for this module
 logger = logging.getLogger("app.services.posts_id_limit")
 
+# SQL query executed by this service
+SQL_QUERY = sql_registry.register("get_posts_id_limit.sql")
 
-def get_posts_id_limit_service(connection, post_id: int, limit: int) -> List[IdLimit]:
+# Encoder of the fast JSON path
+ENCODER = RowEncoder(IdLimit)
+
+# Level bound of the thread when no maximum depth is requested
+UNLIMITED_DEPTH = 2 ** 31 - 1
+
+
+def thread_params(
+        post_id: int, limit: int, after: Tuple[datetime, int], max_depth: Optional[int]
+) -> Dict[str, object]:
+    """
+    Build the parameters of the thread query.
+
+    Args:
+        post_id (int): The id of the post starting the thread.
+        limit (int): The maximum number of posts to return.
+        after (Tuple[datetime, int]): The (creationdate, id) of the last post of the previous page.
+        max_depth (Optional[int]): The maximum level of the returned posts, None for the whole thread.
+
+    Returns:
+        Dict[str, object]: The query parameters.
+    """
+    return {
+        'postid': post_id, 'limit': limit,
+        'after_creationdate': after[0], 'after_id': after[1],
+        'max_depth': UNLIMITED_DEPTH if max_depth is None else max_depth
+    }
+
+
+async def get_posts_id_limit_service(
+        connection, post_id: int, limit: int,
+        after: Tuple[datetime, int] = FIRST_PAGE_ASCENDING, max_depth: Optional[int] = None
+) -> List[IdLimit]:
     """
     Business logic to retrieve a post within a thread, starting from a specific post
     and including all its descendant posts.
@@ -18,26 +56,25 @@ def get_posts_id_limit_service(connection, post_id: int, limit: int) -> List[IdL
         connection: The database connection object.
         post_id (str): The id of the post.
         limit (int): The maximum number of posts to return.
+        after (Tuple[datetime, int]): The (creationdate, id) of the last post of the previous page.
+        max_depth (Optional[int]): The maximum level of the returned posts, None for the whole thread.
 
     Returns:
         List[IdLimit]: A list of thread of posts.
     """
     try:
-        cursor = connection.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
-        # Load the SQL query
-        sql_query = load_sql_query("get_posts_id_limit.sql")
-        logger.debug(f"Loaded SQL Query: {sql_query}")
+        cursor = connection.cursor(row_factory=dict_row)
 
         # Execute the query with the provided parameters
         logger.debug(f"Executing query with post_id: {post_id}")
-        cursor.execute(sql_query, {'postid': post_id, 'limit': limit})
-        rows = cursor.fetchall()
+        await execute_query(cursor, SQL_QUERY, thread_params(post_id, limit, after, max_depth))
+        rows = await fetch_all(cursor)
 
         logger.debug(f"Fetched {len(rows)} rows from the database")
 
         # Convert each row into a RecentResolvedPost schema
-        posts = [IdLimit(**dict(row)) for row in rows]
+        with phase_timer("model"):
+            posts = [IdLimit(**row) for row in rows]
         return posts
 
     except Exception as e:
@@ -45,4 +82,24 @@ def get_posts_id_limit_service(connection, post_id: int, limit: int) -> List[IdL
         raise
 
     finally:
-        cursor.close()
+        await cursor.close()
+
+
+async def get_posts_id_limit_json_service(
+        connection, post_id: int, limit: int,
+        after: Tuple[datetime, int] = FIRST_PAGE_ASCENDING, max_depth: Optional[int] = None
+) -> EncodedRows:
+    """
+    Same as `get_posts_id_limit_service`, with the rows encoded straight to a JSON array.
+
+    Args:
+        connection: The database connection object.
+        post_id (str): The id of the post.
+        limit (int): The maximum number of posts to return.
+        after (Tuple[datetime, int]): The (creationdate, id) of the last post of the previous page.
+        max_depth (Optional[int]): The maximum level of the returned posts, None for the whole thread.
+
+    Returns:
+        EncodedRows: The thread of posts, encoded as JSON.
+    """
+    return await fetch_encoded(connection, SQL_QUERY, thread_params(post_id, limit, after, max_depth), ENCODER)
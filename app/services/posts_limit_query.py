@@ -1,46 +1,91 @@
-from typing import List
-import psycopg2.extras
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from psycopg.rows import dict_row
 import logging
 
-from app.schemas.posts import LimitQuery
-from app.utils.sql import load_sql_query
+from app.schemas.posts import LimitQuery, SearchMode
+from app.services.tag_dictionary import tag_dictionary
+from app.utils.fast_json import EncodedRows, RowEncoder, fetch_encoded
+from app.utils.pagination import FIRST_PAGE_DESCENDING
+from app.utils.metrics import phase_timer
+from app.utils.sql import sql_registry, execute_query, fetch_all
 
 # Initialize a logger for this module
 logger = logging.getLogger("app.services.posts_limit_query")
 
+# SQL queries executed by this service for each search mode
+SQL_QUERIES = {
+    SearchMode.substring: sql_registry.register("get_posts_limit_query.sql"),
+    SearchMode.fulltext: sql_registry.register("get_posts_fulltext_query.sql"),
+    SearchMode.ranked: sql_registry.register("get_posts_ranked_query.sql"),
+}
 
-def get_posts_limit_query_service(connection, query: str, limit: int) -> List[LimitQuery]:
+# Encoder of the fast JSON path, the queries return tag ids that are turned into names in process
+ENCODER = RowEncoder(LimitQuery, converters={"tags": tag_dictionary.names})
+
+
+def search_params(
+        query: str, limit: int, mode: SearchMode, after: Tuple[datetime, int]
+) -> Tuple[SearchMode, Dict[str, Any]]:
+    """
+    Resolve the search mode and build the parameters of its query.
+
+    Args:
+        query (str): The search query to filter posts by title or body.
+        limit (int): The maximum number of posts to return.
+        mode (SearchMode): The requested matching strategy.
+        after (Tuple[datetime, int]): The (creationdate, id) of the last post of the previous page.
+
+    Returns:
+        Tuple[SearchMode, Dict[str, Any]]: The effective search mode and the query parameters.
+    """
+    if not query.strip():
+        mode = SearchMode.substring
+
+    # Prepare the search pattern for ILIKE, full-text modes take the query as is
+    search_pattern = f"%{query}%" if mode == SearchMode.substring else query
+    logger.debug(f"Search Pattern: {search_pattern}")
+    return mode, {
+        'limit': limit, 'query': search_pattern,
+        'after_creationdate': after[0], 'after_id': after[1]
+    }
+
+
+async def get_posts_limit_query_service(
+        connection, query: str, limit: int, mode: SearchMode = SearchMode.substring,
+        after: Tuple[datetime, int] = FIRST_PAGE_DESCENDING
+) -> List[LimitQuery]:
     """
     Business logic to retrieve a list of posts with associated tags.
 
+    An empty query matches every post, so it is always served by the substring search.
+    The ranked search is ordered by relevance and is not paginated, it ignores `after`.
+
     Args:
         connection: The database connection object.
         query (str): The search query to filter posts by title or body.
         limit (int): The maximum number of posts to return.
+        mode (SearchMode): The matching strategy.
+        after (Tuple[datetime, int]): The (creationdate, id) of the last post of the previous page.
 
     Returns:
         List[LimitQuery]: A list of posts with associated tags matching the criteria.
     """
     try:
-        cursor = connection.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
-        # Load the SQL query
-        sql_query = load_sql_query("get_posts_limit_query.sql")
-        logger.debug(f"Loaded SQL Query: {sql_query}")
+        cursor = connection.cursor(row_factory=dict_row)
 
-        # Prepare the search pattern for ILIKE
-        search_pattern = f"%{query}%"
-        logger.debug(f"Search Pattern: {search_pattern}")
+        mode, params = search_params(query, limit, mode, after)
 
         # Execute the query with the provided parameters
-        logger.debug(f"Executing query with limit: {limit}")
-        cursor.execute(sql_query, {'limit': limit, 'query': search_pattern})
-        rows = cursor.fetchall()
+        logger.debug(f"Executing {mode.value} search with limit: {limit}")
+        await execute_query(cursor, SQL_QUERIES[mode], params)
+        rows = await fetch_all(cursor)
 
         logger.debug(f"Fetched {len(rows)} rows from the database")
 
-        # Convert each row into a RecentResolvedPost schema
-        posts = [LimitQuery(**dict(row)) for row in rows]
+        # Convert each row into a LimitQuery schema, naming the tag ids from the tag dictionary
+        with phase_timer("model"):
+            posts = [LimitQuery(**{**row, "tags": tag_dictionary.names(row["tags"])}) for row in rows]
         return posts
 
     except Exception as e:
@@ -48,4 +93,26 @@ def get_posts_limit_query_service(connection, query: str, limit: int) -> List[Li
         raise
 
     finally:
-        cursor.close()
+        await cursor.close()
+
+
+async def get_posts_limit_query_json_service(
+        connection, query: str, limit: int, mode: SearchMode = SearchMode.substring,
+        after: Tuple[datetime, int] = FIRST_PAGE_DESCENDING
+) -> EncodedRows:
+    """
+    Same as `get_posts_limit_query_service`, with the posts encoded straight to a JSON array.
+
+    Args:
+        connection: The database connection object.
+        query (str): The search query to filter posts by title or body.
+        limit (int): The maximum number of posts to return.
+        mode (SearchMode): The matching strategy.
+        after (Tuple[datetime, int]): The (creationdate, id) of the last post of the previous page.
+
+    Returns:
+        EncodedRows: The posts with associated tags matching the criteria, encoded as JSON.
+    """
+    mode, params = search_params(query, limit, mode, after)
+    logger.debug(f"Executing {mode.value} search with limit: {limit} for the fast JSON path")
+    return await fetch_encoded(connection, SQL_QUERIES[mode], params, ENCODER)
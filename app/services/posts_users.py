@@ -1,15 +1,21 @@
-from typing import List
-import psycopg2.extras
+from typing import AsyncIterator, Dict, List, Optional
+from psycopg.rows import dict_row
 import logging
 
-from app.schemas.posts import Users
-from app.utils.sql import load_sql_query
+from app.schemas.posts import PostUsers, Users
+from app.utils.metrics import phase_timer
+from app.utils.sql import sql_registry, execute_query, fetch_all
+from app.utils.streaming import open_row_stream
 
 # Initialize a logger for this module
 logger = logging.getLogger("app.services.users_friends")
 
+# SQL query executed by this service
+SQL_QUERY = sql_registry.register("get_posts_users.sql")
+BATCH_SQL_QUERY = sql_registry.register("get_posts_users_batch.sql")
 
-def get_posts_users_service(connection, post_id: int) -> List[Users]:
+
+async def get_posts_users_service(connection, post_id: int) -> List[Users]:
     """
     Business logic to retrieve a list of all discussants (users who have commented) on a specific post.
 
@@ -24,21 +30,18 @@ def get_posts_users_service(connection, post_id: int) -> List[Users]:
         List[Users]: A list of Users schemas.
     """
     try:
-        cursor = connection.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
-        # Load the SQL query from the external file
-        sql_query = load_sql_query("get_posts_users.sql")
-        logger.debug(f"Loaded SQL Query: {sql_query}")
+        cursor = connection.cursor(row_factory=dict_row)
 
         # Execute the query with the provided user_id
         logger.debug(f"Executing query with post_id: {post_id}")
-        cursor.execute(sql_query, {"postid": post_id})
-        rows = cursor.fetchall()
+        await execute_query(cursor, SQL_QUERY, {"postid": post_id})
+        rows = await fetch_all(cursor)
 
         logger.debug(f"Fetched {len(rows)} rows from the database")
 
         # Convert each row into a Users schema
-        users = [Users(**dict(row)) for row in rows]
+        with phase_timer("model"):
+            users = [Users(**row) for row in rows]
         return users
 
     except Exception as e:
@@ -46,4 +49,55 @@ def get_posts_users_service(connection, post_id: int) -> List[Users]:
         raise
 
     finally:
-        cursor.close()
+        await cursor.close()
+
+
+async def get_posts_users_batch_service(connection, post_ids: List[int]) -> List[PostUsers]:
+    """
+    Business logic to retrieve the discussants of several posts with one query.
+
+    Args:
+        connection: The database connection object.
+        post_ids (List[int]): The unique identifiers of the posts.
+
+    Returns:
+        List[PostUsers]: The discussants of each post, in the order of `post_ids`.
+    """
+    try:
+        cursor = connection.cursor(row_factory=dict_row)
+
+        # Execute the query with all the provided post ids at once
+        logger.debug(f"Executing batch query with post_ids: {post_ids}")
+        await execute_query(cursor, BATCH_SQL_QUERY, {"postids": post_ids})
+        rows = await fetch_all(cursor)
+
+        logger.debug(f"Fetched {len(rows)} rows from the database")
+
+        # Group the rows, already sorted per post, by post id
+        with phase_timer("model"):
+            users: Dict[int, List[Users]] = {post_id: [] for post_id in post_ids}
+            for row in rows:
+                users[row.pop("post_id")].append(Users(**row))
+            return [PostUsers(post_id=post_id, users=items) for post_id, items in users.items()]
+
+    except Exception as e:
+        logger.error(f"Error in get_posts_users_batch_service: {e}")
+        raise
+
+    finally:
+        await cursor.close()
+
+
+async def stream_posts_users_service(post_id: int, media_type: str) -> Optional[AsyncIterator[bytes]]:
+    """
+    Stream the discussants of a specific post through a server-side cursor.
+
+    Args:
+        post_id (int): The unique identifier of the post.
+        media_type (str): The streamed media type, `application/x-ndjson` or `text/csv`.
+
+    Returns:
+        Optional[AsyncIterator[bytes]]: The encoded rows in batches, or None if there are no rows.
+    """
+    logger.debug(f"Streaming query with post_id: {post_id} as {media_type}")
+    return await open_row_stream(SQL_QUERY, {"postid": post_id}, Users, media_type)
@@ -0,0 +1,199 @@
+import os
+import re
+import bisect
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.db.session import db_connection
+from app.schemas.tags import TagEntry
+from app.utils.cache import response_cache
+from app.utils.sql import sql_registry, execute_query, fetch_all
+
+# Initialize a logger for this module
+logger = logging.getLogger("app.services.tag_dictionary")
+
+# Seconds between two reloads of the tag dictionary, 0 disables the scheduled reload
+TAG_DICTIONARY_REFRESH_INTERVAL = float(os.getenv("TAG_DICTIONARY_REFRESH_INTERVAL", "300"))
+
+# SQL query executed by this service
+SQL_QUERY = sql_registry.register("get_tags_dictionary.sql")
+
+# Endpoints whose cached results are keyed by resolved tag ids or carry tag names
+TAG_ENDPOINTS = ("tags_stats", "tags_comments_count", "tags_comments_pos_lim", "posts_limit_query")
+
+# Wildcards of a LIKE pattern, and the escape character making the next character literal
+LIKE_WILDCARDS = {"%": ".*", "_": "."}
+LIKE_ESCAPE = "\\"
+
+
+def fold_tag_name(tag_name: str) -> str:
+    """
+    Return the lower-cased form under which a tag name is looked up ignoring case, as ILIKE compares it.
+    """
+    return tag_name.lower()
+
+
+def parse_like_pattern(pattern: str) -> Tuple[str, Optional[re.Pattern]]:
+    """
+    Translate an ILIKE pattern: `%` matches any sequence, `_` any character and a backslash escapes them.
+
+    Args:
+        pattern (str): The pattern.
+
+    Returns:
+        Tuple[str, Optional[re.Pattern]]: The folded literal prefix before the first wildcard, and a
+        regular expression matching the folded names the pattern matches, None without wildcards.
+    """
+    parts, prefix, literal, escaped = [], [], True, False
+    for character in pattern:
+        if not escaped and character == LIKE_ESCAPE:
+            escaped = True
+            continue
+        if not escaped and character in LIKE_WILDCARDS:
+            parts.append(LIKE_WILDCARDS[character])
+            literal = False
+        else:
+            parts.append(re.escape(fold_tag_name(character)))
+            if literal:
+                prefix.append(fold_tag_name(character))
+        escaped = False
+    if escaped:
+        # A trailing escape character matches itself
+        parts.append(re.escape(LIKE_ESCAPE))
+        if literal:
+            prefix.append(LIKE_ESCAPE)
+    return "".join(prefix), None if literal else re.compile("".join(parts), re.DOTALL)
+
+
+class TagDictionary:
+    """
+    In-process copy of the tags table, resolving names to ids and ids to names without a query.
+
+    Hash maps give the ids of each exact name and the name of each id. For the lookups ignoring
+    case, the lower-cased names are kept in a sorted array, parallel to the ids, display names and
+    post counts of the tags sharing that folded name, with a hash map giving the position of each
+    folded name. Prefix and pattern lookups are a binary search on the sorted array. A reload builds
+    new arrays and swaps them in at once, so lookups never see a partial state.
+    """
+
+    def __init__(self):
+        self._keys: List[str] = []
+        self._ids: List[Tuple[int, ...]] = []
+        self._names: List[str] = []
+        self._counts: List[int] = []
+        self._positions: Dict[str, int] = {}
+        self._ids_by_name: Dict[str, Tuple[int, ...]] = {}
+        self._names_by_id: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._names_by_id)
+
+    def load(self, rows: Iterable[Tuple[int, str, int]]) -> bool:
+        """
+        Replace the dictionary with the given tags.
+
+        Args:
+            rows (Iterable[Tuple[int, str, int]]): The (id, tagname, count) of every tag.
+
+        Returns:
+            bool: Whether a tag was added, removed or renamed since the previous load.
+        """
+        grouped: Dict[str, Tuple[List[int], List[str], List[int]]] = {}
+        ids_by_name: Dict[str, List[int]] = {}
+        names_by_id = {}
+        for tag_id, tag_name, count in rows:
+            ids, names, counts = grouped.setdefault(fold_tag_name(tag_name), ([], [], []))
+            ids.append(tag_id)
+            names.append(tag_name)
+            counts.append(count or 0)
+            ids_by_name.setdefault(tag_name, []).append(tag_id)
+            names_by_id[tag_id] = tag_name
+
+        keys = sorted(grouped)
+        self._ids = [tuple(grouped[key][0]) for key in keys]
+        self._names = [min(grouped[key][1]) for key in keys]
+        self._counts = [sum(grouped[key][2]) for key in keys]
+        self._positions = {key: position for position, key in enumerate(keys)}
+        self._ids_by_name = {tag_name: tuple(ids) for tag_name, ids in ids_by_name.items()}
+        changed = names_by_id != self._names_by_id
+        self._names_by_id = names_by_id
+        self._keys = keys
+        return changed
+
+    def resolve(self, tag_name: str) -> List[int]:
+        """
+        Return the ids of the tags named exactly `tag_name`, as `tagname = :tag_name`; empty for an unknown tag.
+        """
+        return list(self._ids_by_name.get(tag_name, ()))
+
+    def resolve_pattern(self, pattern: str) -> List[int]:
+        """
+        Return the ids of the tags whose name matches the pattern, as `tagname ILIKE :pattern`, in name order.
+
+        A pattern without wildcards is a hash lookup of its folded name; otherwise the names starting
+        with the literal prefix of the pattern are matched against it.
+        """
+        prefix, expression = parse_like_pattern(pattern)
+        if expression is None:
+            position = self._positions.get(prefix)
+            return [] if position is None else list(self._ids[position])
+
+        keys, ids = self._keys, []
+        position = bisect.bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix):
+            if expression.fullmatch(keys[position]):
+                ids.extend(self._ids[position])
+            position += 1
+        return ids
+
+    def names(self, tag_ids: Iterable[int]) -> List[str]:
+        """
+        Return the names of the given tag ids, skipping the ids loaded after the last reload.
+        """
+        names_by_id = self._names_by_id
+        return [names_by_id[tag_id] for tag_id in tag_ids if tag_id in names_by_id]
+
+    def complete(self, prefix: str, limit: int) -> List[TagEntry]:
+        """
+        Return the tags whose name starts with `prefix`, ignoring case, in name order.
+
+        Args:
+            prefix (str): The beginning of the tag name.
+            limit (int): The maximum number of tags to return.
+
+        Returns:
+            List[TagEntry]: The matching tags.
+        """
+        keys, folded = self._keys, fold_tag_name(prefix)
+        matches = []
+        position = bisect.bisect_left(keys, folded)
+        while position < len(keys) and len(matches) < limit and keys[position].startswith(folded):
+            matches.append(TagEntry(name=self._names[position], count=self._counts[position]))
+            position += 1
+        return matches
+
+
+# Tag dictionary shared by the tag endpoints
+tag_dictionary = TagDictionary()
+
+
+async def refresh_tag_dictionary() -> int:
+    """
+    Reload the tag dictionary from the tags table, dropping the cached results of the tag endpoints
+    when a tag was added, removed or renamed.
+
+    Returns:
+        int: The number of tags loaded.
+    """
+    async with db_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            await execute_query(cursor, SQL_QUERY, {})
+            changed = tag_dictionary.load(await fetch_all(cursor))
+        finally:
+            await cursor.close()
+    if changed:
+        for endpoint in TAG_ENDPOINTS:
+            response_cache.invalidate(endpoint)
+    logger.info(f"Loaded {len(tag_dictionary)} tags into the tag dictionary")
+    return len(tag_dictionary)
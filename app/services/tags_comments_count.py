@@ -1,42 +1,56 @@
-from typing import List
-import psycopg2.extras
+import os
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+from psycopg.rows import dict_row
 import logging
 
+from app.db.session import db_connection
 from app.schemas.tags import CommentsCount
-from app.utils.sql import load_sql_query
+from app.services.tags_snapshot import TagSnapshot
+from app.utils.cache import response_cache
+from app.utils.metrics import phase_timer
+from app.utils.sql import sql_registry, execute_query, fetch_all
+from app.utils.streaming import open_row_stream, stream_models
 
 # Initialize a logger for this module
 logger = logging.getLogger("app.services.tags_stats")
 
+# Seconds between two incremental refreshes of the comment sequence table, 0 disables the scheduled refresh
+COMMENT_SEQUENCE_REFRESH_INTERVAL = float(os.getenv("COMMENT_SEQUENCE_REFRESH_INTERVAL", "0"))
 
-def get_tags_comments_count_service(connection, tag_name: str, comments_count: int) -> List[CommentsCount]:
+# SQL queries executed by this service
+SQL_QUERY = sql_registry.register("get_tags_comments_count.sql")
+REFRESH_SQL_QUERY = sql_registry.register("refresh_comment_sequence.sql")
+
+
+async def get_tags_comments_count_service(
+        connection, tag_ids: List[int], comments_count: int
+) -> List[CommentsCount]:
     """
     Business logic to retrieve the response time statistics between comments on a specific post.
 
     Args:
         connection: The database connection object.
-        tag_name (str): The name of the tag to analyze.
+        tag_ids (List[int]): The ids of the tag to analyze, resolved by the tag dictionary.
         comments_count (int): The number of comments to retrieve for each post.
 
     Returns:
         List[CommentsCount]: A list of CommentsCount objects representing time statistics.
     """
     try:
-        cursor = connection.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        cursor = connection.cursor(row_factory=dict_row)
 
-        # Load the SQL query
-        sql_query = load_sql_query("get_tags_comments_count.sql")
-        logger.debug(f"Loaded SQL Query: {sql_query}")
-
-        # Execute the query with the provided tag name
-        logger.debug(f"Executing query for tag name: {tag_name} with comments count: {comments_count}")
-        cursor.execute(sql_query, {"tagname": tag_name, "comments_count": comments_count})
-        rows = cursor.fetchall()
+        # Execute the query with the provided tag ids
+        logger.debug(f"Executing query for tag ids: {tag_ids} with comments count: {comments_count}")
+        await execute_query(cursor, SQL_QUERY, {"tag_ids": tag_ids, "comments_count": comments_count})
+        rows = await fetch_all(cursor)
 
         logger.debug(f"Fetched {len(rows)} rows from the database")
 
         # Convert each row into a TagStats schema
-        comments_stats = [CommentsCount(**dict(row)) for row in rows]
+        with phase_timer("model"):
+            comments_stats = [CommentsCount(**row) for row in rows]
         return comments_stats
 
     except Exception as e:
@@ -44,4 +58,71 @@ def get_tags_comments_count_service(connection, tag_name: str, comments_count: i
         raise
 
     finally:
-        cursor.close()
+        await cursor.close()
+
+
+async def get_tags_comments_count_snapshot_service(
+        snapshot: TagSnapshot, tag_ids: List[int], comments_count: int
+) -> List[CommentsCount]:
+    """
+    Same as `get_tags_comments_count_service`, computed from the columnar snapshot.
+
+    Args:
+        snapshot (TagSnapshot): The loaded snapshot.
+        tag_ids (List[int]): The ids of the tag to analyze, resolved by the tag dictionary.
+        comments_count (int): The number of comments to retrieve for each post.
+
+    Returns:
+        List[CommentsCount]: A list of CommentsCount objects representing time statistics.
+    """
+    logger.debug(f"Computing snapshot statistics for tag ids: {tag_ids} with comments count: {comments_count}")
+    with phase_timer("compute"):
+        return await asyncio.to_thread(snapshot.comments_count, tag_ids, comments_count)
+
+
+async def stream_tags_comments_count_service(
+        tag_ids: List[int], comments_count: int, media_type: str, snapshot: Optional[TagSnapshot] = None
+) -> Optional[AsyncIterator[bytes]]:
+    """
+    Stream the response time statistics between comments through a server-side cursor.
+
+    With a snapshot, the statistics are computed from it and streamed from memory instead.
+
+    Args:
+        tag_ids (List[int]): The ids of the tag to analyze, resolved by the tag dictionary.
+        comments_count (int): The number of comments to retrieve for each post.
+        media_type (str): The streamed media type, `application/x-ndjson` or `text/csv`.
+        snapshot (Optional[TagSnapshot]): The loaded snapshot, None to query the database.
+
+    Returns:
+        Optional[AsyncIterator[bytes]]: The encoded rows in batches, or None if there are no rows.
+    """
+    if snapshot is not None:
+        rows = await get_tags_comments_count_snapshot_service(snapshot, tag_ids, comments_count)
+        return stream_models(rows, CommentsCount, media_type)
+
+    logger.debug(f"Streaming query with tag ids: {tag_ids} with comments count: {comments_count} as {media_type}")
+    return await open_row_stream(
+        SQL_QUERY, {"tag_ids": tag_ids, "comments_count": comments_count}, CommentsCount, media_type
+    )
+
+
+async def refresh_comment_sequence() -> datetime:
+    """
+    Renumber the comments of the posts that received comments since the last refresh and drop the
+    cached results of the endpoints reading the comment sequence table.
+
+    Returns:
+        datetime: The refresh time recorded for the table.
+    """
+    async with db_connection(primary=True) as connection:
+        cursor = connection.cursor(row_factory=dict_row)
+        try:
+            await execute_query(cursor, REFRESH_SQL_QUERY, {})
+            row = await cursor.fetchone()
+            logger.info(f"Comment sequence refreshed at {row['refreshed_at']}")
+            response_cache.invalidate("tags_comments_count")
+            response_cache.invalidate("tags_comments_pos_lim")
+            return row["refreshed_at"]
+        finally:
+            await cursor.close()
@@ -1,43 +1,57 @@
-from typing import List
-import psycopg2.extras
+from datetime import datetime
+from typing import List, Tuple
+from psycopg.rows import dict_row
 import logging
 
 from app.schemas.tags import CommentsPosLim, CommentsCount
-from app.utils.sql import load_sql_query
+from app.utils.fast_json import EncodedRows, RowEncoder, fetch_encoded
+from app.utils.pagination import FIRST_PAGE_ASCENDING
+from app.utils.metrics import phase_timer
+from app.utils.sql import sql_registry, execute_query, fetch_all
 
 # Initialize a logger for this module
 logger = logging.getLogger("app.services.tags_comments_pos_lim")
 
+# SQL query executed by this service
+SQL_QUERY = sql_registry.register("get_tags_comments_pos_lim.sql")
 
-def get_tags_comments_pos_lim_service(connection, tag_name: str, position: int, limit: int) -> List[CommentsPosLim]:
+# Encoder of the fast JSON path
+ENCODER = RowEncoder(CommentsPosLim)
+
+
+async def get_tags_comments_pos_lim_service(
+        connection, tag_ids: List[int], position: int, limit: int,
+        after: Tuple[datetime, int] = FIRST_PAGE_ASCENDING
+) -> List[CommentsPosLim]:
     """
     Business logic to retrieve a comment at a specific position within posts that are tagged with a given tag.
 
     Args:
         connection: The database connection object.
-        tag_name (str): The name of the tag to analyze.
+        tag_ids (List[int]): The ids of the tag to analyze, resolved by the tag dictionary.
         position (int): The position of the comment in the post.
         limit (int): The maximum number of comments to return.
+        after (Tuple[datetime, int]): The (creationdate, comment_id) of the last comment of the previous page.
 
     Returns:
         List[CommentsPosLim]: A list of CommentsPosLim objects representing comments at a given position.
     """
     try:
-        cursor = connection.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        cursor = connection.cursor(row_factory=dict_row)
 
-        # Load the SQL query
-        sql_query = load_sql_query("get_tags_comments_pos_lim.sql")
-        logger.debug(f"Loaded SQL Query: {sql_query}")
-
-        # Execute the query with the provided tag name
-        logger.debug(f"Executing query for tag name: {tag_name} with comment's position: {position}")
-        cursor.execute(sql_query, {"tagname": tag_name, "position": position, "limit": limit})
-        rows = cursor.fetchall()
+        # Execute the query with the provided tag ids
+        logger.debug(f"Executing query for tag ids: {tag_ids} with comment's position: {position}")
+        await execute_query(cursor, SQL_QUERY, {
+            "tag_ids": tag_ids, "position": position, "limit": limit,
+            "after_creationdate": after[0], "after_id": after[1]
+        })
+        rows = await fetch_all(cursor)
 
         logger.debug(f"Fetched {len(rows)} rows from the database")
 
         # Convert each row into a TagStats schema
-        comments_stats = [CommentsPosLim(**dict(row)) for row in rows]
+        with phase_timer("model"):
+            comments_stats = [CommentsPosLim(**row) for row in rows]
         return comments_stats
 
     except Exception as e:
@@ -45,4 +59,27 @@ def get_tags_comments_pos_lim_service(connection, tag_name: str, position: int,
         raise
 
     finally:
-        cursor.close()
+        await cursor.close()
+
+
+async def get_tags_comments_pos_lim_json_service(
+        connection, tag_ids: List[int], position: int, limit: int,
+        after: Tuple[datetime, int] = FIRST_PAGE_ASCENDING
+) -> EncodedRows:
+    """
+    Same as `get_tags_comments_pos_lim_service`, with the rows encoded straight to a JSON array.
+
+    Args:
+        connection: The database connection object.
+        tag_ids (List[int]): The ids of the tag to analyze, resolved by the tag dictionary.
+        position (int): The position of the comment in the post.
+        limit (int): The maximum number of comments to return.
+        after (Tuple[datetime, int]): The (creationdate, comment_id) of the last comment of the previous page.
+
+    Returns:
+        EncodedRows: The comments at the given position, encoded as JSON.
+    """
+    return await fetch_encoded(connection, SQL_QUERY, {
+        "tag_ids": tag_ids, "position": position, "limit": limit,
+        "after_creationdate": after[0], "after_id": after[1]
+    }, ENCODER)
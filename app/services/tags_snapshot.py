@@ -0,0 +1,218 @@
+import os
+import json
+import asyncio
+import logging
+import numpy as np
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, ROUND_HALF_UP
+from typing import List, Optional
+
+from app.db.snapshot import CURRENT_LINK, MANIFEST_FILENAME, SNAPSHOT_VERSION, TAGS_SNAPSHOT_DIR
+from app.schemas.tags import CommentsCount, Stats
+from app.utils.cache import response_cache
+
+# Initialize a logger for this module
+logger = logging.getLogger("app.services.tags_snapshot")
+
+# Backend answering the tag statistics and comment response time endpoints: `sql` or `snapshot`
+TAGS_ANALYTICS_BACKENDS = ("sql", "snapshot")
+TAGS_ANALYTICS_BACKEND = os.getenv("TAGS_ANALYTICS_BACKEND", "sql")
+if TAGS_ANALYTICS_BACKEND not in TAGS_ANALYTICS_BACKENDS:
+    raise ValueError(
+        f"TAGS_ANALYTICS_BACKEND must be one of {', '.join(TAGS_ANALYTICS_BACKENDS)}, got '{TAGS_ANALYTICS_BACKEND}'."
+    )
+
+# Seconds between two checks for a newer snapshot, 0 loads it once at startup
+TAGS_SNAPSHOT_RELOAD_INTERVAL = float(os.getenv("TAGS_SNAPSHOT_RELOAD_INTERVAL", "60"))
+
+# Endpoints whose cached results come from the snapshot
+SNAPSHOT_ENDPOINTS = ("tags_stats", "tags_comments_count")
+
+# Day names in the order of the statistics, indexed by the exported day of the week
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# Posts need more comments than this to get comment statistics, as in get_tags_comments_count.sql
+MIN_POST_COMMENTS = 10
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def percentage(tagged: int, total: int) -> float:
+    """
+    Return `tagged` as a percentage of `total` rounded like the SQL: the float ratio cast to numeric
+    (15 significant digits), then rounded half away from zero to two decimals.
+    """
+    return float(Decimal(f"{tagged / total * 100:.15g}").quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
+
+
+class TagSnapshot:
+    """
+    Columnar snapshot of the posts, tags and comments exported by `python -m app.db.snapshot`.
+
+    The arrays are memory-mapped read-only, so every worker process reading the same export shares
+    its pages through the page cache. The tag statistics count the weekdays of the posts of a tag
+    with a bincount; the comment statistics walk the comment runs of the posts of a tag, numbering
+    the comments and summing their response times with segmented cumulative sums.
+
+    Attributes:
+        path (str): The directory of the export.
+        exported_at (datetime): When the exported data was read from the database.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, MANIFEST_FILENAME), 'r') as file:
+            manifest = json.load(file)
+        if manifest["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f"Snapshot {path} has version {manifest['version']}, expected {SNAPSHOT_VERSION}.")
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.path = path
+        self.exported_at = datetime.fromisoformat(manifest["exported_at"])
+        self.post_ids = load("post_ids")
+        self.post_weekdays = load("post_weekdays")
+        self.post_comment_counts = load("post_comment_counts")
+        self.tag_ids = load("tag_ids")
+        self.tag_post_offsets = load("tag_post_offsets")
+        self.tag_post_rows = load("tag_post_rows")
+        self.comment_offsets = load("comment_offsets")
+        self.comment_ids = load("comment_ids")
+        self.comment_created_us = load("comment_created_us")
+        # Posts per day of the week, shared by the statistics of every tag
+        self.weekday_totals = np.bincount(self.post_weekdays, minlength=len(WEEKDAYS))
+
+    def tag_post_rows_of(self, tag_ids: List[int]) -> np.ndarray:
+        """
+        Return the post rows of the given tags, once per tag assignment.
+        """
+        positions = np.searchsorted(self.tag_ids, tag_ids)
+        runs = [
+            self.tag_post_rows[self.tag_post_offsets[position]:self.tag_post_offsets[position + 1]]
+            for tag_id, position in zip(tag_ids, positions)
+            if position < len(self.tag_ids) and self.tag_ids[position] == tag_id
+        ]
+        return np.concatenate(runs) if runs else np.empty(0, dtype=np.int32)
+
+    def tag_stats(self, tag_ids: List[int]) -> List[Stats]:
+        """
+        Compute the percentage of the posts of each day of the week carrying one of the tags.
+
+        Args:
+            tag_ids (List[int]): The ids of the tags named as requested.
+
+        Returns:
+            List[Stats]: The percentage of each day with posts, from Monday to Sunday.
+        """
+        tagged = np.bincount(self.post_weekdays[self.tag_post_rows_of(tag_ids)], minlength=len(WEEKDAYS))
+        return [
+            Stats(day=WEEKDAYS[day], percentage=percentage(int(tagged[day]), int(total)))
+            for day, total in enumerate(self.weekday_totals) if total
+        ]
+
+    def comments_count(self, tag_ids: List[int], comments_count: int) -> List[CommentsCount]:
+        """
+        Compute the response time statistics of the comments past the first `comments_count` of each
+        post with one of the tags and more than 10 comments.
+
+        Response times are rounded to hundredths of a second, and the running sum of each post only
+        adds up the returned comments, as in get_tags_comments_count.sql.
+
+        Args:
+            tag_ids (List[int]): The ids of the tags named as requested.
+            comments_count (int): The number of leading comments to skip on each post, at least 1.
+
+        Returns:
+            List[CommentsCount]: The statistics ordered by post id and comment sequence.
+        """
+        rows = np.unique(self.tag_post_rows_of(tag_ids))
+        rows = rows[self.post_comment_counts[rows] > MIN_POST_COMMENTS]
+        first = self.comment_offsets[rows] + comments_count
+        lengths = np.maximum(self.comment_offsets[rows + 1] - first, 0)
+        rows, first, lengths = rows[lengths > 0], first[lengths > 0], lengths[lengths > 0]
+        if not len(rows):
+            return []
+
+        # One entry per returned comment: its index in the comment arrays and its sequence within the post
+        segment_starts = np.cumsum(lengths) - lengths
+        within = np.arange(lengths.sum()) - np.repeat(segment_starts, lengths)
+        comments = np.repeat(first, lengths) + within
+        sequences = within + comments_count + 1
+
+        # Gaps in hundredths of a second rounded half up, then the running sum restarted on each post
+        created = self.comment_created_us
+        response_times = (created[comments] - created[comments - 1] + 5_000) // 10_000
+        sums = np.cumsum(response_times)
+        sums -= np.repeat(sums[segment_starts] - response_times[segment_starts], lengths)
+        averages = (2 * sums + sequences - 1) // (2 * (sequences - 1))
+
+        post_ids = np.repeat(self.post_ids[rows], lengths)
+        return [
+            CommentsCount(
+                post_id=post_id, comment_seq=sequence, comment_id=comment_id,
+                creationdate=EPOCH + timedelta(microseconds=created_us),
+                response_time=response_time / 100, avg_response_time=average / 100
+            )
+            for post_id, sequence, comment_id, created_us, response_time, average in zip(
+                post_ids.tolist(), sequences.tolist(), self.comment_ids[comments].tolist(),
+                created[comments].tolist(), response_times.tolist(), averages.tolist()
+            )
+        ]
+
+
+class TagSnapshotStore:
+    """
+    The snapshot currently loaded from the `current` link of the snapshot directory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.current: Optional[TagSnapshot] = None
+
+    def reload(self) -> bool:
+        """
+        Load the export the `current` link points to, if it changed since the previous load.
+
+        Returns:
+            bool: Whether a new snapshot was loaded.
+        """
+        link = os.path.join(self.directory, CURRENT_LINK)
+        if not os.path.exists(link):
+            return False
+        path = os.path.realpath(link)
+        if self.current is not None and self.current.path == path:
+            return False
+        self.current = TagSnapshot(path)
+        return True
+
+
+# Snapshot shared by the tag analytics endpoints
+tag_snapshots = TagSnapshotStore(TAGS_SNAPSHOT_DIR)
+
+
+def snapshot_backend() -> Optional[TagSnapshot]:
+    """
+    Return the snapshot answering the tag analytics endpoints, None when they are answered by SQL.
+
+    The snapshot backend falls back to SQL until a snapshot has been exported and loaded.
+    """
+    if TAGS_ANALYTICS_BACKEND != "snapshot":
+        return None
+    return tag_snapshots.current
+
+
+async def reload_tag_snapshot() -> Optional[datetime]:
+    """
+    Load the current snapshot if it changed, dropping the cached results it answers.
+
+    Returns:
+        Optional[datetime]: When the loaded snapshot was exported, None when there is none.
+    """
+    if await asyncio.to_thread(tag_snapshots.reload):
+        for endpoint in SNAPSHOT_ENDPOINTS:
+            response_cache.invalidate(endpoint)
+        logger.info(f"Loaded the tag analytics snapshot exported at {tag_snapshots.current.exported_at}")
+    elif tag_snapshots.current is None:
+        logger.warning("No tag analytics snapshot to load, the tag analytics are answered by SQL")
+    return tag_snapshots.current.exported_at if tag_snapshots.current is not None else None
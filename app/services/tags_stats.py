@@ -1,46 +1,100 @@
-from typing import List
-import psycopg2.extras
+import os
+import asyncio
+from datetime import datetime
+from typing import List, Optional, Tuple
+from psycopg.rows import dict_row
 import logging
 
+from app.db.session import db_connection
 from app.schemas.tags import Stats
-from app.utils.sql import load_sql_query
+from app.services.tags_snapshot import TagSnapshot
+from app.utils.cache import response_cache
+from app.utils.metrics import phase_timer
+from app.utils.sql import sql_registry, execute_query, fetch_all
 
 # Initialize a logger for this module
 logger = logging.getLogger("app.services.tags_stats")
 
+# Seconds between two refreshes of the precomputed summary, 0 disables the scheduled refresh
+TAG_STATS_REFRESH_INTERVAL = float(os.getenv("TAG_STATS_REFRESH_INTERVAL", "0"))
 
-def get_tags_stats_service(connection, tag_name: str) -> List[Stats]:
+# SQL queries executed by this service
+SQL_QUERY = sql_registry.register("get_tags_stats_summary.sql")
+REFRESH_SQL_QUERY = sql_registry.register("refresh_tag_weekday_stats.sql")
+
+
+async def get_tags_stats_service(connection, tag_ids: List[int]) -> Tuple[List[Stats], Optional[datetime]]:
     """
     Business logic to retrieve tag statistics for a specific tag.
 
+    The statistics are read from the precomputed tag by weekday summary.
+
     Args:
         connection: The database connection object.
-        tag_name (str): The name of the tag to analyze.
+        tag_ids (List[int]): The ids of the tags named as requested, resolved by the tag dictionary.
 
     Returns:
-        List[Stats]: A list of Stats objects representing each day of the week.
+        Tuple[List[Stats], Optional[datetime]]: A list of Stats objects representing each day of the week,
+        and the time the summary was last refreshed.
     """
     try:
-        cursor = connection.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        cursor = connection.cursor(row_factory=dict_row)
 
-        # Load the SQL query
-        sql_query = load_sql_query("get_tags_stats.sql")
-        logger.debug(f"Loaded SQL Query: {sql_query}")
-
-        # Execute the query with the provided tag name
-        logger.debug(f"Executing query for tag name: {tag_name}")
-        cursor.execute(sql_query, {"tagname": tag_name})
-        rows = cursor.fetchall()
+        # Execute the query with the provided tag ids
+        logger.debug(f"Executing query for tag ids: {tag_ids}")
+        await execute_query(cursor, SQL_QUERY, {"tag_ids": tag_ids})
+        rows = await fetch_all(cursor)
 
         logger.debug(f"Fetched {len(rows)} rows from the database")
 
         # Convert each row into a TagStats schema
-        tag_stats = [Stats(**dict(row)) for row in rows]
-        return tag_stats
+        with phase_timer("model"):
+            tag_stats = [Stats(**row) for row in rows]
+        refreshed_at = rows[0]["refreshed_at"] if rows else None
+        return tag_stats, refreshed_at
 
     except Exception as e:
         logger.error(f"Error in get_tags_stats_service: {e}")
         raise
 
     finally:
-        cursor.close()
+        await cursor.close()
+
+
+async def get_tags_stats_snapshot_service(
+        snapshot: TagSnapshot, tag_ids: List[int]
+) -> Tuple[List[Stats], Optional[datetime]]:
+    """
+    Same as `get_tags_stats_service`, computed from the columnar snapshot instead of the summary.
+
+    Args:
+        snapshot (TagSnapshot): The loaded snapshot.
+        tag_ids (List[int]): The ids of the tags named as requested, resolved by the tag dictionary.
+
+    Returns:
+        Tuple[List[Stats], Optional[datetime]]: A list of Stats objects representing each day of the week,
+        and the time the snapshot was exported.
+    """
+    logger.debug(f"Computing snapshot statistics for tag ids: {tag_ids}")
+    with phase_timer("compute"):
+        tag_stats = await asyncio.to_thread(snapshot.tag_stats, tag_ids)
+    return tag_stats, snapshot.exported_at
+
+
+async def refresh_tags_stats_summary() -> datetime:
+    """
+    Recompute the tag by weekday summary and drop the cached tag statistics.
+
+    Returns:
+        datetime: The refresh time recorded for the summary.
+    """
+    async with db_connection(primary=True) as connection:
+        cursor = connection.cursor(row_factory=dict_row)
+        try:
+            await execute_query(cursor, REFRESH_SQL_QUERY, {})
+            row = await cursor.fetchone()
+            logger.info(f"Tag statistics summary refreshed at {row['refreshed_at']}")
+            response_cache.invalidate("tags_stats")
+            return row["refreshed_at"]
+        finally:
+            await cursor.close()
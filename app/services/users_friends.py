@@ -1,41 +1,78 @@
-from typing import List
-import psycopg2.extras
+import os
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from psycopg.rows import dict_row
 import logging
 
-from app.schemas.users import Friends
-from app.utils.sql import load_sql_query
+from app.db.session import db_connection
+from app.schemas.users import Friends, UserFriends
+from app.utils.cache import response_cache
+from app.utils.metrics import phase_timer
+from app.utils.pagination import FIRST_PAGE_DESCENDING
+from app.utils.sql import sql_registry, execute_query, fetch_all
+from app.utils.streaming import open_row_stream
 
 # Initialize a logger for this module
 logger = logging.getLogger("app.services.users_friends")
 
+# Seconds between two incremental refreshes of the co-comment graph, 0 disables the scheduled refresh
+USER_INTERACTIONS_REFRESH_INTERVAL = float(os.getenv("USER_INTERACTIONS_REFRESH_INTERVAL", "0"))
 
-def get_users_friends_service(connection, user_id: int) -> List[Friends]:
+# SQL queries executed by this service
+SQL_QUERY = sql_registry.register("get_users_friends.sql")
+BATCH_SQL_QUERY = sql_registry.register("get_users_friends_batch.sql")
+REFRESH_SQL_QUERY = sql_registry.register("refresh_user_interactions.sql")
+
+
+def friends_params(
+        user_id: int, limit: Optional[int],
+        after: Tuple[datetime, int] = FIRST_PAGE_DESCENDING
+) -> Dict[str, object]:
+    """
+    Build the parameters of the friends query.
+
+    Args:
+        user_id (int): The unique identifier of the user.
+        limit (Optional[int]): The maximum number of friends to return, None for all of them.
+        after (Tuple[datetime, int]): The (last_comment_date, user_id) of the last friend of the previous page.
+
+    Returns:
+        Dict[str, object]: The query parameters.
+    """
+    return {"userid": user_id, "limit": limit, "after_date": after[0], "after_id": after[1]}
+
+
+async def get_users_friends_service(
+        connection, user_id: int, limit: Optional[int] = None,
+        after: Tuple[datetime, int] = FIRST_PAGE_DESCENDING
+) -> List[Friends]:
     """
     Business logic to retrieve a list of friends for a specific user.
 
+    The friends are read from the precomputed co-comment graph, most recent interaction first.
+
     Args:
         connection: The database connection object.
         user_id (int): The unique identifier of the user.
+        limit (Optional[int]): The maximum number of friends to return, None for all of them.
+        after (Tuple[datetime, int]): The (last_comment_date, user_id) of the last friend of the previous page.
 
     Returns:
         List[Friend]: A list of Friend schemas.
     """
     try:
-        cursor = connection.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
-        # Load the SQL query from the external file
-        sql_query = load_sql_query("get_users_friends.sql")
-        logger.debug(f"Loaded SQL Query: {sql_query}")
+        cursor = connection.cursor(row_factory=dict_row)
 
         # Execute the query with the provided user_id
         logger.debug(f"Executing query with user_id: {user_id}")
-        cursor.execute(sql_query, {"userid": user_id})
-        rows = cursor.fetchall()
+        await execute_query(cursor, SQL_QUERY, friends_params(user_id, limit, after))
+        rows = await fetch_all(cursor)
 
         logger.debug(f"Fetched {len(rows)} rows from the database")
 
         # Convert each row into a Friends schema
-        friends = [Friends(**dict(row)) for row in rows]
+        with phase_timer("model"):
+            friends = [Friends(**row) for row in rows]
         return friends
 
     except Exception as e:
@@ -43,4 +80,75 @@ def get_users_friends_service(connection, user_id: int) -> List[Friends]:
         raise
 
     finally:
-        cursor.close()
+        await cursor.close()
+
+
+async def get_users_friends_batch_service(connection, user_ids: List[int]) -> List[UserFriends]:
+    """
+    Business logic to retrieve the friends of several users with one query.
+
+    Args:
+        connection: The database connection object.
+        user_ids (List[int]): The unique identifiers of the users.
+
+    Returns:
+        List[UserFriends]: The friends of each user, in the order of `user_ids`.
+    """
+    try:
+        cursor = connection.cursor(row_factory=dict_row)
+
+        # Execute the query with all the provided user ids at once
+        logger.debug(f"Executing batch query with user_ids: {user_ids}")
+        await execute_query(cursor, BATCH_SQL_QUERY, {"userids": user_ids})
+        rows = await fetch_all(cursor)
+
+        logger.debug(f"Fetched {len(rows)} rows from the database")
+
+        # Group the rows, already sorted per user, by requested user id
+        with phase_timer("model"):
+            friends: Dict[int, List[Friends]] = {user_id: [] for user_id in user_ids}
+            for row in rows:
+                friends[row.pop("for_user_id")].append(Friends(**row))
+            return [UserFriends(user_id=user_id, friends=items) for user_id, items in friends.items()]
+
+    except Exception as e:
+        logger.error(f"Error in get_users_friends_batch_service: {e}")
+        raise
+
+    finally:
+        await cursor.close()
+
+
+async def stream_users_friends_service(user_id: int, media_type: str) -> Optional[AsyncIterator[bytes]]:
+    """
+    Stream the friends of a specific user through a server-side cursor.
+
+    Args:
+        user_id (int): The unique identifier of the user.
+        media_type (str): The streamed media type, `application/x-ndjson` or `text/csv`.
+
+    Returns:
+        Optional[AsyncIterator[bytes]]: The encoded rows in batches, or None if there are no rows.
+    """
+    logger.debug(f"Streaming query with user_id: {user_id} as {media_type}")
+    return await open_row_stream(SQL_QUERY, friends_params(user_id, None), Friends, media_type)
+
+
+async def refresh_user_interactions() -> datetime:
+    """
+    Fold the comments added since the last refresh into the co-comment graph and drop the cached friends.
+
+    Returns:
+        datetime: The refresh time recorded for the graph.
+    """
+    async with db_connection(primary=True) as connection:
+        cursor = connection.cursor(row_factory=dict_row)
+        try:
+            await execute_query(cursor, REFRESH_SQL_QUERY, {})
+            row = await cursor.fetchone()
+            logger.info(f"User interactions graph refreshed at {row['refreshed_at']}")
+            response_cache.invalidate("users_friends")
+            response_cache.invalidate("users_friends_batch")
+            return row["refreshed_at"]
+        finally:
+            await cursor.close()
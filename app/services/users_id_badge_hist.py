@@ -1,15 +1,39 @@
+import os
 from typing import List
-import psycopg2.extras
+from psycopg.rows import dict_row
 import logging
 
 from app.schemas.users import IdBadgeHistory
-from app.utils.sql import load_sql_query
+from app.utils.fast_json import EncodedRows, RowEncoder, fetch_encoded
+from app.utils.metrics import phase_timer
+from app.utils.sql import sql_registry, execute_query, fetch_all
 
 # Initialize a logger for this module
 logger = logging.getLogger("app.services.users_id_badge_hist")
 
+# Implementations of the badge history returning the same rows, see checks/badge_history.py:
+# `correlated` runs a subquery per badge, `lateral` probes the posts index per badge and reads
+# back only the returned posts, `merge` walks the user's badges and posts in one date-ordered pass.
+# The set-based ones are opt-in until checks/badge_history.py has compared them on the production data.
+BADGE_HISTORY_QUERIES = {
+    "correlated": sql_registry.register("get_users_id_badge_hist.sql"),
+    "lateral": sql_registry.register("get_users_id_badge_hist_lateral.sql"),
+    "merge": sql_registry.register("get_users_id_badge_hist_merge.sql"),
+}
+BADGE_HISTORY_STRATEGY = os.getenv("BADGE_HISTORY_STRATEGY", "correlated")
+if BADGE_HISTORY_STRATEGY not in BADGE_HISTORY_QUERIES:
+    raise ValueError(
+        f"BADGE_HISTORY_STRATEGY must be one of {', '.join(BADGE_HISTORY_QUERIES)}, got '{BADGE_HISTORY_STRATEGY}'."
+    )
 
-def get_users_id_badge_hist(connection, user_id: int) -> List[IdBadgeHistory]:
+# SQL query executed by this service
+SQL_QUERY = BADGE_HISTORY_QUERIES[BADGE_HISTORY_STRATEGY]
+
+# Encoder of the fast JSON path
+ENCODER = RowEncoder(IdBadgeHistory)
+
+
+async def get_users_id_badge_hist(connection, user_id: int) -> List[IdBadgeHistory]:
     """
     Business logic to retrieve the badge history for the specific user with respective posts.
 
@@ -21,21 +45,18 @@ def get_users_id_badge_hist(connection, user_id: int) -> List[IdBadgeHistory]:
         List[IdBadgeHistory]: A list of IdBadgeHistory schemas.
     """
     try:
-        cursor = connection.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
-        # Load the SQL query from the external file
-        sql_query = load_sql_query("get_users_id_badge_hist.sql")
-        logger.debug(f"Loaded SQL Query: {sql_query}")
+        cursor = connection.cursor(row_factory=dict_row)
 
         # Execute the query with the provided user_id
         logger.debug(f"Executing query with user_id: {user_id}")
-        cursor.execute(sql_query, {"userid": user_id})
-        rows = cursor.fetchall()
+        await execute_query(cursor, SQL_QUERY, {"userid": user_id})
+        rows = await fetch_all(cursor)
 
         logger.debug(f"Fetched {len(rows)} rows from the database")
 
         # Convert each row into a Friends schema
-        friends = [IdBadgeHistory(**dict(row)) for row in rows]
+        with phase_timer("model"):
+            friends = [IdBadgeHistory(**row) for row in rows]
         return friends
 
     except Exception as e:
@@ -43,4 +64,18 @@ def get_users_id_badge_hist(connection, user_id: int) -> List[IdBadgeHistory]:
         raise
 
     finally:
-        cursor.close()
+        await cursor.close()
+
+
+async def get_users_id_badge_hist_json(connection, user_id: int) -> EncodedRows:
+    """
+    Same as `get_users_id_badge_hist`, with the rows encoded straight to a JSON array.
+
+    Args:
+        connection: The database connection object.
+        user_id (int): The unique identifier of the user.
+
+    Returns:
+        EncodedRows: The badge history with the respective posts, encoded as JSON.
+    """
+    return await fetch_encoded(connection, SQL_QUERY, {"userid": user_id}, ENCODER)
@@ -0,0 +1,136 @@
+import os
+import asyncio
+import logging
+from collections import defaultdict, deque
+from typing import Deque, Dict, Tuple
+
+from fastapi import HTTPException
+
+from app.utils.metrics import record_rejection
+from app.utils.timeouts import parse_route_settings
+
+# Initialize a logger for this module
+logger = logging.getLogger("app.utils.admission")
+
+# Capacity units shared by the requests holding a connection, by default one per pooled connection
+ADMISSION_CAPACITY = int(os.getenv("ADMISSION_CAPACITY", os.getenv("DB_POOL_MAX_SIZE", "20")))
+# Requests waiting for capacity past which new ones are rejected at once
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "100"))
+# Milliseconds a request may wait for capacity before it is rejected
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "2000"))
+# Seconds sent in the Retry-After header of the rejected requests
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+# Capacity units a connection of a route takes (default 1), as comma separated route=weight entries
+ADMISSION_ROUTE_WEIGHTS = parse_route_settings(os.getenv("ADMISSION_ROUTE_WEIGHTS", ""))
+# Connections a route may hold at once, as comma separated route=limit entries
+ADMISSION_ROUTE_LIMITS = parse_route_settings(os.getenv("ADMISSION_ROUTE_LIMITS", ""))
+
+
+class Overloaded(HTTPException):
+    """
+    The request was not given a database connection in time, answered as 503 with a Retry-After header.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(
+            status_code=503, detail="The service is overloaded, retry later.",
+            headers={"Retry-After": str(ADMISSION_RETRY_AFTER)}
+        )
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Bound the database connections held by the requests, queueing the excess for a limited time.
+
+    Each connection of a route takes its weight in capacity units, and a route may be capped to a
+    number of connections held at once. A request that does not fit waits in a bounded queue; when
+    capacity is released, the waiters are admitted in arrival order, skipping the ones that still do
+    not fit, so that cheap lookups get through while heavy routes wait for their own share.
+    Requests that find the queue full, or wait past the timeout, are rejected with Overloaded.
+    """
+
+    def __init__(self, capacity: int, queue_size: int, timeout: float,
+                 weights: Dict[str, float], limits: Dict[str, float]):
+        self.capacity = capacity
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.weights = weights
+        self.limits = limits
+        self._used = 0.0
+        self._held: Dict[str, int] = defaultdict(int)
+        self._waiters: Deque[Tuple[str, float, asyncio.Future]] = deque()
+
+    def weight(self, route: str) -> float:
+        # A weight above the capacity would never fit
+        return min(self.weights.get(route, 1), self.capacity)
+
+    def _fits(self, route: str, weight: float) -> bool:
+        limit = self.limits.get(route)
+        return self._used + weight <= self.capacity and (limit is None or self._held[route] < limit)
+
+    def _grant(self, route: str, weight: float) -> None:
+        self._used += weight
+        self._held[route] += 1
+
+    async def acquire(self, route: str) -> None:
+        """
+        Wait until a connection of the route fits, then take its capacity.
+
+        Args:
+            route (str): The route template of the request.
+
+        Raises:
+            Overloaded: If the queue is full or the wait timed out.
+        """
+        weight = self.weight(route)
+        if self._fits(route, weight):
+            self._grant(route, weight)
+            return
+        if len(self._waiters) >= self.queue_size:
+            record_rejection(route, "queue_full")
+            raise Overloaded("queue_full")
+
+        waiter = (route, weight, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        try:
+            async with asyncio.timeout(self.timeout):
+                await waiter[2]
+        except BaseException as e:
+            if waiter[2].done() and not waiter[2].cancelled():
+                # Admitted as the wait ended, give the capacity back
+                self.release(route)
+            else:
+                self._waiters.remove(waiter)
+            if isinstance(e, TimeoutError):
+                record_rejection(route, "timeout")
+                raise Overloaded("timeout") from None
+            raise
+
+    def release(self, route: str) -> None:
+        """
+        Give back the capacity of a connection of the route and admit the waiters that now fit.
+        """
+        self._used -= self.weight(route)
+        self._held[route] -= 1
+        for waiter in list(self._waiters):
+            waiting_route, weight, future = waiter
+            if self._used >= self.capacity:
+                break
+            if not future.done() and self._fits(waiting_route, weight):
+                self._waiters.remove(waiter)
+                self._grant(waiting_route, weight)
+                future.set_result(None)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return the capacity units in use and the number of waiting requests.
+        """
+        return {"capacity": self.capacity, "used": self._used, "waiting": len(self._waiters)}
+
+
+# Admission controller of the connections taken for requests
+admission = AdmissionController(
+    ADMISSION_CAPACITY, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+    ADMISSION_ROUTE_WEIGHTS, ADMISSION_ROUTE_LIMITS
+)
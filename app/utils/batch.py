@@ -0,0 +1,54 @@
+import os
+from typing import Iterable, List
+
+# Maximum number of ids looked up by one request of a batch endpoint
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", "100"))
+# Ids accepted before the duplicates are dropped, so that an oversized request is refused before it is parsed
+BATCH_MAX_RAW_IDS = 10 * BATCH_MAX_IDS
+# Characters of one id of a comma separated list: 19 digits of a bigint, a sign, a space and the comma
+MAX_ID_CHARS = 22
+
+
+def check_batch_ids(ids: Iterable[int]) -> List[int]:
+    """
+    Validate the ids of a batch request and drop the duplicates, keeping the request order.
+
+    Args:
+        ids (Iterable[int]): The requested ids.
+
+    Returns:
+        List[int]: The distinct ids.
+
+    Raises:
+        ValueError: If an id is not positive, or there are no ids or more than `BATCH_MAX_IDS`.
+    """
+    distinct = list(dict.fromkeys(ids))
+    if not distinct:
+        raise ValueError("At least one id is required.")
+    if len(distinct) > BATCH_MAX_IDS:
+        raise ValueError(f"At most {BATCH_MAX_IDS} ids can be requested at once.")
+    if any(item < 1 for item in distinct):
+        raise ValueError("Ids must be positive integers.")
+    return distinct
+
+
+def parse_batch_ids(value: str) -> List[int]:
+    """
+    Parse the comma separated ids of a batch query parameter, e.g. `1,2,3`.
+
+    Args:
+        value (str): The value of the query parameter.
+
+    Returns:
+        List[int]: The distinct ids, in the request order.
+
+    Raises:
+        ValueError: If the value is too long or not a comma separated list of valid ids.
+    """
+    if len(value) > BATCH_MAX_RAW_IDS * MAX_ID_CHARS:
+        raise ValueError(f"At most {BATCH_MAX_IDS} ids can be requested at once.")
+    try:
+        ids = [int(item) for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise ValueError("Ids must be a comma separated list of integers.")
+    return check_batch_ids(ids)
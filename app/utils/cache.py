@@ -0,0 +1,194 @@
+import os
+import time
+import asyncio
+import logging
+from collections import Counter, OrderedDict
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from pydantic_core import to_json
+
+from app.utils.fast_json import EncodedRows
+
+# Initialize a logger for this module
+logger = logging.getLogger("app.utils.cache")
+
+# Cache configuration, the TTL of an endpoint can be overridden with CACHE_TTL_<ENDPOINT>
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL_DEFAULT = float(os.getenv("CACHE_TTL_DEFAULT", "300"))
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    size: int
+    expires_at: float
+
+
+def normalize_params(params: Dict[str, Any]) -> Tuple[Tuple[str, Hashable], ...]:
+    """
+    Turn request parameters into a hashable key independent of their order.
+
+    Args:
+        params (Dict[str, Any]): The endpoint parameters.
+
+    Returns:
+        Tuple[Tuple[str, Hashable], ...]: The sorted (name, value) pairs.
+    """
+    normalized = []
+    for name, value in sorted(params.items()):
+        if isinstance(value, Enum):
+            value = value.value
+        elif isinstance(value, (list, set)):
+            value = tuple(value)
+        normalized.append((name, value))
+    return tuple(normalized)
+
+
+class ResponseCache:
+    """
+    In-process cache of endpoint results with per-endpoint TTL and LRU eviction.
+
+    Entries are keyed by endpoint, normalized parameters and a data version, and the cache is bounded
+    both by the number of entries and by the approximate size of the cached results (their JSON size).
+    Concurrent misses on the same key share a single load.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, default_ttl: float, enabled: bool = True):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.enabled = enabled
+        self.data_version = 0
+        self._entries: "OrderedDict[tuple, CacheEntry]" = OrderedDict()
+        self._endpoint_versions: Counter = Counter()
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._bytes = 0
+        self.counters: Counter = Counter()
+
+    def ttl(self, endpoint: str) -> float:
+        """
+        Return the TTL in seconds of an endpoint, read from CACHE_TTL_<ENDPOINT> or the default TTL.
+        """
+        return float(os.getenv(f"CACHE_TTL_{endpoint.upper()}", self.default_ttl))
+
+    def _key(self, endpoint: str, params: Dict[str, Any]) -> tuple:
+        return endpoint, self.data_version, self._endpoint_versions[endpoint], normalize_params(params)
+
+    async def get_or_load(self, endpoint: str, params: Dict[str, Any], loader: Callable[[], Awaitable]) -> Any:
+        """
+        Return the cached result of an endpoint call, loading and caching it on a miss.
+
+        Args:
+            endpoint (str): The name of the endpoint.
+            params (Dict[str, Any]): The parameters the result depends on.
+            loader (Callable[[], Awaitable]): Coroutine function computing the result.
+
+        Returns:
+            Any: The endpoint result.
+        """
+        ttl = self.ttl(endpoint)
+        if not self.enabled or ttl <= 0:
+            return await loader()
+
+        key = self._key(endpoint, params)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.counters[(endpoint, "hits")] += 1
+                return entry.value
+            self._remove(key)
+            self.counters[(endpoint, "expirations")] += 1
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.counters[(endpoint, "hits")] += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # The request loading the result was cancelled (e.g. its client went away), not this one
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                return await self.get_or_load(endpoint, params, loader)
+
+        self.counters[(endpoint, "misses")] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved so that a future nobody waits for is not logged
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+        future.set_result(value)
+        self._store(endpoint, key, value, ttl)
+        return value
+
+    def _store(self, endpoint: str, key: tuple, value: Any, ttl: float) -> None:
+        size = len(value.body) if isinstance(value, EncodedRows) else len(to_json(value))
+        if size > self.max_bytes:
+            logger.debug(f"Result of {endpoint} is too large to cache ({size} bytes)")
+            return
+
+        self._entries[key] = CacheEntry(value, size, time.monotonic() + ttl)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.counters[(evicted_key[0], "evictions")] += 1
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def invalidate(self, endpoint: Optional[str] = None) -> int:
+        """
+        Drop cached results, e.g. after the database was restored or a summary was refreshed.
+
+        Args:
+            endpoint (Optional[str]): Only drop the results of this endpoint; all results when None.
+
+        Returns:
+            int: The number of entries dropped.
+        """
+        if endpoint is None:
+            self.data_version += 1
+            keys = list(self._entries)
+        else:
+            self._endpoint_versions[endpoint] += 1
+            keys = [key for key in self._entries if key[0] == endpoint]
+
+        for key in keys:
+            self._remove(key)
+        logger.info(f"Invalidated {len(keys)} cached results of {endpoint or 'all endpoints'}")
+        return len(keys)
+
+    def stats(self) -> dict:
+        """
+        Return the cache size and the hit/miss/eviction counters per endpoint.
+        """
+        endpoints: Dict[str, Dict[str, int]] = {}
+        for (endpoint, counter), value in self.counters.items():
+            endpoints.setdefault(endpoint, {})[counter] = value
+        return {
+            "enabled": self.enabled,
+            "data_version": self.data_version,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "endpoints": endpoints,
+        }
+
+
+# Cache shared by the routers
+response_cache = ResponseCache(CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_TTL_DEFAULT, CACHE_ENABLED)
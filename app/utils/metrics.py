@@ -0,0 +1,291 @@
+import time
+import bisect
+import logging
+import functools
+import asyncio
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+
+from app.utils.timeouts import cancel_on_disconnect
+
+# Initialize a logger for this module
+logger = logging.getLogger("app.utils.metrics")
+
+# Histogram buckets in seconds for the request and phase latencies, and in rows for the result sizes
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROWS_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+# Route label of the work done outside of a request (e.g. the scheduled summary refreshes)
+BACKGROUND_ROUTE = "background"
+
+
+class Histogram:
+    """
+    Prometheus histogram with one series per label values.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = defaultdict(float)
+
+    def observe(self, label_values: Tuple[str, ...], value: float) -> None:
+        counts = self._counts.get(label_values)
+        if counts is None:
+            counts = self._counts[label_values] = [0] * (len(self.buckets) + 1)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[label_values] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for label_values, counts in sorted(self._counts.items()):
+            labels = format_labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+            cumulative += counts[-1]
+            yield f'{self.name}_bucket{{{labels},le="+Inf"}} {cumulative}'
+            yield f"{self.name}_sum{{{labels}}} {self._sums[label_values]}"
+            yield f"{self.name}_count{{{labels}}} {cumulative}"
+
+
+class Counter:
+    """
+    Prometheus counter with one series per label values.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = defaultdict(float)
+
+    def inc(self, label_values: Tuple[str, ...], amount: float = 1) -> None:
+        self._values[label_values] += amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for label_values, value in sorted(self._values.items()):
+            yield f"{self.name}{{{format_labels(self.labels, label_values)}}} {value}"
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+def render_gauge(name: str, documentation: str, samples: Dict[Tuple[Tuple[str, str], ...], float]) -> Iterator[str]:
+    yield f"# HELP {name} {documentation}"
+    yield f"# TYPE {name} gauge"
+    for labels, value in samples.items():
+        label_text = format_labels([label for label, _ in labels], [value for _, value in labels])
+        yield f"{name}{{{label_text}}} {value}" if labels else f"{name} {value}"
+
+
+REQUEST_DURATION = Histogram(
+    "app_request_duration_seconds", "Time to handle a request, serialization included.",
+    ("route", "method", "status"), LATENCY_BUCKETS
+)
+PHASE_DURATION = Histogram(
+    "app_phase_duration_seconds",
+    "Time spent per request phase: pool_acquire, execute, fetch, model, encode and serialize.",
+    ("route", "phase"), LATENCY_BUCKETS
+)
+ROWS_RETURNED = Histogram(
+    "app_db_rows_returned", "Rows fetched by a query.", ("route",), ROWS_BUCKETS
+)
+ERRORS = Counter(
+    "app_errors_total", "Errors by type: database error classes and HTTP 5xx responses.", ("route", "type")
+)
+REJECTIONS = Counter(
+    "app_admission_rejections_total", "Requests refused a database connection: queue_full, timeout or pool.",
+    ("route", "reason")
+)
+
+
+class RequestTimer:
+    """
+    Timing state of the request being handled.
+
+    Attributes:
+        route (str): The path template of the route.
+        endpoint_finished (Optional[float]): When the endpoint function returned, serialization follows.
+    """
+    __slots__ = ("route", "endpoint_finished")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.endpoint_finished: Optional[float] = None
+
+
+_request_timer: ContextVar[Optional[RequestTimer]] = ContextVar("request_timer", default=None)
+
+
+def current_route() -> str:
+    """
+    Return the route label of the current request, `background` outside of a request.
+    """
+    timer = _request_timer.get()
+    return timer.route if timer is not None else BACKGROUND_ROUTE
+
+
+def observe_phase(phase: str, seconds: float) -> None:
+    """
+    Record the duration of a phase of the current request.
+    """
+    PHASE_DURATION.observe((current_route(), phase), seconds)
+
+
+@contextmanager
+def phase_timer(phase: str) -> Iterator[None]:
+    """
+    Time the enclosed block as a phase of the current request.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_phase(phase, time.perf_counter() - started)
+
+
+def observe_rows(count: int) -> None:
+    """
+    Record the number of rows fetched by a query of the current request.
+    """
+    ROWS_RETURNED.observe((current_route(),), count)
+
+
+def record_error(error_type: str) -> None:
+    """
+    Count an error of the current request.
+    """
+    ERRORS.inc((current_route(), error_type))
+
+
+def record_rejection(route: str, reason: str) -> None:
+    """
+    Count a request refused a database connection.
+    """
+    REJECTIONS.inc((route, reason))
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute recording the request duration, status and serialization time of its requests.
+
+    The endpoint function is wrapped to note when it returns: the time from there to the
+    finished response is the serialization phase (response model validation and JSON rendering).
+    A request whose client disconnects is cancelled, with the query it is running.
+    """
+
+    def get_route_handler(self) -> Callable:
+        endpoint = self.dependant.call
+        if asyncio.iscoroutinefunction(endpoint) and not getattr(endpoint, "__timed__", False):
+            @functools.wraps(endpoint)
+            async def timed_endpoint(*args, **kwargs):
+                try:
+                    return await endpoint(*args, **kwargs)
+                finally:
+                    timer = _request_timer.get()
+                    if timer is not None:
+                        timer.endpoint_finished = time.perf_counter()
+
+            timed_endpoint.__timed__ = True
+            self.dependant.call = timed_endpoint
+
+        handler = super().get_route_handler()
+        route = self.path
+
+        async def timed_handler(request: Request) -> Response:
+            timer = RequestTimer(route)
+            token = _request_timer.set(timer)
+            started = time.perf_counter()
+            status = "500"
+            try:
+                response = await cancel_on_disconnect(request, handler)
+                status = str(response.status_code)
+                if timer.endpoint_finished is not None:
+                    observe_phase("serialize", time.perf_counter() - timer.endpoint_finished)
+                return response
+            except HTTPException as e:
+                status = str(e.status_code)
+                raise
+            except Exception as e:
+                record_error(type(e).__name__)
+                raise
+            finally:
+                if status.startswith("5"):
+                    record_error(f"http_{status}")
+                REQUEST_DURATION.observe((route, request.method, status), time.perf_counter() - started)
+                _request_timer.reset(token)
+
+        return timed_handler
+
+
+def render_metrics(pool_stats: Dict[str, Dict[str, int]], pool_max_size: int, cache_stats: dict,
+                   replica_states: Optional[Dict[str, Tuple[bool, Optional[float]]]] = None,
+                   admission_stats: Optional[Dict[str, float]] = None) -> str:
+    """
+    Render every metric in the Prometheus text exposition format.
+
+    Args:
+        pool_stats (Dict[str, Dict[str, int]]): The `get_stats()` of each connection pool, by pool name
+            (`primary` or the replica), empty when the pools are closed.
+        pool_max_size (int): The maximum size of each connection pool.
+        cache_stats (dict): The `stats()` of the response cache.
+        replica_states (Optional[Dict[str, Tuple[bool, Optional[float]]]]): Whether each replica is in
+            the read rotation and its last measured replication lag.
+        admission_stats (Optional[Dict[str, float]]): The `stats()` of the admission controller.
+
+    Returns:
+        str: The exposition text.
+    """
+    lines: List[str] = []
+    for metric in (REQUEST_DURATION, PHASE_DURATION, ROWS_RETURNED, ERRORS, REJECTIONS):
+        lines.extend(metric.render())
+
+    pools = {name: ((("pool", name),), stats) for name, stats in pool_stats.items()}
+    lines.extend(render_gauge("app_db_pool_size", "Connections opened by the pool.",
+                              {labels: stats.get("pool_size", 0) for labels, stats in pools.values()}))
+    lines.extend(render_gauge("app_db_pool_max_size", "Maximum connections of the pool.",
+                              {labels: pool_max_size for labels, _ in pools.values()}))
+    lines.extend(render_gauge("app_db_pool_in_use", "Connections checked out of the pool.", {
+        labels: stats.get("pool_size", 0) - stats.get("pool_available", 0) for labels, stats in pools.values()
+    }))
+    lines.extend(render_gauge("app_db_pool_waiting", "Requests waiting for a connection.",
+                              {labels: stats.get("requests_waiting", 0) for labels, stats in pools.values()}))
+    if replica_states:
+        lines.extend(render_gauge("app_db_replica_healthy", "Whether the replica receives reads.", {
+            (("pool", name),): int(healthy) for name, (healthy, _) in replica_states.items()
+        }))
+        lines.extend(render_gauge("app_db_replica_lag_seconds", "Replication lag seen by the last health check.", {
+            (("pool", name),): lag for name, (_, lag) in replica_states.items() if lag is not None
+        }))
+    if admission_stats:
+        lines.extend(render_gauge("app_admission_capacity", "Capacity units of the admission controller.",
+                                  {(): admission_stats["capacity"]}))
+        lines.extend(render_gauge("app_admission_used", "Capacity units taken by the connections of requests.",
+                                  {(): admission_stats["used"]}))
+        lines.extend(render_gauge("app_admission_waiting", "Requests queued for a connection.",
+                                  {(): admission_stats["waiting"]}))
+
+    lines.extend(render_gauge("app_cache_entries", "Cached results.", {(): cache_stats["entries"]}))
+    lines.extend(render_gauge("app_cache_bytes", "Approximate size of the cached results.", {(): cache_stats["bytes"]}))
+    cache_events = Counter("app_cache_events_total", "Response cache hits, misses, expirations and evictions.",
+                           ("endpoint", "event"))
+    for endpoint, counters in cache_stats["endpoints"].items():
+        for event, value in counters.items():
+            cache_events.inc((endpoint, event), value)
+    lines.extend(cache_events.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,51 @@
+import json
+import base64
+import binascii
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+# Name of the response header carrying the token of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Seek positions before the first row of a listing: every row sorts after them
+FIRST_PAGE_DESCENDING = (datetime.max.replace(tzinfo=timezone.utc), 2 ** 63 - 1)
+FIRST_PAGE_ASCENDING = (datetime.min.replace(tzinfo=timezone.utc), 0)
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """
+    Build the opaque continuation token pointing after a row of a listing.
+
+    Args:
+        sort_value (datetime): The sort key of the last returned row.
+        row_id (int): The id of the last returned row, breaking ties between equal sort keys.
+
+    Returns:
+        str: The URL-safe continuation token.
+    """
+    payload = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(token: Optional[str], descending: bool) -> Tuple[datetime, int]:
+    """
+    Turn a continuation token into the (sort key, id) seek position of the next page.
+
+    Args:
+        token (Optional[str]): The continuation token, None for the first page.
+        descending (bool): Whether the listing is sorted in descending order.
+
+    Returns:
+        Tuple[datetime, int]: The seek position, rows strictly after it belong to the page.
+
+    Raises:
+        ValueError: If the token is malformed.
+    """
+    if token is None:
+        return FIRST_PAGE_DESCENDING if descending else FIRST_PAGE_ASCENDING
+    try:
+        payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        sort_value, row_id = json.loads(payload)
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor '{token}'") from e
@@ -0,0 +1,217 @@
+import os
+import json
+import heapq
+import random
+import asyncio
+import contextvars
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional, Set
+
+from app.db.session import db_connection
+from app.utils.metrics import BACKGROUND_ROUTE
+
+# Initialize a logger for this module
+logger = logging.getLogger("app.utils.slow_queries")
+
+# Queries running longer than this are recorded, 0 disables the slow-query log
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500"))
+# Share of the slow queries re-run with EXPLAIN (ANALYZE, BUFFERS) to capture their plan
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0.1"))
+# Statement timeout of the EXPLAIN re-runs
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "30000"))
+# Rotating JSON lines file receiving the records
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", "logs/slow_queries.jsonl")
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+# Parameters whose value is replaced in the records (free text typed by the API clients)
+SLOW_QUERY_REDACTED_PARAMS = {
+    name.strip() for name in os.getenv("SLOW_QUERY_REDACTED_PARAMS", "query").split(",") if name.strip()
+}
+# Number of slowest records kept in memory for the admin endpoint
+SLOW_QUERY_KEEP = int(os.getenv("SLOW_QUERY_KEEP", "50"))
+
+# Queries writing the precomputed tables, never re-run to capture their plan
+WRITE_QUERY_PREFIX = "refresh_"
+
+REDACTED = "<redacted>"
+MAX_PARAM_LENGTH = 200
+
+
+def explain_statement(filename: str, route: str, timed_out: bool) -> Optional[str]:
+    """
+    Return the EXPLAIN prefix capturing the plan of a slow execution, None when it must not be re-run.
+
+    Only the read-only queries run for a request are explained: the refreshes write the precomputed
+    tables, and re-running them would take their locks again for as long. A query cancelled past its
+    budget is explained without ANALYZE, which would run it to the end.
+
+    Args:
+        filename (str): The name of the SQL file.
+        route (str): The route the query ran for, `background` outside of a request.
+        timed_out (bool): Whether the query was cancelled past its budget.
+    """
+    if route == BACKGROUND_ROUTE or filename.startswith(WRITE_QUERY_PREFIX):
+        return None
+    if timed_out:
+        return "EXPLAIN (FORMAT JSON)"
+    return "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)"
+
+
+def redact_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return JSON-friendly query parameters with the configured parameters redacted and long values truncated.
+    """
+    redacted = {}
+    for name, value in params.items():
+        if name in SLOW_QUERY_REDACTED_PARAMS:
+            value = REDACTED
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        elif not isinstance(value, (int, float, bool, type(None))):
+            value = str(value)
+            if len(value) > MAX_PARAM_LENGTH:
+                value = value[:MAX_PARAM_LENGTH] + "..."
+        redacted[name] = value
+    return redacted
+
+
+class SlowQueryLog:
+    """
+    Record the queries running past a threshold, with a sample of their EXPLAIN ANALYZE plans.
+
+    Every record is appended to a rotating JSON lines file; the slowest ones and per-query
+    aggregates are kept in memory. Plans are captured by re-running a sampled request query with
+    `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)` on its own connection, in a transaction that
+    is rolled back, one capture at a time. Queries cancelled past their budget are recorded too,
+    and explained without ANALYZE.
+    """
+
+    def __init__(self, threshold_ms: float, explain_rate: float, keep: int):
+        self.threshold_ms = threshold_ms
+        self.explain_rate = explain_rate
+        self.keep = keep
+        self._worst: List[tuple] = []
+        self._sequence = 0
+        self._stats: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+        self._explaining = False
+        self._tasks: Set[asyncio.Task] = set()
+        self._file_logger: Optional[logging.Logger] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        if self._file_logger is None:
+            directory = os.path.dirname(SLOW_QUERY_LOG_FILE)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(
+                SLOW_QUERY_LOG_FILE, maxBytes=SLOW_QUERY_LOG_MAX_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._file_logger = logging.getLogger("app.slow_queries")
+            self._file_logger.addHandler(handler)
+            self._file_logger.propagate = False
+            self._file_logger.setLevel(logging.INFO)
+        self._file_logger.info(json.dumps(record, default=str))
+
+    def _keep(self, record: Dict[str, Any]) -> None:
+        self._sequence += 1
+        entry = (record["duration_ms"], self._sequence, record)
+        if len(self._worst) < self.keep:
+            heapq.heappush(self._worst, entry)
+        else:
+            heapq.heappushpop(self._worst, entry)
+
+    def record(
+            self, filename: str, sql_query: str, params: Dict[str, Any], duration_ms: float, route: str,
+            timed_out: bool = False
+    ) -> None:
+        """
+        Record a query execution if it ran past the threshold or was cancelled past its budget.
+
+        Args:
+            filename (str): The name of the SQL file.
+            sql_query (str): The SQL text, re-run when the plan is captured.
+            params (Dict[str, Any]): The bound parameters.
+            duration_ms (float): The execution time in milliseconds, until the cancellation if it timed out.
+            route (str): The route the query ran for.
+            timed_out (bool): Whether the query was cancelled past its budget.
+        """
+        if not self.enabled or (duration_ms < self.threshold_ms and not timed_out):
+            return
+
+        stats = self._stats[filename]
+        stats[0] += 1
+        stats[1] += duration_ms
+        stats[2] = max(stats[2], duration_ms)
+
+        record = {
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "query": filename,
+            "route": route,
+            "duration_ms": round(duration_ms, 2),
+            "timed_out": timed_out,
+            "params": redact_params(params),
+            "plan": None,
+        }
+        outcome = "timed out after" if timed_out else "took"
+        logger.warning(f"Slow query {filename} {outcome} {duration_ms:.0f} ms with {record['params']}")
+        self._keep(record)
+
+        explain = explain_statement(filename, route, timed_out)
+        if explain is not None and not self._explaining and random.random() < self.explain_rate:
+            self._explaining = True
+            # Run the capture as background work, outside the admission slots, routing and metrics of the request
+            task = asyncio.create_task(
+                self._explain(record, explain, sql_query, params), context=contextvars.Context()
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            self._write(record)
+
+    async def _explain(self, record: Dict[str, Any], explain: str, sql_query: str, params: Dict[str, Any]) -> None:
+        try:
+            async with db_connection() as connection:
+                async with connection.transaction(force_rollback=True):
+                    cursor = connection.cursor()
+                    try:
+                        await cursor.execute(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}")
+                        await cursor.execute(f"{explain} {sql_query.rstrip().rstrip(';')}", params)
+                        record["plan"] = (await cursor.fetchone())[0]
+                    finally:
+                        await cursor.close()
+        except Exception as e:
+            logger.error(f"Failed to capture the plan of {record['query']}: {e}")
+        finally:
+            self._explaining = False
+            self._write(record)
+
+    def worst(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Return the slowest recorded queries, slowest first.
+        """
+        return [record for _, _, record in heapq.nlargest(limit, self._worst)]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Return the number, mean and maximum duration of the slow executions of each query, worst first.
+        """
+        return sorted(
+            (
+                {"query": filename, "count": int(count), "mean_duration_ms": round(total / count, 2),
+                 "max_duration_ms": round(maximum, 2)}
+                for filename, (count, total, maximum) in self._stats.items()
+            ),
+            key=lambda item: item["max_duration_ms"],
+            reverse=True,
+        )
+
+
+# Slow-query log shared by the query helpers
+slow_query_log = SlowQueryLog(SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_EXPLAIN_RATE, SLOW_QUERY_KEEP)
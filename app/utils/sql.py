@@ -1,4 +1,24 @@
 import os
+import re
+import time
+import logging
+from typing import Dict, List, Set
+
+import psycopg
+
+from app.utils.metrics import current_route, observe_rows, phase_timer, record_error
+from app.utils.slow_queries import slow_query_log
+from app.utils.timeouts import QueryTimeout, query_budget, query_timeout
+
+# Initialize a logger for this module
+logger = logging.getLogger("app.utils.sql")
+
+# Directory holding the SQL files shipped with the application
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'sql_queries')
+
+# Named placeholders and escaped percent signs are consumed whole, any other '%' is captured by the group
+PLACEHOLDER = re.compile(r"%(?:%|\(\w+\)s)|(%)")
+
 
 def load_sql_query(filename: str) -> str:
     """
@@ -13,11 +33,154 @@ def load_sql_query(filename: str) -> str:
     Raises:
         FileNotFoundError: If the SQL file does not exist.
     """
-    current_dir = os.path.dirname(__file__)
-    sql_path = os.path.join(os.path.dirname(os.path.dirname(current_dir)), 'sql_queries', filename)
+    sql_path = os.path.join(SQL_DIR, filename)
     try:
         with open(sql_path, 'r') as file:
             sql_query = file.read()
         return sql_query
     except FileNotFoundError:
         raise FileNotFoundError(f"SQL file '{filename}' not found in 'sql_queries' directory.")
+
+
+def has_malformed_placeholder(sql_query: str) -> bool:
+    """
+    Check whether a query contains a '%' that is neither a `%(name)s` placeholder nor an escaped `%%`.
+
+    Args:
+        sql_query (str): The SQL query.
+
+    Returns:
+        bool: True if the query has a malformed placeholder.
+    """
+    return any(match.group(1) for match in PLACEHOLDER.finditer(sql_query))
+
+
+class SqlRegistry:
+    """
+    Registry of the SQL queries used by the services, loaded once at startup.
+
+    Services register the files they need at import time with `register`, the application
+    lifespan calls `load` so that a missing or malformed file stops the boot, and requests
+    only look up the already loaded text with `get`.
+    """
+
+    def __init__(self):
+        self._required: Set[str] = set()
+        self._queries: Dict[str, str] = {}
+
+    def register(self, filename: str) -> str:
+        """
+        Declare that a service executes the given SQL file.
+
+        Args:
+            filename (str): The name of the SQL file.
+
+        Returns:
+            str: The same file name, used as the query name.
+        """
+        self._required.add(filename)
+        return filename
+
+    def load(self) -> None:
+        """
+        Read and validate every SQL file under `sql_queries/`.
+
+        Raises:
+            FileNotFoundError: If a registered SQL file does not exist.
+            ValueError: If a SQL file is empty or contains a malformed placeholder.
+        """
+        queries = {}
+        for filename in sorted(os.listdir(SQL_DIR)):
+            if not filename.endswith('.sql'):
+                continue
+            sql_query = load_sql_query(filename)
+            if not sql_query.strip():
+                raise ValueError(f"SQL file '{filename}' is empty.")
+            if has_malformed_placeholder(sql_query):
+                raise ValueError(f"SQL file '{filename}' contains a malformed placeholder.")
+            queries[filename] = sql_query
+
+        missing = self._required - queries.keys()
+        if missing:
+            raise FileNotFoundError(
+                f"SQL files not found in 'sql_queries' directory: {', '.join(sorted(missing))}."
+            )
+
+        self._queries = queries
+        logger.info(f"Loaded {len(queries)} SQL queries")
+
+    def get(self, filename: str) -> str:
+        """
+        Return the text of a loaded SQL query.
+
+        Args:
+            filename (str): The name of the SQL file.
+
+        Returns:
+            str: The SQL query as a string.
+
+        Raises:
+            KeyError: If the query was not loaded.
+        """
+        return self._queries[filename]
+
+
+# Registry shared by all services
+sql_registry = SqlRegistry()
+
+
+async def execute_query(cursor, filename: str, params: dict) -> None:
+    """
+    Execute a registered SQL query as a server-side prepared statement.
+
+    psycopg prepares the statement the first time a pooled connection runs it and reuses
+    the prepared plan on that connection afterwards. Executions running past the slow-query
+    threshold are recorded in the slow-query log. The query is cancelled on the server when it
+    runs past the latency budget of the current route, and recorded in the slow-query log as timed out.
+
+    Args:
+        cursor: The database cursor.
+        filename (str): The name of the registered SQL file.
+        params (dict): The query parameters.
+
+    Raises:
+        QueryTimeout: If the query ran past its budget or the server's statement_timeout.
+    """
+    sql_query = sql_registry.get(filename)
+    route = current_route()
+    with phase_timer("execute"):
+        started = time.perf_counter()
+        try:
+            async with query_budget(filename, query_timeout(route)):
+                await cursor.execute(sql_query, params, prepare=True)
+        except psycopg.errors.QueryCanceled:
+            record_error("QueryCanceled")
+            slow_query_log.record(
+                filename, sql_query, params, (time.perf_counter() - started) * 1000, route, timed_out=True
+            )
+            raise QueryTimeout(filename) from None
+        except QueryTimeout:
+            slow_query_log.record(
+                filename, sql_query, params, (time.perf_counter() - started) * 1000, route, timed_out=True
+            )
+            raise
+        except psycopg.Error as e:
+            record_error(type(e).__name__)
+            raise
+    slow_query_log.record(filename, sql_query, params, (time.perf_counter() - started) * 1000, route)
+
+
+async def fetch_all(cursor) -> List:
+    """
+    Fetch every row of the executed query, recording the fetch time and the number of rows.
+
+    Args:
+        cursor: The database cursor.
+
+    Returns:
+        List: The rows.
+    """
+    with phase_timer("fetch"):
+        rows = await cursor.fetchall()
+    observe_rows(len(rows))
+    return rows
@@ -0,0 +1,177 @@
+import io
+import os
+import csv
+import time
+import logging
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, Dict, List, Optional, Type
+
+import psycopg
+from psycopg.rows import dict_row
+from pydantic import BaseModel
+
+from app.db.session import db_connection
+from app.utils.metrics import current_route, phase_timer
+from app.utils.slow_queries import slow_query_log
+from app.utils.sql import sql_registry
+from app.utils.timeouts import QueryTimeout, query_budget, query_timeout
+
+# Initialize a logger for this module
+logger = logging.getLogger("app.utils.streaming")
+
+# Media types of the streamed representations, selected with the Accept header
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+STREAM_MEDIA_TYPES = (NDJSON_MEDIA_TYPE, CSV_MEDIA_TYPE)
+
+# Number of rows fetched from the server-side cursor per round trip
+STREAM_ITERSIZE = int(os.getenv("STREAM_ITERSIZE", "1000"))
+
+# OpenAPI description of the streamed representations, for the `responses` of a route
+STREAM_RESPONSES: Dict[int, Dict[str, Any]] = {
+    200: {"content": {NDJSON_MEDIA_TYPE: {}, CSV_MEDIA_TYPE: {}}}
+}
+
+
+def negotiate_stream_format(accept: Optional[str]) -> Optional[str]:
+    """
+    Return the streamed media type requested by an Accept header, None for a regular JSON response.
+
+    Args:
+        accept (Optional[str]): The value of the Accept header.
+
+    Returns:
+        Optional[str]: `application/x-ndjson`, `text/csv` or None.
+    """
+    if not accept:
+        return None
+    for media_range in accept.split(","):
+        media_type = media_range.split(";")[0].strip().lower()
+        if media_type in STREAM_MEDIA_TYPES:
+            return media_type
+    return None
+
+
+def encode_rows(models: List[BaseModel], model: Type[BaseModel], media_type: str, header: bool) -> bytes:
+    """
+    Serialize a batch of rows in the streamed media type.
+
+    Args:
+        models (List[BaseModel]): The validated rows.
+        model (Type[BaseModel]): The schema of the rows, whose fields are the CSV columns.
+        media_type (str): `application/x-ndjson` or `text/csv`.
+        header (bool): Whether to start the batch with the CSV header line.
+
+    Returns:
+        bytes: The encoded batch.
+    """
+    if media_type == NDJSON_MEDIA_TYPE:
+        return b"".join(item.model_dump_json().encode() + b"\n" for item in models)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    fields = list(model.model_fields)
+    if header:
+        writer.writerow(fields)
+    for item in models:
+        values = item.model_dump(mode="json")
+        writer.writerow([values[field] for field in fields])
+    return buffer.getvalue().encode()
+
+
+def stream_models(models: List[BaseModel], model: Type[BaseModel], media_type: str) -> Optional[AsyncIterator[bytes]]:
+    """
+    Stream rows already in memory in batches of `STREAM_ITERSIZE`, like `open_row_stream`.
+
+    Args:
+        models (List[BaseModel]): The validated rows.
+        model (Type[BaseModel]): The schema of the rows.
+        media_type (str): `application/x-ndjson` or `text/csv`.
+
+    Returns:
+        Optional[AsyncIterator[bytes]]: The encoded batches, or None if there are no rows.
+    """
+    if not models:
+        return None
+
+    async def batches() -> AsyncIterator[bytes]:
+        for start in range(0, len(models), STREAM_ITERSIZE):
+            yield encode_rows(models[start:start + STREAM_ITERSIZE], model, media_type, start == 0)
+
+    return batches()
+
+
+async def open_row_stream(
+        filename: str,
+        params: Dict[str, Any],
+        model: Type[BaseModel],
+        media_type: str
+) -> Optional[AsyncIterator[bytes]]:
+    """
+    Run a registered query through a named server-side cursor and stream its rows in batches.
+
+    The query is executed and its first batch fetched before returning, so that database errors, empty
+    results and the latency budget of the route apply before the response starts. The connection is held (inside a transaction,
+    which server-side cursors require) until the returned iterator is exhausted or closed.
+
+    Args:
+        filename (str): The name of the registered SQL file.
+        params (Dict[str, Any]): The query parameters.
+        model (Type[BaseModel]): The schema validating each row.
+        media_type (str): `application/x-ndjson` or `text/csv`.
+
+    Returns:
+        Optional[AsyncIterator[bytes]]: The encoded batches, or None if the query returned no rows.
+    """
+    stack = AsyncExitStack()
+    try:
+        connection = await stack.enter_async_context(db_connection())
+        await stack.enter_async_context(connection.transaction())
+        cursor = connection.cursor(name=f"stream_{os.path.splitext(filename)[0]}", row_factory=dict_row)
+        cursor.itersize = STREAM_ITERSIZE
+        stack.push_async_callback(cursor.close)
+
+        sql_query = sql_registry.get(filename)
+        route = current_route()
+        with phase_timer("execute"):
+            started = time.perf_counter()
+            try:
+                async with query_budget(filename, query_timeout(route)):
+                    await cursor.execute(sql_query, params)
+                    rows = await cursor.fetchmany(STREAM_ITERSIZE)
+            except psycopg.errors.QueryCanceled:
+                slow_query_log.record(
+                    filename, sql_query, params, (time.perf_counter() - started) * 1000, route, timed_out=True
+                )
+                raise QueryTimeout(filename) from None
+            except QueryTimeout:
+                slow_query_log.record(
+                    filename, sql_query, params, (time.perf_counter() - started) * 1000, route, timed_out=True
+                )
+                raise
+        slow_query_log.record(filename, sql_query, params, (time.perf_counter() - started) * 1000, route)
+    except BaseException:
+        await stack.aclose()
+        raise
+
+    if not rows:
+        await stack.aclose()
+        return None
+
+    async def batches() -> AsyncIterator[bytes]:
+        batch, header, count = rows, True, 0
+        try:
+            while batch:
+                count += len(batch)
+                yield encode_rows([model(**row) for row in batch], model, media_type, header)
+                header = False
+                batch = await cursor.fetchmany(STREAM_ITERSIZE)
+            logger.debug(f"Streamed {count} rows of {filename}")
+        except Exception as e:
+            # The response has already started, the client sees a truncated body
+            logger.error(f"Error while streaming {filename} after {count} rows: {e}")
+            raise
+        finally:
+            await stack.aclose()
+
+    return batches()
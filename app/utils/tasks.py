@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+# Initialize a logger for this module
+logger = logging.getLogger("app.utils.tasks")
+
+
+def start_periodic_task(name: str, interval: float, func: Callable[[], Awaitable]) -> Optional[asyncio.Task]:
+    """
+    Run a coroutine function every `interval` seconds in the background.
+
+    Errors are logged and do not stop the task.
+
+    Args:
+        name (str): The name of the task, used in the logs.
+        interval (float): Seconds between two runs; the task is not started when it is 0 or less.
+        func (Callable[[], Awaitable]): The coroutine function to run.
+
+    Returns:
+        Optional[asyncio.Task]: The background task, or None when it is disabled.
+    """
+    if interval <= 0:
+        logger.info(f"Periodic task '{name}' is disabled")
+        return None
+
+    async def run():
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await func()
+                logger.debug(f"Periodic task '{name}' completed")
+            except Exception as e:
+                logger.error(f"Periodic task '{name}' failed: {e}")
+
+    logger.info(f"Starting periodic task '{name}' every {interval} seconds")
+    return asyncio.create_task(run(), name=name)
+
+
+async def stop_periodic_tasks(tasks: List[Optional[asyncio.Task]]) -> None:
+    """
+    Cancel the given background tasks and wait for them to finish.
+
+    Args:
+        tasks (List[Optional[asyncio.Task]]): The tasks returned by `start_periodic_task`.
+    """
+    running = [task for task in tasks if task is not None]
+    for task in running:
+        task.cancel()
+    await asyncio.gather(*running, return_exceptions=True)
@@ -0,0 +1,124 @@
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException, Request, Response
+
+# Initialize a logger for this module
+logger = logging.getLogger("app.utils.timeouts")
+
+# Latency budget of each query run for a request in milliseconds, 0 disables it
+QUERY_TIMEOUT_MS = float(os.getenv("QUERY_TIMEOUT_MS", "30000"))
+
+
+def parse_route_settings(value: str) -> Dict[str, float]:
+    """
+    Parse comma separated `route=number` entries, e.g. `/v2/users/{user_id}/friends=2000`.
+
+    Args:
+        value (str): The entries.
+
+    Returns:
+        Dict[str, float]: The number set for each route template.
+
+    Raises:
+        ValueError: If an entry has no `=` or its value is not a number.
+    """
+    settings = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        route, separator, number = entry.rpartition("=")
+        if not separator or not route.strip():
+            raise ValueError(f"Invalid route setting {entry.strip()!r}, expected route=number")
+        settings[route.strip()] = float(number)
+    return settings
+
+
+# Per-route budgets overriding QUERY_TIMEOUT_MS
+ROUTE_QUERY_TIMEOUTS_MS = parse_route_settings(os.getenv("ROUTE_QUERY_TIMEOUTS_MS", ""))
+
+# Status of the requests whose client went away before the response, as logged by nginx
+CLIENT_CLOSED_REQUEST = 499
+
+
+class QueryTimeout(HTTPException):
+    """
+    A query ran past the latency budget of its route, or was cancelled by the server's statement_timeout.
+    """
+
+    def __init__(self, filename: str):
+        super().__init__(status_code=504, detail="The query timed out.")
+        self.filename = filename
+
+
+def query_timeout(route: str) -> Optional[float]:
+    """
+    Return the budget in seconds of the queries of a route, None when they are not limited.
+
+    Args:
+        route (str): The route template, `background` outside of a request.
+    """
+    milliseconds = ROUTE_QUERY_TIMEOUTS_MS.get(route, QUERY_TIMEOUT_MS)
+    return milliseconds / 1000 if milliseconds > 0 else None
+
+
+@asynccontextmanager
+async def query_budget(filename: str, seconds: Optional[float]) -> AsyncIterator[None]:
+    """
+    Cancel the enclosed query when it runs past `seconds`, raising QueryTimeout.
+
+    Cancelling the task running a query makes psycopg send a cancel request to the server, so the
+    backend stops working on it and the connection is returned to the pool idle.
+
+    Args:
+        filename (str): The name of the SQL file, for the logs.
+        seconds (Optional[float]): The budget, None for no limit.
+    """
+    if seconds is None:
+        yield
+        return
+    try:
+        async with asyncio.timeout(seconds):
+            yield
+    except TimeoutError:
+        logger.warning(f"Query {filename} cancelled after {seconds * 1000:.0f} ms")
+        raise QueryTimeout(filename) from None
+
+
+async def cancel_on_disconnect(request: Request, handler: Callable[[Request], Awaitable[Response]]) -> Response:
+    """
+    Run a route handler, cancelling it, and with it its running query, when the client disconnects.
+
+    The request body is read first, so that watching for the disconnect message does not consume it.
+
+    Args:
+        request (Request): The request.
+        handler (Callable[[Request], Awaitable[Response]]): The route handler.
+
+    Returns:
+        Response: The handler response, or an empty 499 response when the client went away.
+    """
+    await request.body()
+
+    async def disconnected() -> None:
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+
+    task = asyncio.ensure_future(handler(request))
+    watcher = asyncio.ensure_future(disconnected())
+    try:
+        await asyncio.wait((task, watcher), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+            # Let the query be cancelled and the connection released before returning
+            await asyncio.wait((task,))
+
+    if not task.cancelled():
+        return task.result()
+    logger.info(f"Client disconnected, cancelled {request.method} {request.url.path}")
+    return Response(status_code=CLIENT_CLOSED_REQUEST)
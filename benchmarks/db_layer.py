@@ -0,0 +1,146 @@
+"""
+Throughput benchmark of the synchronous psycopg2 path against the asynchronous psycopg pool.
+
+The synchronous side reproduces how the API used to serve requests: a fixed number of worker
+threads (FastAPI's threadpool) sharing a psycopg2 connection pool. The asynchronous side runs
+the same queries as coroutines on a single event loop over `psycopg_pool.AsyncConnectionPool`.
+
+Usage:
+    python -m benchmarks.db_layer --query get_posts_users.sql --requests 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2.extras
+from psycopg2 import pool
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from app.db.session import get_conninfo
+from app.utils.pagination import FIRST_PAGE_DESCENDING
+from app.utils.sql import load_sql_query
+
+# Parameter sets used for each query, one is picked at random per request
+SAMPLE_PARAMS = {
+    "get_posts_users.sql": [{"postid": post_id} for post_id in (1, 2, 3, 5, 8, 13, 21, 34)],
+    "get_users_friends.sql": [
+        {"userid": user_id, "limit": None,
+         "after_date": FIRST_PAGE_DESCENDING[0], "after_id": FIRST_PAGE_DESCENDING[1]}
+        for user_id in (1, 2, 3, 4, 5)
+    ],
+    "get_tags_stats.sql": [{"tagname": tag} for tag in ("linux", "windows", "networking")],
+    "get_posts_duration_limit.sql": [{"duration_in_minutes": 5, "limit": 10}],
+    "get_posts_limit_query.sql": [{"query": "%linux%", "limit": 10}],
+    "get_users_id_badge_hist.sql": [{"userid": user_id} for user_id in (1, 2, 3, 4, 5)],
+    "get_tags_comments_count.sql": [{"tagname": "networking", "comments_count": 40}],
+    "get_tags_comments_pos_lim.sql": [{"tagname": "linux", "position": 2, "limit": 10}],
+    "get_posts_id_limit.sql": [{"postid": 1, "limit": 10}],
+}
+
+
+# Queries taking the tag ids resolved by the tag dictionary instead of the tag name
+TAG_ID_QUERIES = {"get_tags_comments_count.sql", "get_tags_comments_pos_lim.sql"}
+
+
+def resolve_tag_ids(params: list) -> list:
+    """
+    Replace the tag name of each parameter set with the ids of the tags of that name.
+    """
+    connection = psycopg2.connect(get_conninfo())
+    try:
+        with connection.cursor() as cursor:
+            resolved = []
+            for param in params:
+                param = dict(param)
+                cursor.execute(
+                    "SELECT coalesce(array_agg(id), '{}') FROM tags WHERE tagname = %s",
+                    (param.pop("tagname"),)
+                )
+                resolved.append({**param, "tag_ids": cursor.fetchone()[0]})
+            return resolved
+    finally:
+        connection.close()
+
+
+def run_sync(sql_query: str, params: list, requests: int, threads: int, pool_size: int) -> float:
+    """
+    Run the query `requests` times from `threads` worker threads over a psycopg2 pool.
+
+    Returns:
+        float: Elapsed wall-clock time in seconds.
+    """
+    connection_pool = pool.ThreadedConnectionPool(minconn=pool_size, maxconn=pool_size, dsn=get_conninfo())
+
+    def worker(_):
+        conn = connection_pool.getconn()
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                cursor.execute(sql_query, random.choice(params))
+                cursor.fetchall()
+            conn.rollback()
+        finally:
+            connection_pool.putconn(conn)
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(worker, range(requests)))
+        return time.perf_counter() - started
+    finally:
+        connection_pool.closeall()
+
+
+async def run_async(sql_query: str, params: list, requests: int, concurrency: int, pool_size: int) -> float:
+    """
+    Run the query `requests` times with at most `concurrency` coroutines in flight.
+
+    Returns:
+        float: Elapsed wall-clock time in seconds.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    async with AsyncConnectionPool(
+        conninfo=get_conninfo(),
+        min_size=pool_size,
+        max_size=pool_size,
+        kwargs={"autocommit": True},
+    ) as connection_pool:
+        await connection_pool.wait()
+
+        async def worker():
+            async with semaphore, connection_pool.connection() as conn:
+                async with conn.cursor(row_factory=dict_row) as cursor:
+                    await cursor.execute(sql_query, random.choice(params))
+                    await cursor.fetchall()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(requests)))
+        return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--query", default="get_posts_users.sql", choices=sorted(SAMPLE_PARAMS))
+    parser.add_argument("--requests", type=int, default=2000, help="Total number of queries to run")
+    parser.add_argument("--concurrency", type=int, default=200, help="Coroutines in flight on the async path")
+    parser.add_argument("--threads", type=int, default=40, help="Worker threads on the sync path")
+    parser.add_argument("--pool-size", type=int, default=20, help="Connections in each pool")
+    args = parser.parse_args()
+
+    sql_query = load_sql_query(args.query)
+    params = SAMPLE_PARAMS[args.query]
+    if args.query in TAG_ID_QUERIES:
+        params = resolve_tag_ids(params)
+
+    sync_elapsed = run_sync(sql_query, params, args.requests, args.threads, args.pool_size)
+    async_elapsed = asyncio.run(run_async(sql_query, params, args.requests, args.concurrency, args.pool_size))
+
+    print(f"query: {args.query}, requests: {args.requests}, pool size: {args.pool_size}")
+    print(f"sync  (psycopg2, {args.threads} threads): {sync_elapsed:8.3f}s  {args.requests / sync_elapsed:10.1f} req/s")
+    print(f"async (psycopg, {args.concurrency} in flight): {async_elapsed:8.3f}s  {args.requests / async_elapsed:10.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
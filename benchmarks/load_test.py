@@ -0,0 +1,369 @@
+"""
+HTTP load test of the /v2 endpoints with a generated or replayed request mix.
+
+A workload is a JSONL file with one request per line: {"route": ..., "path": ..., "headers": {...}}.
+`generate` draws a realistic mix of the nine /v2 routes with parameters sampled from the configured
+database. `run` replays a workload against a running API, in closed-loop mode (`--concurrency`
+clients sending their next request as soon as the previous one completes) or in open-loop mode
+(`--rate` requests per second regardless of the response times, latencies are measured from the
+scheduled send time). It reports p50/p95/p99 latency, throughput and error rate per route and
+writes them as JSON; `compare` diffs two result files.
+
+Usage:
+    python -m benchmarks.load_test generate --requests 5000 --output workload.jsonl
+    python -m benchmarks.load_test run --workload workload.jsonl --concurrency 50 --output before.json
+    python -m benchmarks.load_test run --workload workload.jsonl --rate 200 --output after.json
+    python -m benchmarks.load_test compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+from urllib.parse import quote, urlencode
+
+import httpx
+import psycopg
+
+# Default share of each route in a generated workload
+ROUTE_WEIGHTS = {
+    "posts_users": 15,
+    "users_friends": 10,
+    "tags_stats": 15,
+    "posts_duration_limit": 10,
+    "posts_limit_query": 15,
+    "users_id_badge_hist": 10,
+    "tags_comments_count": 5,
+    "tags_comments_pos_lim": 10,
+    "posts_id_limit": 10,
+}
+
+# Queries sampling the parameters of the generated requests, a sample table of the database is used first
+SAMPLE_QUERIES = {
+    "post_ids": "SELECT DISTINCT postid FROM comments TABLESAMPLE SYSTEM (%(percent)s) WHERE postid IS NOT NULL",
+    "thread_ids": "SELECT DISTINCT parentid FROM posts TABLESAMPLE SYSTEM (%(percent)s) WHERE parentid IS NOT NULL",
+    "user_ids": "SELECT DISTINCT userid FROM comments TABLESAMPLE SYSTEM (%(percent)s) WHERE userid IS NOT NULL",
+    "badge_user_ids": "SELECT DISTINCT userid FROM badges TABLESAMPLE SYSTEM (%(percent)s) WHERE userid IS NOT NULL",
+}
+TAGS_QUERY = "SELECT tagname FROM tags ORDER BY count DESC NULLS LAST LIMIT 100"
+
+
+def sample_values(conn: psycopg.Connection, sql_query: str, size: int, percent: float) -> list:
+    """
+    Sample up to `size` values with a TABLESAMPLE query, reading the first rows of small tables instead.
+    """
+    values = [row[0] for row in conn.execute(f"{sql_query} LIMIT %(size)s", {"percent": percent, "size": size})]
+    if not values:
+        full_scan = sql_query.replace(" TABLESAMPLE SYSTEM (%(percent)s)", "")
+        values = [row[0] for row in conn.execute(f"{full_scan} LIMIT %(size)s", {"size": size})]
+    if not values:
+        raise RuntimeError(f"No sample values returned by: {sql_query}")
+    return values
+
+
+def request_builders(samples: Dict[str, list], rng: random.Random) -> Dict[str, Callable[[], dict]]:
+    """
+    Return a function building a random request for each route.
+    """
+    def tag() -> str:
+        return quote(rng.choice(samples["tags"]), safe="")
+
+    def get(route: str, path: str, **params) -> dict:
+        return {"route": route, "path": f"{path}?{urlencode(params)}" if params else path, "headers": {}}
+
+    return {
+        "posts_users": lambda: get(
+            "posts_users", f"/v2/posts/{rng.choice(samples['post_ids'])}/users"),
+        "users_friends": lambda: get(
+            "users_friends", f"/v2/users/{rng.choice(samples['user_ids'])}/friends"),
+        "tags_stats": lambda: get(
+            "tags_stats", f"/v2/tags/{tag()}/stats"),
+        "posts_duration_limit": lambda: get(
+            "posts_duration_limit", "/v2/posts/q1/",
+            duration=rng.choice((5, 60, 300, 1440)), limit=rng.choice((10, 50, 100))),
+        "posts_limit_query": lambda: get(
+            "posts_limit_query", "/v2/posts/q2/",
+            limit=rng.choice((10, 50)), query=rng.choice(samples["tags"]),
+            mode=rng.choices(("substring", "fulltext", "ranked"), weights=(6, 3, 1))[0]),
+        "users_id_badge_hist": lambda: get(
+            "users_id_badge_hist", f"/v2/users/{rng.choice(samples['badge_user_ids'])}/badge_history"),
+        "tags_comments_count": lambda: get(
+            "tags_comments_count", f"/v2/tags/{tag()}/comments/", comments_count=rng.choice((5, 10, 20, 40))),
+        "tags_comments_pos_lim": lambda: get(
+            "tags_comments_pos_lim", f"/v2/tags/{tag()}/comments/{rng.randint(1, 5)}", limit=rng.choice((10, 50))),
+        "posts_id_limit": lambda: get(
+            "posts_id_limit", f"/v2/posts/{rng.choice(samples['thread_ids'])}", limit=rng.choice((10, 50, 100))),
+    }
+
+
+def generate_workload(count: int, weights: Dict[str, float], seed: int, sample_percent: float) -> List[dict]:
+    """
+    Generate `count` requests of the weighted route mix, with parameters sampled from the database.
+    """
+    # Imported here so that `run --workload` and `compare` do not need the database settings
+    from app.db.session import get_conninfo
+
+    rng = random.Random(seed)
+    with psycopg.connect(get_conninfo(), autocommit=True) as conn:
+        conn.execute("SELECT setseed(%s)", (rng.random(),))
+        samples = {
+            name: sample_values(conn, sql_query, 1000, sample_percent) for name, sql_query in SAMPLE_QUERIES.items()
+        }
+        samples["tags"] = [row[0] for row in conn.execute(TAGS_QUERY)]
+
+    builders = request_builders(samples, rng)
+    routes = [route for route in weights if weights[route] > 0]
+    chosen = rng.choices(routes, weights=[weights[route] for route in routes], k=count)
+    return [builders[route]() for route in chosen]
+
+
+def parse_weights(mix: Optional[str]) -> Dict[str, float]:
+    """
+    Parse a `route=weight,...` override of the default route weights.
+    """
+    weights = dict(ROUTE_WEIGHTS)
+    for item in filter(None, (mix or "").split(",")):
+        route, _, weight = item.partition("=")
+        if route not in weights:
+            raise ValueError(f"Unknown route '{route}', expected one of {sorted(weights)}")
+        weights[route] = float(weight)
+    return weights
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an ascending list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """
+    Collect the latency and status of every response, grouped by route.
+    """
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, route: str, latency: float, status: str) -> None:
+        self.latencies[route].append(latency)
+        self.statuses[route][status] += 1
+
+    @staticmethod
+    def is_error(status: str) -> bool:
+        # 404 is a regular answer of the API for unknown or empty resources
+        return not status.isdigit() or (int(status) >= 400 and status != "404")
+
+    def summary(self, latencies: List[float], statuses: Dict[str, int], elapsed: float) -> dict:
+        values = sorted(latencies)
+        errors = sum(count for status, count in statuses.items() if self.is_error(status))
+        return {
+            "requests": len(values),
+            "errors": errors,
+            "error_rate": round(errors / len(values), 4) if values else 0.0,
+            "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+            "statuses": dict(sorted(statuses.items())),
+            "latency_ms": {
+                "mean": round(1000 * sum(values) / len(values), 2) if values else 0.0,
+                "p50": round(1000 * percentile(values, 0.50), 2),
+                "p95": round(1000 * percentile(values, 0.95), 2),
+                "p99": round(1000 * percentile(values, 0.99), 2),
+                "max": round(1000 * values[-1], 2) if values else 0.0,
+            },
+        }
+
+    def results(self, elapsed: float) -> dict:
+        all_latencies = [latency for latencies in self.latencies.values() for latency in latencies]
+        all_statuses: Dict[str, int] = defaultdict(int)
+        for statuses in self.statuses.values():
+            for status, count in statuses.items():
+                all_statuses[status] += count
+        return {
+            "total": self.summary(all_latencies, all_statuses, elapsed),
+            "routes": {
+                route: self.summary(self.latencies[route], self.statuses[route], elapsed)
+                for route in sorted(self.latencies)
+            },
+        }
+
+
+async def send(client: httpx.AsyncClient, request: dict, recorder: Optional[Recorder], started: float) -> None:
+    """
+    Send a request and record its latency from `started` and its status (or exception name).
+    """
+    try:
+        response = await client.get(request["path"], headers=request.get("headers") or {})
+        await response.aread()
+        status = str(response.status_code)
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    if recorder is not None:
+        recorder.record(request["route"], time.perf_counter() - started, status)
+
+
+async def run_closed_loop(client: httpx.AsyncClient, requests: List[dict], concurrency: int,
+                          recorder: Optional[Recorder]) -> None:
+    """
+    `concurrency` clients each send their next request once the previous one has completed.
+    """
+    queue = iter(requests)
+
+    async def client_loop():
+        for request in queue:
+            await send(client, request, recorder, time.perf_counter())
+
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+
+
+async def run_open_loop(client: httpx.AsyncClient, requests: List[dict], rate: float,
+                        recorder: Optional[Recorder]) -> None:
+    """
+    Send the requests at a fixed rate whatever the response times, measuring latencies from the schedule.
+    """
+    tasks = []
+    started = time.perf_counter()
+    for index, request in enumerate(requests):
+        scheduled = started + index / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(client, request, recorder, scheduled)))
+    await asyncio.gather(*tasks)
+
+
+async def run_workload(args: argparse.Namespace, requests: List[dict]) -> dict:
+    """
+    Warm up, then replay the workload and return the results.
+    """
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        if args.invalidate_cache:
+            response = await client.post("/admin/cache/invalidate")
+            response.raise_for_status()
+        if args.warmup:
+            await run_closed_loop(client, requests[:args.warmup], args.concurrency, None)
+
+        recorder = Recorder()
+        started = time.perf_counter()
+        if args.rate:
+            await run_open_loop(client, requests, args.rate, recorder)
+        else:
+            await run_closed_loop(client, requests, args.concurrency, recorder)
+        elapsed = time.perf_counter() - started
+
+    return {
+        "config": {
+            "base_url": args.base_url,
+            "mode": "open" if args.rate else "closed",
+            "rate": args.rate,
+            "concurrency": args.concurrency,
+            "requests": len(requests),
+            "warmup": args.warmup,
+            "invalidate_cache": args.invalidate_cache,
+            "workload": args.workload,
+        },
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "elapsed_s": round(elapsed, 3),
+        **recorder.results(elapsed),
+    }
+
+
+def print_results(results: dict) -> None:
+    print(f"{'route':<24}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, stats in [*results["routes"].items(), ("total", results["total"])]:
+        latency = stats["latency_ms"]
+        print(f"{route:<24}{stats['requests']:>9}{stats['errors']:>8}{stats['throughput_rps']:>9.1f}"
+              f"{latency['p50']:>10.2f}{latency['p95']:>10.2f}{latency['p99']:>10.2f}")
+
+
+def compare_results(before: dict, after: dict) -> None:
+    print(f"{'route':<24}{'metric':>8}{'before':>12}{'after':>12}{'change':>10}")
+    routes = sorted(set(before["routes"]) | set(after["routes"]))
+    for route in [*routes, "total"]:
+        old = before["total"] if route == "total" else before["routes"].get(route)
+        new = after["total"] if route == "total" else after["routes"].get(route)
+        if old is None or new is None:
+            print(f"{route:<24} only in {'after' if old is None else 'before'}")
+            continue
+        metrics = [(name, old["latency_ms"][name], new["latency_ms"][name]) for name in ("p50", "p95", "p99")]
+        metrics.append(("req/s", old["throughput_rps"], new["throughput_rps"]))
+        metrics.append(("errors", old["error_rate"], new["error_rate"]))
+        for name, old_value, new_value in metrics:
+            change = f"{100 * (new_value - old_value) / old_value:+.1f}%" if old_value else "-"
+            print(f"{route:<24}{name:>8}{old_value:>12}{new_value:>12}{change:>10}")
+
+
+def read_workload(path: str) -> List[dict]:
+    with open(path, "r") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def write_json_lines(path: str, items: List[dict]) -> None:
+    with open(path, "w") as file:
+        for item in items:
+            file.write(json.dumps(item) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Generate a workload file from the database")
+    generate.add_argument("--requests", type=int, default=5000, help="Number of requests to generate")
+    generate.add_argument("--mix", help="Route weights overriding the defaults, e.g. tags_stats=30,posts_users=5")
+    generate.add_argument("--seed", type=int, default=42, help="Seed of the request mix")
+    generate.add_argument("--sample-percent", type=float, default=1.0, help="TABLESAMPLE percentage of the samples")
+    generate.add_argument("--output", required=True, help="Workload file to write")
+
+    run = commands.add_parser("run", help="Replay a workload against a running API")
+    source = run.add_mutually_exclusive_group(required=True)
+    source.add_argument("--workload", help="Workload file to replay")
+    source.add_argument("--generate", type=int, metavar="N", help="Generate N requests of the default mix instead")
+    run.add_argument("--base-url", default="http://localhost:8000", help="URL of the API")
+    run.add_argument("--concurrency", type=int, default=20, help="Clients (closed loop) or max connections (open loop)")
+    run.add_argument("--rate", type=float, help="Open loop: requests per second (closed loop when omitted)")
+    run.add_argument("--warmup", type=int, default=0, help="Requests sent before measuring")
+    run.add_argument("--timeout", type=float, default=30.0, help="Request timeout in seconds")
+    run.add_argument("--invalidate-cache", action="store_true", help="Empty the API response cache before the run")
+    run.add_argument("--output", help="Result file to write (JSON)")
+
+    compare = commands.add_parser("compare", help="Compare two result files")
+    compare.add_argument("before")
+    compare.add_argument("after")
+
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        requests = generate_workload(args.requests, parse_weights(args.mix), args.seed, args.sample_percent)
+        write_json_lines(args.output, requests)
+        print(f"Wrote {len(requests)} requests to {args.output}")
+
+    elif args.command == "run":
+        if args.workload:
+            requests = read_workload(args.workload)
+        else:
+            requests = generate_workload(args.generate, ROUTE_WEIGHTS, 42, 1.0)
+        results = asyncio.run(run_workload(args, requests))
+        print_results(results)
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(results, file, indent=2)
+        sys.exit(1 if results["total"]["errors"] else 0)
+
+    else:
+        with open(args.before, "r") as before, open(args.after, "r") as after:
+            compare_results(json.load(before), json.load(after))
+
+
+if __name__ == "__main__":
+    main()
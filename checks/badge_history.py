@@ -0,0 +1,71 @@
+"""
+Check that the badge history strategies return the same rows as the original query.
+
+Runs `get_users_id_badge_hist.sql` (correlated subquery per badge) and the alternative
+`lateral` and `merge` implementations for many users and reports every user whose rows
+differ. Rows are compared as sorted lists, since badges earned at the same time may come
+out in any order. Exits with status 1 on mismatch; `--timings` also prints the total
+execution time of each strategy.
+
+Usage:
+    python -m checks.badge_history --sample 500 --timings
+"""
+import argparse
+import sys
+import time
+from collections import defaultdict
+
+import psycopg
+
+from app.db.session import get_conninfo
+from app.services.users_id_badge_hist import BADGE_HISTORY_QUERIES
+from app.utils.sql import load_sql_query
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sample", type=int, default=0, help="Compare a random sample of users (0 compares all)")
+    parser.add_argument("--user-id", type=int, action="append", help="Compare this user (repeatable)")
+    parser.add_argument("--timings", action="store_true", help="Print the total execution time of each strategy")
+    args = parser.parse_args()
+
+    queries = {strategy: load_sql_query(filename) for strategy, filename in BADGE_HISTORY_QUERIES.items()}
+    reference = "correlated"
+    timings = defaultdict(float)
+
+    with psycopg.connect(get_conninfo(), autocommit=True) as conn:
+        if args.user_id:
+            users = [(user_id,) for user_id in args.user_id]
+        elif args.sample:
+            users = conn.execute(
+                "SELECT userid FROM (SELECT DISTINCT userid FROM badges WHERE userid IS NOT NULL) u "
+                "ORDER BY random() LIMIT %s", (args.sample,)
+            ).fetchall()
+        else:
+            users = conn.execute(
+                "SELECT DISTINCT userid FROM badges WHERE userid IS NOT NULL ORDER BY userid"
+            ).fetchall()
+
+        mismatches = 0
+        for (user_id,) in users:
+            results = {}
+            for strategy, sql_query in queries.items():
+                started = time.perf_counter()
+                results[strategy] = sorted(conn.execute(sql_query, {"userid": user_id}, prepare=True).fetchall())
+                timings[strategy] += time.perf_counter() - started
+            for strategy, rows in results.items():
+                if rows != results[reference]:
+                    mismatches += 1
+                    print(f"MISMATCH user {user_id} {strategy}:\n"
+                          f"  {reference}: {[row[:2] for row in results[reference]]}\n"
+                          f"  {strategy}: {[row[:2] for row in rows]}")
+
+    if args.timings:
+        for strategy, seconds in timings.items():
+            print(f"{strategy}: {seconds * 1000:.1f} ms total")
+    print(f"Compared {len(users)} users, {mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
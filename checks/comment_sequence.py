@@ -0,0 +1,47 @@
+"""
+Check that the comment_sequence table matches the comments table.
+
+Renumbers the comments of every post through the `comment_sequence_source` view and reports the
+(postid, comment_seq, comment_id, creationdate, response_time, response_time_sum) rows missing from
+or extra in `comment_sequence`. Exits with status 1 on mismatch; `--refresh` folds the new comments
+in first, `--rebuild` rebuilds the table before comparing.
+
+Usage:
+    python -m checks.comment_sequence --refresh
+"""
+import argparse
+import sys
+
+import psycopg
+
+from app.db.session import get_conninfo
+
+COLUMNS = "postid, comment_seq, comment_id, creationdate, response_time, response_time_sum"
+RECOMPUTED = f"SELECT {COLUMNS} FROM comment_sequence_source"
+STORED = f"SELECT {COLUMNS} FROM comment_sequence"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--refresh", action="store_true", help="Fold the new comments in before comparing")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the table before comparing")
+    parser.add_argument("--show", type=int, default=10, help="Number of differing rows to print")
+    args = parser.parse_args()
+
+    with psycopg.connect(get_conninfo(), autocommit=True) as conn:
+        if args.rebuild or args.refresh:
+            conn.execute("SELECT refresh_comment_sequence(%s)", (args.rebuild,))
+
+        missing = conn.execute(f"({RECOMPUTED}) EXCEPT ALL ({STORED})").fetchall()
+        extra = conn.execute(f"({STORED}) EXCEPT ALL ({RECOMPUTED})").fetchall()
+
+    for label, rows in (("MISSING", missing), ("EXTRA", extra)):
+        for row in rows[:args.show]:
+            print(f"{label} postid={row[0]} comment_seq={row[1]} comment_id={row[2]} creationdate={row[3]} "
+                  f"response_time={row[4]} response_time_sum={row[5]}")
+    print(f"{len(missing)} missing rows, {len(extra)} extra rows")
+    sys.exit(1 if missing or extra else 0)
+
+
+if __name__ == "__main__":
+    main()
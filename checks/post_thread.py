@@ -0,0 +1,56 @@
+"""
+Check that the post_thread closure table matches the parentid links of the posts table.
+
+Recomputes the closure of every thread with a recursive query and reports the
+(ancestor, descendant, depth, creationdate) rows missing from or extra in `post_thread`.
+Exits with status 1 on mismatch; `--rebuild` rebuilds the table before comparing.
+
+Usage:
+    python -m checks.post_thread --rebuild
+"""
+import argparse
+import sys
+
+import psycopg
+
+from app.db.session import get_conninfo
+
+CLOSURE = """
+    WITH RECURSIVE thread AS (
+        SELECT p.id AS ancestor_id, p.id AS descendant_id, 0 AS depth, p.creationdate
+        FROM posts p
+
+        UNION ALL
+
+        SELECT t.ancestor_id, p.id, t.depth + 1, p.creationdate
+        FROM thread t
+        JOIN posts p ON p.parentid = t.descendant_id
+    )
+    SELECT ancestor_id, descendant_id, depth, creationdate FROM thread
+"""
+STORED = "SELECT ancestor_id, descendant_id, depth, creationdate FROM post_thread"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the closure table before comparing")
+    parser.add_argument("--show", type=int, default=10, help="Number of differing rows to print")
+    args = parser.parse_args()
+
+    with psycopg.connect(get_conninfo(), autocommit=True) as conn:
+        if args.rebuild:
+            rows = conn.execute("SELECT rebuild_post_thread()").fetchone()[0]
+            print(f"Rebuilt post_thread with {rows} rows")
+
+        missing = conn.execute(f"({CLOSURE}) EXCEPT ALL ({STORED})").fetchall()
+        extra = conn.execute(f"({STORED}) EXCEPT ALL ({CLOSURE})").fetchall()
+
+    for label, rows in (("MISSING", missing), ("EXTRA", extra)):
+        for row in rows[:args.show]:
+            print(f"{label} ancestor={row[0]} descendant={row[1]} depth={row[2]} creationdate={row[3]}")
+    print(f"{len(missing)} missing rows, {len(extra)} extra rows")
+    sys.exit(1 if missing or extra else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Check that the endpoint queries are planned with the indexes the migrations create for them.
+
+Runs `EXPLAIN (FORMAT JSON)` for each query in `sql_queries/` with sample parameters taken
+from the database (or given on the command line) and reports every query whose plan does
+not use one of its expected indexes. Exits with status 1 on mismatch.
+
+On small data sets the planner prefers sequential scans; `--no-seqscan` discourages them to
+check that the indexes are usable at all.
+
+Usage:
+    python -m checks.query_plans --verbose
+"""
+import argparse
+import sys
+from typing import Dict, Iterator, List, Tuple
+
+import psycopg
+
+from app.db.session import get_conninfo
+from app.utils.pagination import FIRST_PAGE_ASCENDING, FIRST_PAGE_DESCENDING
+from app.utils.sql import load_sql_query
+
+# For each query, groups of indexes of which the plan must use at least one
+EXPECTED_INDEXES: Dict[str, List[Tuple[str, ...]]] = {
+    "get_posts_duration_limit.sql": [("posts_closeddate_id_open_duration_idx",)],
+    "get_posts_limit_query.sql": [("posts_creationdate_id_idx", "posts_title_trgm_idx", "posts_body_trgm_idx")],
+    "get_posts_fulltext_query.sql": [("posts_creationdate_id_idx", "posts_search_vector_idx")],
+    "get_posts_ranked_query.sql": [("posts_search_vector_idx",)],
+    "get_posts_id_limit.sql": [("post_thread_ancestor_creationdate_idx",)],
+    "get_posts_users.sql": [("comments_postid_creationdate_id_idx",)],
+    "get_posts_users_batch.sql": [("comments_postid_creationdate_id_idx",)],
+    "get_users_friends.sql": [("user_interactions_user_a_date_idx",)],
+    "get_users_friends_batch.sql": [("user_interactions_user_a_date_idx", "user_interactions_pkey")],
+    "get_users_id_badge_hist.sql": [("badges_userid_idx",), ("posts_owneruserid_creationdate_idx",)],
+    "get_users_id_badge_hist_lateral.sql": [("badges_userid_idx",), ("posts_owneruserid_creationdate_idx",)],
+    "get_users_id_badge_hist_merge.sql": [("badges_userid_idx",), ("posts_owneruserid_creationdate_idx",)],
+    "get_tags_comments_count.sql": [("post_tags_tag_id_post_id_idx",), ("comment_sequence_pkey",)],
+    "get_tags_comments_pos_lim.sql": [("comment_sequence_seq_creationdate_idx",), ("post_tags_tag_id_post_id_idx",)],
+}
+
+
+def sample_parameters(conn: psycopg.Connection, args: argparse.Namespace) -> Dict[str, dict]:
+    """
+    Build the parameters of each query, from the command line or from rows of the database.
+    """
+    tag_name = args.tag or conn.execute(
+        "SELECT tagname FROM tags ORDER BY count DESC NULLS LAST LIMIT 1"
+    ).fetchone()[0]
+    tag_ids = conn.execute(
+        "SELECT coalesce(array_agg(id), '{}') FROM tags WHERE tagname = %s", (tag_name,)
+    ).fetchone()[0]
+    user_id = args.user_id or conn.execute(
+        "SELECT userid FROM badges WHERE userid IS NOT NULL LIMIT 1"
+    ).fetchone()[0]
+    post_id = args.post_id or conn.execute(
+        "SELECT parentid FROM posts WHERE parentid IS NOT NULL LIMIT 1"
+    ).fetchone()[0]
+    newest = {"after_creationdate": FIRST_PAGE_DESCENDING[0], "after_id": FIRST_PAGE_DESCENDING[1]}
+    oldest = {"after_creationdate": FIRST_PAGE_ASCENDING[0], "after_id": FIRST_PAGE_ASCENDING[1]}
+    return {
+        "get_posts_duration_limit.sql": {
+            "duration_in_minutes": 300, "limit": 10,
+            "after_closeddate": FIRST_PAGE_DESCENDING[0], "after_id": FIRST_PAGE_DESCENDING[1]
+        },
+        "get_posts_limit_query.sql": {"query": f"%{args.query}%", "limit": 10, **newest},
+        "get_posts_fulltext_query.sql": {"query": args.query, "limit": 10, **newest},
+        "get_posts_ranked_query.sql": {"query": args.query, "limit": 10, **newest},
+        "get_posts_id_limit.sql": {"postid": post_id, "limit": 10, "max_depth": 2 ** 31 - 1, **oldest},
+        "get_posts_users.sql": {"postid": post_id},
+        "get_posts_users_batch.sql": {"postids": [post_id, post_id + 1, post_id + 2]},
+        "get_users_friends.sql": {
+            "userid": user_id, "limit": 10,
+            "after_date": FIRST_PAGE_DESCENDING[0], "after_id": FIRST_PAGE_DESCENDING[1]
+        },
+        "get_users_friends_batch.sql": {"userids": [user_id, user_id + 1, user_id + 2]},
+        "get_users_id_badge_hist.sql": {"userid": user_id},
+        "get_users_id_badge_hist_lateral.sql": {"userid": user_id},
+        "get_users_id_badge_hist_merge.sql": {"userid": user_id},
+        "get_tags_comments_count.sql": {"tag_ids": tag_ids, "comments_count": 1},
+        "get_tags_comments_pos_lim.sql": {"tag_ids": tag_ids, "position": 2, "limit": 10, **oldest},
+    }
+
+
+def plan_indexes(plan: dict) -> Iterator[str]:
+    """
+    Yield the names of the indexes scanned anywhere in a plan tree.
+    """
+    if "Index Name" in plan:
+        yield plan["Index Name"]
+    for child in plan.get("Plans", []):
+        yield from plan_indexes(child)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tag", help="Tag name of the tag queries (default: the most used tag)")
+    parser.add_argument("--user-id", type=int, help="User id of the user queries (default: a user with badges)")
+    parser.add_argument("--post-id", type=int, help="Post id of the post queries (default: a post with answers)")
+    parser.add_argument("--query", default="linux", help="Search query of the q2 queries")
+    parser.add_argument("--no-seqscan", action="store_true", help="Discourage sequential scans")
+    parser.add_argument("--verbose", action="store_true", help="Print the indexes used by every query")
+    args = parser.parse_args()
+
+    with psycopg.connect(get_conninfo(), autocommit=True) as conn:
+        if args.no_seqscan:
+            conn.execute("SET enable_seqscan = off")
+        params = sample_parameters(conn, args)
+
+        mismatches = 0
+        for filename, expected in EXPECTED_INDEXES.items():
+            sql_query = load_sql_query(filename).rstrip().rstrip(";")
+            plan = conn.execute(f"EXPLAIN (FORMAT JSON) {sql_query}", params[filename]).fetchone()[0]
+            used = set(plan_indexes(plan[0]["Plan"]))
+            missing = [group for group in expected if not used.intersection(group)]
+            if missing:
+                mismatches += 1
+                print(f"MISMATCH {filename}: expected one of {missing}, plan uses {sorted(used) or 'no index'}")
+            elif args.verbose:
+                print(f"OK {filename}: {sorted(used)}")
+
+    print(f"Checked {len(EXPECTED_INDEXES)} queries, {mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
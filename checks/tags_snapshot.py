@@ -0,0 +1,74 @@
+"""
+Check that the snapshot backend of the tag analytics matches the SQL backend.
+
+Loads the current columnar snapshot and, for each tag, compares the tag statistics with
+`get_tags_stats_summary.sql` and the comment response times with `get_tags_comments_count.sql`.
+Run it right after an export (or pass --export), before the database changes. Exits with
+status 1 on mismatch.
+
+Usage:
+    python -m checks.tags_snapshot --export --refresh --sample 200 --comments-count 3
+"""
+import argparse
+import sys
+
+import psycopg
+from psycopg.rows import dict_row
+
+from app.db.session import get_conninfo
+from app.db.snapshot import export_snapshot
+from app.schemas.tags import CommentsCount, Stats
+from app.services.tags_snapshot import tag_snapshots
+from app.utils.sql import load_sql_query
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--export", action="store_true", help="Export a new snapshot before comparing")
+    parser.add_argument("--refresh", action="store_true", help="Refresh the tag statistics summary before comparing")
+    parser.add_argument("--sample", type=int, default=0, help="Compare a random sample of tags (0 compares all)")
+    parser.add_argument("--comments-count", type=int, default=1, help="Leading comments skipped on each post")
+    args = parser.parse_args()
+
+    if args.export:
+        export_snapshot()
+    if not tag_snapshots.reload():
+        sys.exit("No snapshot found, export one with python -m app.db.snapshot")
+    snapshot = tag_snapshots.current
+
+    stats_query = load_sql_query("get_tags_stats_summary.sql")
+    comments_query = load_sql_query("get_tags_comments_count.sql")
+
+    with psycopg.connect(get_conninfo(), autocommit=True, row_factory=dict_row) as conn:
+        if args.refresh:
+            conn.execute("SELECT refresh_tag_weekday_stats()")
+
+        if args.sample:
+            tags = conn.execute("SELECT id, tagname FROM tags ORDER BY random() LIMIT %s", (args.sample,)).fetchall()
+        else:
+            tags = conn.execute("SELECT id, tagname FROM tags ORDER BY tagname").fetchall()
+
+        mismatches = 0
+        for tag in tags:
+            params = {"tag_ids": [tag["id"]], "comments_count": args.comments_count}
+            expected_stats = [Stats(**row) for row in conn.execute(stats_query, params)]
+            expected_comments = [CommentsCount(**row) for row in conn.execute(comments_query, params)]
+            stats = snapshot.tag_stats(params["tag_ids"])
+            comments = snapshot.comments_count(params["tag_ids"], args.comments_count)
+            if stats != expected_stats:
+                mismatches += 1
+                print(f"MISMATCH stats {tag['tagname']!r}:\n  sql:      {expected_stats}\n  snapshot: {stats}")
+            if comments != expected_comments:
+                mismatches += 1
+                different = next(
+                    (pair for pair in zip(expected_comments, comments) if pair[0] != pair[1]),
+                    (len(expected_comments), len(comments))
+                )
+                print(f"MISMATCH comments {tag['tagname']!r}: first difference {different}")
+
+    print(f"Compared {len(tags)} tags against the snapshot exported at {snapshot.exported_at}, {mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
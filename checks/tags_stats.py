@@ -0,0 +1,58 @@
+"""
+Check that the precomputed tag statistics match the live query.
+
+Runs `get_tags_stats.sql` (aggregating the posts table on every call) and
+`get_tags_stats_summary.sql` (reading the tag by weekday summary, by the ids of the tags the
+name matches as an ILIKE pattern) for each tag and reports every tag whose day/percentage rows differ. Exits with status 1 on mismatch.
+
+Usage:
+    python -m checks.tags_stats --refresh --sample 200
+"""
+import argparse
+import sys
+
+import psycopg
+
+from app.db.session import get_conninfo
+from app.utils.sql import load_sql_query
+
+
+def fetch_stats(conn: psycopg.Connection, sql_query: str, params: dict) -> list:
+    rows = conn.execute(sql_query, params).fetchall()
+    return [(row[0], row[1]) for row in rows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--refresh", action="store_true", help="Refresh the summary before comparing")
+    parser.add_argument("--sample", type=int, default=0, help="Compare a random sample of tags (0 compares all)")
+    args = parser.parse_args()
+
+    live_query = load_sql_query("get_tags_stats.sql")
+    summary_query = load_sql_query("get_tags_stats_summary.sql")
+
+    with psycopg.connect(get_conninfo(), autocommit=True) as conn:
+        if args.refresh:
+            conn.execute("SELECT refresh_tag_weekday_stats()")
+
+        if args.sample:
+            tags = conn.execute("SELECT id, tagname FROM tags ORDER BY random() LIMIT %s", (args.sample,)).fetchall()
+        else:
+            tags = conn.execute("SELECT id, tagname FROM tags ORDER BY tagname").fetchall()
+
+        mismatches = 0
+        for _, tag_name in tags:
+            live = fetch_stats(conn, live_query, {"tagname": tag_name})
+            # The endpoint resolves the name as an ILIKE pattern, which may match other tags too
+            tag_ids = conn.execute("SELECT array_agg(id) FROM tags WHERE tagname ILIKE %s", (tag_name,)).fetchone()[0]
+            summary = fetch_stats(conn, summary_query, {"tag_ids": tag_ids})
+            if live != summary:
+                mismatches += 1
+                print(f"MISMATCH {tag_name!r}:\n  live:    {live}\n  summary: {summary}")
+
+    print(f"Compared {len(tags)} tags, {mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
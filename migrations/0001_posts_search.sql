@@ -0,0 +1,24 @@
+-- migrate: no-transaction
+-- Search support for /v2/posts/q2/: trigram indexes for substring matching and
+-- a maintained tsvector column with a GIN index for full-text and ranked search.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE posts
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'B')
+    ) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS posts_search_vector_idx
+    ON posts USING gin (search_vector);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS posts_title_trgm_idx
+    ON posts USING gin (title gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS posts_body_trgm_idx
+    ON posts USING gin (body gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS posts_creationdate_idx
+    ON posts (creationdate DESC);
@@ -0,0 +1,58 @@
+-- Precomputed per-tag and total post counts by day of the week for /v2/tags/{tag_name}/stats.
+-- Refresh with: SELECT refresh_tag_weekday_stats();
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS tag_weekday_counts AS
+SELECT
+    pt.tag_id,
+    to_char(p.creationdate, 'FMDay') AS day_of_week,
+    count(*) AS tagged_posts
+FROM
+    posts p
+JOIN
+    post_tags pt ON p.id = pt.post_id
+GROUP BY
+    pt.tag_id,
+    to_char(p.creationdate, 'FMDay');
+
+CREATE UNIQUE INDEX IF NOT EXISTS tag_weekday_counts_tag_id_day_idx
+    ON tag_weekday_counts (tag_id, day_of_week);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS weekday_post_totals AS
+SELECT
+    to_char(p.creationdate, 'FMDay') AS day_of_week,
+    count(*) AS total_posts
+FROM
+    posts p
+GROUP BY
+    to_char(p.creationdate, 'FMDay');
+
+CREATE UNIQUE INDEX IF NOT EXISTS weekday_post_totals_day_idx
+    ON weekday_post_totals (day_of_week);
+
+-- Case-insensitive tag name lookups (ILIKE) on the tags table
+CREATE INDEX IF NOT EXISTS tags_tagname_trgm_idx
+    ON tags USING gin (tagname gin_trgm_ops);
+
+-- Last refresh time of each precomputed summary
+CREATE TABLE IF NOT EXISTS summary_refreshes (
+    name text PRIMARY KEY,
+    refreshed_at timestamptz NOT NULL
+);
+
+INSERT INTO summary_refreshes (name, refreshed_at)
+VALUES ('tag_weekday_stats', now())
+ON CONFLICT (name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at;
+
+CREATE OR REPLACE FUNCTION refresh_tag_weekday_stats() RETURNS timestamptz
+LANGUAGE plpgsql AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY tag_weekday_counts;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY weekday_post_totals;
+
+    INSERT INTO summary_refreshes (name, refreshed_at)
+    VALUES ('tag_weekday_stats', now())
+    ON CONFLICT (name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at;
+
+    RETURN now();
+END;
+$$;
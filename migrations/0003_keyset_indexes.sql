@@ -0,0 +1,21 @@
+-- migrate: no-transaction
+-- Indexes matching the (sort key, id) seeks of the paginated listings.
+
+-- /v2/posts/q1/: most recently closed posts first
+CREATE INDEX CONCURRENTLY IF NOT EXISTS posts_closeddate_id_idx
+    ON posts (closeddate DESC, id DESC)
+    WHERE closeddate IS NOT NULL;
+
+-- /v2/posts/q2/: newest posts first, supersedes posts_creationdate_idx
+CREATE INDEX CONCURRENTLY IF NOT EXISTS posts_creationdate_id_idx
+    ON posts (creationdate DESC, id DESC);
+
+DROP INDEX CONCURRENTLY IF EXISTS posts_creationdate_idx;
+
+-- /v2/posts/{post_id}: children of a post in creation order
+CREATE INDEX CONCURRENTLY IF NOT EXISTS posts_parentid_creationdate_id_idx
+    ON posts (parentid, creationdate, id);
+
+-- /v2/tags/{tag_name}/comments/{position}: comments of a post in creation order
+CREATE INDEX CONCURRENTLY IF NOT EXISTS comments_postid_creationdate_id_idx
+    ON comments (postid, creationdate, id);
@@ -0,0 +1,17 @@
+-- migrate: no-transaction
+-- Access paths of the shipped queries that the restored dump does not provide.
+-- comments (postid, creationdate), posts (parentid) and posts (closeddate) are
+-- covered by the composite indexes of 0003_keyset_indexes.
+
+-- /v2/users/{user_id}/badge_history: latest post of the user before each badge,
+-- /v2/users/{user_id}/friends: posts created by the user
+CREATE INDEX CONCURRENTLY IF NOT EXISTS posts_owneruserid_creationdate_idx
+    ON posts (owneruserid, creationdate);
+
+-- /v2/users/{user_id}/badge_history: badges of the user
+CREATE INDEX CONCURRENTLY IF NOT EXISTS badges_userid_idx
+    ON badges (userid);
+
+-- /v2/tags/{tag_name}/comments/...: posts of a tag
+CREATE INDEX CONCURRENTLY IF NOT EXISTS post_tags_tag_id_post_id_idx
+    ON post_tags (tag_id, post_id);
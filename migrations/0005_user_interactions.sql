@@ -0,0 +1,93 @@
+-- Precomputed co-comment graph for /v2/users/{user_id}/friends.
+-- user_b is a friend of user_a when user_b commented on a post that user_a created or commented on;
+-- last_interaction_date is the most recent of those comments.
+-- Refresh with: SELECT refresh_user_interactions(); (SELECT refresh_user_interactions(true); rebuilds it)
+
+CREATE TABLE IF NOT EXISTS user_interactions (
+    user_a bigint NOT NULL,
+    user_b bigint NOT NULL,
+    last_interaction_date timestamptz NOT NULL,
+    PRIMARY KEY (user_a, user_b)
+);
+
+-- Friends of a user, most recent first, as an index range scan
+CREATE INDEX IF NOT EXISTS user_interactions_user_a_date_idx
+    ON user_interactions (user_a, last_interaction_date DESC, user_b DESC);
+
+-- High-water mark of the source rows already folded into an incrementally refreshed summary
+ALTER TABLE summary_refreshes ADD COLUMN IF NOT EXISTS watermark bigint;
+
+CREATE OR REPLACE FUNCTION refresh_user_interactions(full_rebuild boolean DEFAULT false) RETURNS timestamptz
+LANGUAGE plpgsql AS $$
+DECLARE
+    last_comment_id bigint;
+    newest_comment_id bigint;
+BEGIN
+    -- One refresh at a time, a concurrent call waits for the running one
+    PERFORM pg_advisory_xact_lock(hashtext('refresh_user_interactions'));
+
+    SELECT watermark INTO last_comment_id FROM summary_refreshes WHERE name = 'user_interactions';
+    SELECT coalesce(max(id), 0) INTO newest_comment_id FROM comments;
+
+    IF full_rebuild OR last_comment_id IS NULL THEN
+        TRUNCATE user_interactions;
+
+        INSERT INTO user_interactions (user_a, user_b, last_interaction_date)
+        WITH participants AS (
+            SELECT p.owneruserid AS userid, p.id AS postid
+            FROM posts p
+            WHERE p.owneruserid IS NOT NULL
+
+            UNION
+
+            SELECT c.userid, c.postid
+            FROM comments c
+            WHERE c.userid IS NOT NULL AND c.postid IS NOT NULL
+        )
+        SELECT pa.userid, c.userid, max(c.creationdate)
+        FROM participants pa
+        JOIN comments c ON c.postid = pa.postid
+        WHERE c.userid <> pa.userid
+        GROUP BY pa.userid, c.userid;
+
+    ELSIF newest_comment_id > last_comment_id THEN
+        -- Comments are only ever added: recompute the edges of the posts that received new
+        -- comments and keep the most recent interaction date of each pair
+        INSERT INTO user_interactions (user_a, user_b, last_interaction_date)
+        WITH changed_posts AS (
+            SELECT DISTINCT c.postid
+            FROM comments c
+            WHERE c.id > last_comment_id AND c.id <= newest_comment_id AND c.postid IS NOT NULL
+        ),
+        participants AS (
+            SELECT p.owneruserid AS userid, p.id AS postid
+            FROM posts p
+            JOIN changed_posts cp ON cp.postid = p.id
+            WHERE p.owneruserid IS NOT NULL
+
+            UNION
+
+            SELECT c.userid, c.postid
+            FROM comments c
+            JOIN changed_posts cp ON cp.postid = c.postid
+            WHERE c.userid IS NOT NULL
+        )
+        SELECT pa.userid, c.userid, max(c.creationdate)
+        FROM participants pa
+        JOIN comments c ON c.postid = pa.postid
+        WHERE c.userid <> pa.userid
+        GROUP BY pa.userid, c.userid
+        ON CONFLICT (user_a, user_b) DO UPDATE
+            SET last_interaction_date = GREATEST(user_interactions.last_interaction_date,
+                                                 EXCLUDED.last_interaction_date);
+    END IF;
+
+    INSERT INTO summary_refreshes (name, refreshed_at, watermark)
+    VALUES ('user_interactions', now(), newest_comment_id)
+    ON CONFLICT (name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at, watermark = EXCLUDED.watermark;
+
+    RETURN now();
+END;
+$$;
+
+SELECT refresh_user_interactions(true);
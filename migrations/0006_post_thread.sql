@@ -0,0 +1,91 @@
+-- Closure table of the post threads for /v2/posts/{post_id}: one row per (ancestor, descendant)
+-- pair, a post being its own ancestor at depth 0. Kept in sync with posts by triggers;
+-- rebuild it after a bulk load that bypassed them or inserted children before their parent with:
+-- SELECT rebuild_post_thread();
+
+CREATE TABLE IF NOT EXISTS post_thread (
+    ancestor_id bigint NOT NULL,
+    descendant_id bigint NOT NULL,
+    depth integer NOT NULL,
+    creationdate timestamptz NOT NULL,
+    PRIMARY KEY (descendant_id, ancestor_id)
+);
+
+-- Subtree of a post in creation order as a single index range scan
+CREATE INDEX IF NOT EXISTS post_thread_ancestor_creationdate_idx
+    ON post_thread (ancestor_id, creationdate, descendant_id) INCLUDE (depth);
+
+CREATE OR REPLACE FUNCTION rebuild_post_thread() RETURNS bigint
+LANGUAGE plpgsql AS $$
+DECLARE
+    inserted bigint;
+BEGIN
+    TRUNCATE post_thread;
+
+    INSERT INTO post_thread (ancestor_id, descendant_id, depth, creationdate)
+    WITH RECURSIVE thread AS (
+        SELECT p.id AS ancestor_id, p.id AS descendant_id, 0 AS depth, p.creationdate
+        FROM posts p
+
+        UNION ALL
+
+        SELECT t.ancestor_id, p.id, t.depth + 1, p.creationdate
+        FROM thread t
+        JOIN posts p ON p.parentid = t.descendant_id
+    )
+    SELECT ancestor_id, descendant_id, depth, creationdate
+    FROM thread;
+
+    GET DIAGNOSTICS inserted = ROW_COUNT;
+    RETURN inserted;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION sync_post_thread() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        -- The parentid foreign key keeps posts with answers from being deleted
+        DELETE FROM post_thread WHERE descendant_id = OLD.id;
+        RETURN OLD;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO post_thread (ancestor_id, descendant_id, depth, creationdate)
+        SELECT t.ancestor_id, NEW.id, t.depth + 1, NEW.creationdate
+        FROM post_thread t
+        WHERE t.descendant_id = NEW.parentid
+
+        UNION ALL
+
+        SELECT NEW.id, NEW.id, 0, NEW.creationdate;
+        RETURN NEW;
+    END IF;
+
+    IF NEW.parentid IS DISTINCT FROM OLD.parentid THEN
+        -- Detach the subtree of the post from its former ancestors and attach it to the new ones
+        DELETE FROM post_thread d
+        WHERE d.descendant_id IN (SELECT descendant_id FROM post_thread WHERE ancestor_id = NEW.id)
+          AND d.ancestor_id IN (SELECT ancestor_id FROM post_thread WHERE descendant_id = NEW.id AND depth > 0);
+
+        INSERT INTO post_thread (ancestor_id, descendant_id, depth, creationdate)
+        SELECT sup.ancestor_id, sub.descendant_id, sup.depth + sub.depth + 1, sub.creationdate
+        FROM post_thread sup
+        CROSS JOIN post_thread sub
+        WHERE sup.descendant_id = NEW.parentid
+          AND sub.ancestor_id = NEW.id;
+    END IF;
+
+    IF NEW.creationdate IS DISTINCT FROM OLD.creationdate THEN
+        UPDATE post_thread SET creationdate = NEW.creationdate WHERE descendant_id = NEW.id;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS posts_sync_post_thread ON posts;
+CREATE TRIGGER posts_sync_post_thread
+    AFTER INSERT OR DELETE OR UPDATE OF parentid, creationdate ON posts
+    FOR EACH ROW EXECUTE FUNCTION sync_post_thread();
+
+SELECT rebuild_post_thread();
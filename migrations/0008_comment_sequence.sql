@@ -0,0 +1,90 @@
+-- Position of each comment within its post for /v2/tags/{tag_name}/comments/ and
+-- /v2/tags/{tag_name}/comments/{position}: comment_seq numbers the comments of a post in creation
+-- order, response_time is the gap in seconds since the previous comment (NULL for the first one)
+-- and response_time_sum the running sum of the gaps (0 for the first one).
+-- Refresh with: SELECT refresh_comment_sequence(); (SELECT refresh_comment_sequence(true); rebuilds it)
+
+CREATE TABLE IF NOT EXISTS comment_sequence (
+    postid bigint NOT NULL,
+    comment_seq integer NOT NULL,
+    comment_id bigint NOT NULL,
+    creationdate timestamptz NOT NULL,
+    response_time numeric,
+    response_time_sum numeric NOT NULL,
+    PRIMARY KEY (postid, comment_seq)
+);
+
+-- Comments at a position in (creationdate, comment_id) order, walked by the keyset pagination
+-- of /v2/tags/{tag_name}/comments/{position} until it has :limit comments of tagged posts
+CREATE INDEX IF NOT EXISTS comment_sequence_seq_creationdate_idx
+    ON comment_sequence (comment_seq, creationdate, comment_id) INCLUDE (postid);
+
+-- Numbering of the comments, gaps rounded to hundredths of a second as the endpoints return them.
+-- Both window levels partition by postid, so a filter on postid is applied before the numbering.
+CREATE OR REPLACE VIEW comment_sequence_source AS
+SELECT
+    numbered.postid,
+    numbered.comment_seq,
+    numbered.comment_id,
+    numbered.creationdate,
+    numbered.response_time,
+    coalesce(sum(numbered.response_time) OVER (
+        PARTITION BY numbered.postid
+        ORDER BY numbered.comment_seq
+    ), 0) AS response_time_sum
+FROM (
+    SELECT
+        c.postid,
+        row_number() OVER w AS comment_seq,
+        c.id AS comment_id,
+        c.creationdate,
+        round(extract(EPOCH FROM c.creationdate - lag(c.creationdate) OVER w), 2) AS response_time
+    FROM comments c
+    WHERE c.postid IS NOT NULL
+    WINDOW w AS (PARTITION BY c.postid ORDER BY c.creationdate, c.id)
+) numbered;
+
+CREATE OR REPLACE FUNCTION refresh_comment_sequence(full_rebuild boolean DEFAULT false) RETURNS timestamptz
+LANGUAGE plpgsql AS $$
+DECLARE
+    last_comment_id bigint;
+    newest_comment_id bigint;
+    changed_posts bigint[];
+BEGIN
+    -- One refresh at a time, a concurrent call waits for the running one
+    PERFORM pg_advisory_xact_lock(hashtext('refresh_comment_sequence'));
+
+    SELECT watermark INTO last_comment_id FROM summary_refreshes WHERE name = 'comment_sequence';
+    SELECT coalesce(max(id), 0) INTO newest_comment_id FROM comments;
+
+    IF full_rebuild OR last_comment_id IS NULL THEN
+        TRUNCATE comment_sequence;
+
+        INSERT INTO comment_sequence (postid, comment_seq, comment_id, creationdate, response_time, response_time_sum)
+        SELECT postid, comment_seq, comment_id, creationdate, response_time, response_time_sum
+        FROM comment_sequence_source;
+
+    ELSIF newest_comment_id > last_comment_id THEN
+        -- Comments are only ever added, but a new comment may predate the existing comments of its
+        -- post: renumber every post that received comments
+        SELECT array_agg(DISTINCT c.postid) INTO changed_posts
+        FROM comments c
+        WHERE c.id > last_comment_id AND c.id <= newest_comment_id AND c.postid IS NOT NULL;
+
+        DELETE FROM comment_sequence WHERE postid = ANY(changed_posts);
+
+        INSERT INTO comment_sequence (postid, comment_seq, comment_id, creationdate, response_time, response_time_sum)
+        SELECT postid, comment_seq, comment_id, creationdate, response_time, response_time_sum
+        FROM comment_sequence_source
+        WHERE postid = ANY(changed_posts);
+    END IF;
+
+    INSERT INTO summary_refreshes (name, refreshed_at, watermark)
+    VALUES ('comment_sequence', now(), newest_comment_id)
+    ON CONFLICT (name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at, watermark = EXCLUDED.watermark;
+
+    RETURN now();
+END;
+$$;
+
+SELECT refresh_comment_sequence(true);
@@ -0,0 +1,14 @@
+-- Comments of the existing posts in the order the comment statistics number them,
+-- with the creation time in microseconds since the epoch
+SELECT
+    c.postid,
+    c.id,
+    (extract(EPOCH FROM c.creationdate) * 1000000)::bigint AS created_us
+FROM
+    comments c
+JOIN
+    posts p ON p.id = c.postid
+ORDER BY
+    c.postid,
+    c.creationdate,
+    c.id;
@@ -0,0 +1,13 @@
+-- Tag assignments of the existing posts, grouped by tag for the tag to posts offsets
+SELECT
+    pt.tag_id,
+    pt.post_id
+FROM
+    post_tags pt
+JOIN
+    posts p ON p.id = pt.post_id
+WHERE
+    pt.tag_id IS NOT NULL
+ORDER BY
+    pt.tag_id,
+    pt.post_id;
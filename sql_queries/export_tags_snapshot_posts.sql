@@ -0,0 +1,10 @@
+-- Posts of the tag analytics snapshot in id order, with the day of the week
+-- as to_char(creationdate, 'FMDay') sees it (0 = Monday)
+SELECT
+    p.id,
+    extract(ISODOW FROM p.creationdate)::int - 1 AS weekday,
+    coalesce(p.commentcount, 0) AS commentcount
+FROM
+    posts p
+ORDER BY
+    p.id;
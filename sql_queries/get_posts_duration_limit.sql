@@ -3,12 +3,15 @@ SELECT
     p.title,
     p.creationdate,
     p.closeddate,
-    round(extract(EPOCH FROM (p.closeddate - p.creationdate)) / 60, 2) AS duration
+    p.open_duration AS duration
 FROM
     posts p
 WHERE
     p.closeddate IS NOT NULL
-    AND round(extract(EPOCH FROM (p.closeddate - p.creationdate)) / 60, 2) <= %(duration_in_minutes)s
+    AND p.open_duration <= %(duration_in_minutes)s
+    -- Keyset seek: only the posts after the last one of the previous page
+    AND (p.closeddate, p.id) < (%(after_closeddate)s, %(after_id)s)
 ORDER BY
-    p.closeddate DESC
+    p.closeddate DESC,
+    p.id DESC
 LIMIT %(limit)s;
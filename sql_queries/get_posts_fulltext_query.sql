@@ -0,0 +1,37 @@
+WITH matching_posts AS (
+    -- Full-text match served by the GIN index on posts.search_vector
+    SELECT
+        p.id,
+        p.title,
+        p.creationdate,
+        p.body
+    FROM
+        posts p
+    WHERE
+        p.search_vector @@ websearch_to_tsquery('english', %(query)s)
+        AND p.title IS NOT NULL
+        AND p.body IS NOT NULL
+        -- Keyset seek: only the posts after the last one of the previous page
+        AND (p.creationdate, p.id) < (%(after_creationdate)s, %(after_id)s)
+    ORDER BY
+        p.creationdate DESC,
+        p.id DESC
+    LIMIT %(limit)s
+)
+SELECT
+    mp.id,
+    mp.title,
+    mp.creationdate,
+    mp.body,
+    -- Tag ids, turned into names by the in-process tag dictionary
+    ARRAY(
+        SELECT pt.tag_id
+        FROM post_tags pt
+        WHERE pt.post_id = mp.id
+        ORDER BY pt.tag_id
+    ) AS tags
+FROM
+    matching_posts mp
+ORDER BY
+    mp.creationdate DESC,
+    mp.id DESC;
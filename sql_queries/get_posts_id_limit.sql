@@ -1,27 +1,24 @@
-WITH RECURSIVE thread_posts AS (
-    -- Anchor member: start with the post having ID = :postid
+-- Thread of a post from the post_thread closure table (see migrations/0006_post_thread.sql)
+WITH page AS (
+    -- Keyset seek over the subtree in creation order, on post_thread_ancestor_creationdate_idx
     SELECT
-        p.id,
-        p.parentid,
-        p.creationdate,
-        p.body,
-        1 AS level
-    FROM posts p
-    WHERE p.id = %(postid)s
-
-    UNION ALL
-
-    -- Recursive member: find posts where ParentId matches ID from the previous level
-    SELECT
-        p.id,
-        p.parentid,
-        p.creationdate,
-        p.body,
-        tp.level + 1 AS level
-    FROM posts p
-    INNER JOIN thread_posts tp ON p.parentid = tp.id
+        t.descendant_id AS id,
+        t.creationdate,
+        t.depth + 1 AS level
+    FROM post_thread t
+    WHERE t.ancestor_id = %(postid)s
+      AND t.depth < %(max_depth)s
+      AND (t.creationdate, t.descendant_id) > (%(after_creationdate)s, %(after_id)s)
+    ORDER BY t.creationdate, t.descendant_id
+    LIMIT %(limit)s
 )
-SELECT *
-FROM thread_posts
-ORDER BY creationdate
-LIMIT %(limit)s;
+-- Only the posts of the page are read for their body
+SELECT
+    p.id,
+    p.parentid,
+    p.creationdate,
+    p.body,
+    page.level
+FROM page
+JOIN posts p ON p.id = page.id
+ORDER BY page.creationdate, page.id;
@@ -1,21 +1,37 @@
+WITH matching_posts AS (
+    -- Substring match served by the trigram indexes on title and body
+    SELECT
+        p.id,
+        p.title,
+        p.creationdate,
+        p.body
+    FROM
+        posts p
+    WHERE
+        (p.title ILIKE %(query)s OR p.body ILIKE %(query)s)
+        AND p.title IS NOT NULL
+        AND p.body IS NOT NULL
+        -- Keyset seek: only the posts after the last one of the previous page
+        AND (p.creationdate, p.id) < (%(after_creationdate)s, %(after_id)s)
+    ORDER BY
+        p.creationdate DESC,
+        p.id DESC
+    LIMIT %(limit)s
+)
 SELECT
-    p.id,
-    p.title,
-    p.creationdate,
-    p.body,
-    coalesce(json_agg(t.tagname) FILTER (WHERE t.tagname IS NOT NULL), '[]') AS tags
+    mp.id,
+    mp.title,
+    mp.creationdate,
+    mp.body,
+    -- Tag ids, turned into names by the in-process tag dictionary
+    ARRAY(
+        SELECT pt.tag_id
+        FROM post_tags pt
+        WHERE pt.post_id = mp.id
+        ORDER BY pt.tag_id
+    ) AS tags
 FROM
-    posts p
-LEFT JOIN
-    post_tags pt ON p.id = pt.post_id
-LEFT JOIN
-    tags t ON pt.tag_id = t.id
-WHERE
-    (p.title ILIKE %(query)s OR p.body ILIKE %(query)s)
-    AND p.title IS NOT NULL
-    AND p.body IS NOT NULL
-GROUP BY
-    p.id, p.title, p.creationdate, p.closeddate, p.body
+    matching_posts mp
 ORDER BY
-    p.creationdate DESC
-LIMIT %(limit)s;
+    mp.creationdate DESC,
+    mp.id DESC;
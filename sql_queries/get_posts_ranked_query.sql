@@ -0,0 +1,37 @@
+WITH matching_posts AS (
+    -- Full-text match ordered by relevance (title matches weigh more than body matches)
+    SELECT
+        p.id,
+        p.title,
+        p.creationdate,
+        p.body,
+        ts_rank(p.search_vector, q.query) AS rank
+    FROM
+        posts p,
+        websearch_to_tsquery('english', %(query)s) AS q(query)
+    WHERE
+        p.search_vector @@ q.query
+        AND p.title IS NOT NULL
+        AND p.body IS NOT NULL
+    ORDER BY
+        rank DESC,
+        p.creationdate DESC
+    LIMIT %(limit)s
+)
+SELECT
+    mp.id,
+    mp.title,
+    mp.creationdate,
+    mp.body,
+    -- Tag ids, turned into names by the in-process tag dictionary
+    ARRAY(
+        SELECT pt.tag_id
+        FROM post_tags pt
+        WHERE pt.post_id = mp.id
+        ORDER BY pt.tag_id
+    ) AS tags
+FROM
+    matching_posts mp
+ORDER BY
+    mp.rank DESC,
+    mp.creationdate DESC;
@@ -0,0 +1,16 @@
+SELECT
+    c.postid AS post_id,
+    u.id AS user_id,
+    u.displayname AS display_name,
+    u.reputation AS reputation,
+    max(c.creationdate) AS last_comment_date
+FROM
+    comments c
+JOIN
+    users u ON c.userid = u.id
+WHERE
+    c.postid = ANY(%(postids)s::bigint[])
+GROUP BY
+    c.postid, u.id, u.displayname, u.reputation
+ORDER BY
+    c.postid, last_comment_date DESC;
@@ -1,25 +1,20 @@
-WITH post_comments AS (
-    SELECT
-        c.postid,
-        c.id AS comment_id,
-        c.creationdate,
-        c.text,
-        row_number() OVER (
-            PARTITION BY c.postid
-            ORDER BY c.creationdate
-        ) AS comments_position
-    FROM comments c
-    INNER JOIN posts p ON c.postid = p.id
-    INNER JOIN post_tags pt ON p.id = pt.post_id
-    INNER JOIN tags t ON pt.tag_id = t.id
-    WHERE t.tagname = %(tagname)s
-)
 SELECT
-    postid AS post_id,
-    comment_id,
-    creationdate,
-    text
-FROM post_comments
-WHERE comments_position = %(position)s
-ORDER BY creationdate
+    cs.postid AS post_id,
+    cs.comment_id,
+    cs.creationdate,
+    c.text
+FROM comment_sequence cs
+JOIN comments c ON c.id = cs.comment_id
+-- The comment at the position of each tagged post, as an index lookup per post
+WHERE cs.postid IN (
+        SELECT pt.post_id
+        FROM post_tags pt
+        JOIN posts p ON p.id = pt.post_id
+        -- Tag ids resolved from the name by the in-process tag dictionary
+        WHERE pt.tag_id = ANY(%(tag_ids)s::bigint[])
+    )
+    AND cs.comment_seq = %(position)s
+    -- Keyset seek: only the comments after the last one of the previous page
+    AND (cs.creationdate, cs.comment_id) > (%(after_creationdate)s, %(after_id)s)
+ORDER BY cs.creationdate, cs.comment_id
 LIMIT %(limit)s;
@@ -0,0 +1,6 @@
+SELECT
+    t.id,
+    t.tagname,
+    t.count
+FROM
+    tags t;
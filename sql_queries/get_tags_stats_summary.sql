@@ -0,0 +1,36 @@
+WITH tagged_posts AS (
+    -- Sum the precomputed counts of the tags matching the name per day of the week,
+    -- the ids are resolved from the name by the in-process tag dictionary
+    SELECT
+        twc.day_of_week,
+        sum(twc.tagged_posts) AS tagged_posts
+    FROM
+        tag_weekday_counts twc
+    WHERE
+        twc.tag_id = ANY(%(tag_ids)s::bigint[])
+    GROUP BY
+        twc.day_of_week
+)
+SELECT
+    wpt.day_of_week AS day,
+    round(
+        ((coalesce(tp.tagged_posts, 0)::FLOAT / coalesce(wpt.total_posts, 1)) * 100)::NUMERIC,
+        2
+    ) AS percentage,
+    sr.refreshed_at
+FROM
+    weekday_post_totals wpt
+LEFT JOIN
+    tagged_posts tp ON wpt.day_of_week = tp.day_of_week
+LEFT JOIN
+    summary_refreshes sr ON sr.name = 'tag_weekday_stats'
+ORDER BY
+    CASE
+        WHEN wpt.day_of_week = 'Monday' THEN 1
+        WHEN wpt.day_of_week = 'Tuesday' THEN 2
+        WHEN wpt.day_of_week = 'Wednesday' THEN 3
+        WHEN wpt.day_of_week = 'Thursday' THEN 4
+        WHEN wpt.day_of_week = 'Friday' THEN 5
+        WHEN wpt.day_of_week = 'Saturday' THEN 6
+        WHEN wpt.day_of_week = 'Sunday' THEN 7
+    END;
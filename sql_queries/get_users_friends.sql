@@ -1,29 +1,17 @@
-WITH relevant_posts AS (
-    -- Posts created by the user
-    SELECT DISTINCT p.id
-    FROM posts p
-    WHERE p.owneruserid = %(userid)s
-
-    UNION
-
-    -- Posts the user has commented on
-    SELECT DISTINCT c.postid
-    FROM comments c
-    WHERE c.userid = %(userid)s
-)
+-- Friends from the precomputed co-comment graph (see migrations/0005_user_interactions.sql)
 SELECT
     u.id AS user_id,
     u.displayname AS display_name,
     u.reputation AS reputation,
-    max(c.creationdate) AS last_comment_date
+    ui.last_interaction_date AS last_comment_date
 FROM
-    comments c
+    user_interactions ui
 JOIN
-    users u ON c.userid = u.id
+    users u ON u.id = ui.user_b
 WHERE
-    c.postid IN (SELECT id FROM relevant_posts)
-    AND c.userid != %(userid)s  -- Exclude the original user
-GROUP BY
-    u.id, u.displayname, u.reputation
+    ui.user_a = %(userid)s
+    -- Keyset seek: only the friends after the last one of the previous page
+    AND (ui.last_interaction_date, ui.user_b) < (%(after_date)s, %(after_id)s)
 ORDER BY
-    last_comment_date DESC;
+    ui.last_interaction_date DESC, ui.user_b DESC
+LIMIT %(limit)s;
@@ -0,0 +1,15 @@
+-- Friends of several users from the precomputed co-comment graph (see migrations/0005_user_interactions.sql)
+SELECT
+    ui.user_a AS for_user_id,
+    u.id AS user_id,
+    u.displayname AS display_name,
+    u.reputation AS reputation,
+    ui.last_interaction_date AS last_comment_date
+FROM
+    user_interactions ui
+JOIN
+    users u ON u.id = ui.user_b
+WHERE
+    ui.user_a = ANY(%(userids)s::bigint[])
+ORDER BY
+    ui.user_a, ui.last_interaction_date DESC, ui.user_b DESC;
@@ -8,7 +8,7 @@ WITH badges_with_prev_post AS (
             FROM posts p
             WHERE p.owneruserid = b.userid
               AND p.creationdate < b.date
-            ORDER BY p.creationdate DESC
+            ORDER BY p.creationdate DESC, p.id DESC
             LIMIT 1
         ) AS prev_post_id
     FROM badges b
@@ -21,7 +21,7 @@ filtered_badges AS (
 ranked_badges AS (
     SELECT
         *,
-        row_number() OVER (PARTITION BY prev_post_id ORDER BY badge_date DESC) AS badge_rank_per_post
+        row_number() OVER (PARTITION BY prev_post_id ORDER BY badge_date DESC, badge_id DESC) AS badge_rank_per_post
     FROM filtered_badges
 ),
 last_badge_per_post AS (
@@ -32,7 +32,7 @@ last_badge_per_post AS (
 unique_badges AS (
     SELECT
         *,
-        row_number() OVER (PARTITION BY badge_name ORDER BY badge_date DESC) AS badge_rank
+        row_number() OVER (PARTITION BY badge_name ORDER BY badge_date DESC, badge_id DESC) AS badge_rank
     FROM last_badge_per_post
 )
 SELECT
@@ -43,4 +43,4 @@ SELECT
 FROM unique_badges ub
 JOIN posts p ON p.Id = ub.prev_post_id
 WHERE ub.badge_rank = 1
-ORDER BY badge_date;
+ORDER BY badge_date, badge_id;
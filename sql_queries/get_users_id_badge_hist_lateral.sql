@@ -0,0 +1,38 @@
+-- Same result as get_users_id_badge_hist.sql: the previous post of each badge is found by a
+-- LATERAL probe of posts_owneruserid_creationdate_idx, the window passes are DISTINCT ON sorts
+-- and only the posts of the returned badges are read back for their body.
+WITH badges_with_prev_post AS (
+    SELECT
+        b.id AS badge_id,
+        b.name AS badge_name,
+        b.date AS badge_date,
+        prev.id AS prev_post_id
+    FROM badges b
+    LEFT JOIN LATERAL (
+        SELECT p.id
+        FROM posts p
+        WHERE p.owneruserid = b.userid
+          AND p.creationdate < b.date
+        ORDER BY p.creationdate DESC, p.id DESC
+        LIMIT 1
+    ) prev ON true
+    WHERE b.userid = %(userid)s
+),
+last_badge_per_post AS (
+    SELECT DISTINCT ON (prev_post_id) *
+    FROM badges_with_prev_post
+    ORDER BY prev_post_id, badge_date DESC, badge_id DESC
+),
+unique_badges AS (
+    SELECT DISTINCT ON (badge_name) *
+    FROM last_badge_per_post
+    ORDER BY badge_name, badge_date DESC, badge_id DESC
+)
+SELECT
+    badge_name,
+    prev_post_id AS post_id,
+    p.creationdate AS post_date,
+    p.body AS post_body
+FROM unique_badges ub
+JOIN posts p ON p.id = ub.prev_post_id
+ORDER BY badge_date, badge_id;
@@ -0,0 +1,55 @@
+-- Same result as get_users_id_badge_hist.sql from a single date-ordered merge of the user's
+-- badges and posts: each badge belongs to the group opened by the last post before it.
+WITH events AS (
+    SELECT b.date AS event_date, 0 AS event_order, b.id AS badge_id, b.name AS badge_name, NULL::bigint AS post_id
+    FROM badges b
+    WHERE b.userid = %(userid)s
+
+    UNION ALL
+
+    -- A post created at the same time as a badge does not precede it, a post without a date precedes none
+    SELECT p.creationdate, 1, NULL, NULL, p.id
+    FROM posts p
+    WHERE p.owneruserid = %(userid)s
+      AND p.creationdate IS NOT NULL
+),
+grouped_events AS (
+    SELECT
+        *,
+        -- Badges without a date precede every post
+        count(post_id) OVER (
+            ORDER BY event_date NULLS FIRST, event_order, post_id ROWS UNBOUNDED PRECEDING
+        ) AS post_group
+    FROM events
+),
+badges_with_prev_post AS (
+    SELECT badge_id, badge_name, badge_date, prev_post_id
+    FROM (
+        SELECT
+            badge_id,
+            badge_name,
+            event_date AS badge_date,
+            post_id,
+            max(post_id) OVER (PARTITION BY post_group) AS prev_post_id
+        FROM grouped_events
+    ) e
+    WHERE post_id IS NULL
+),
+last_badge_per_post AS (
+    SELECT DISTINCT ON (prev_post_id) *
+    FROM badges_with_prev_post
+    ORDER BY prev_post_id, badge_date DESC, badge_id DESC
+),
+unique_badges AS (
+    SELECT DISTINCT ON (badge_name) *
+    FROM last_badge_per_post
+    ORDER BY badge_name, badge_date DESC, badge_id DESC
+)
+SELECT
+    badge_name,
+    prev_post_id AS post_id,
+    p.creationdate AS post_date,
+    p.body AS post_body
+FROM unique_badges ub
+JOIN posts p ON p.id = ub.prev_post_id
+ORDER BY badge_date, badge_id;
@@ -0,0 +1 @@
+SELECT refresh_comment_sequence() AS refreshed_at;
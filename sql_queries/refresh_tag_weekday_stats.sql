@@ -0,0 +1 @@
+SELECT refresh_tag_weekday_stats() AS refreshed_at;
@@ -0,0 +1 @@
+SELECT refresh_user_interactions() AS refreshed_at;
@@ -18,21 +18,17 @@ until docker compose exec db pg_isready -U $DB_USER -d $DB_NAME; do
 done
 echo "PostgreSQL is ready."
 
-# Check if the database is empty
-DB_CHECK=$(docker compose exec db psql -U $DB_USER -d $DB_NAME -c "\dt" 2>&1 | grep "Did not find any relations." || true)
-
-echo "DB_CHECK: '$DB_CHECK'"
-
-if [ -n "$DB_CHECK" ]; then
-  echo "Database is empty. Restoring from backup..."
-  docker compose exec db pg_restore --no-owner --no-privileges -U $DB_USER -d $DB_NAME /data/superuser.backup
-  echo "Database restoration completed."
-else
-  echo "Database already contains data. Skipping restoration."
-fi
-
-# Restart database service
-docker compose restart db
+# Restore the backup with parallel jobs, apply the migrations, vacuum and analyze the tables and
+# prewarm the hot ones. pg_restore runs in the database container, the rest connects through the
+# published port; the completed phases are recorded in the database, so a database that is
+# already restored is left as is and an interrupted restore resumes where it stopped
+echo "Bootstrapping the database..."
+DB_HOST=localhost DB_PORT=$DB_HOST_PORT python -m app.db.bootstrap \
+  --backup /data/superuser.backup \
+  --restore-command "docker compose exec -T db pg_restore" \
+  --jobs ${BOOTSTRAP_JOBS:-4} \
+  --prewarm
+echo "Database bootstrap completed."
 
 # Start the application service
 echo "Starting the application service..."
@@ -0,0 +1,8 @@
+import os
+
+# The unit tests do not connect to a database, but importing the application modules reads its settings
+for var, value in (
+    ("DB_USER", "postgres"), ("DB_PASSWORD", "postgres"), ("DB_HOST", "localhost"),
+    ("DB_PORT", "5432"), ("DB_NAME", "stackexchange"),
+):
+    os.environ.setdefault(var, value)
@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils import admission as admission_module
+from app.utils.admission import AdmissionController, Overloaded
+
+LOOKUP = "/v2/posts/{post_id}/users"
+HEAVY = "/v2/users/{user_id}/friends"
+
+
+def controller(capacity=2, queue_size=10, timeout=1.0, weights=None, limits=None) -> AdmissionController:
+    return AdmissionController(capacity, queue_size, timeout, weights or {}, limits or {})
+
+
+async def settle():
+    # Let the woken waiters run
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_requests_within_capacity_are_admitted_at_once():
+    async def run():
+        admission = controller(capacity=2)
+        await admission.acquire(LOOKUP)
+        await admission.acquire(LOOKUP)
+        return admission.stats()
+
+    assert asyncio.run(run()) == {"capacity": 2, "used": 2, "waiting": 0}
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    async def run():
+        admission = controller(capacity=1, queue_size=1)
+        await admission.acquire(LOOKUP)
+        waiter = asyncio.create_task(admission.acquire(LOOKUP))
+        await settle()
+        with pytest.raises(Overloaded) as rejected:
+            await admission.acquire(LOOKUP)
+        waiter.cancel()
+        return rejected.value
+
+    rejected = asyncio.run(run())
+    assert rejected.reason == "queue_full"
+    assert rejected.status_code == 503
+    assert rejected.headers == {"Retry-After": str(admission_module.ADMISSION_RETRY_AFTER)}
+
+
+def test_overloaded_is_answered_as_503_with_retry_after():
+    app = FastAPI()
+
+    @app.get("/overloaded")
+    async def overloaded():
+        raise Overloaded("queue_full")
+
+    response = TestClient(app).get("/overloaded")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(admission_module.ADMISSION_RETRY_AFTER)
+
+
+def test_wait_past_the_timeout_is_rejected():
+    async def run():
+        admission = controller(capacity=1, timeout=0.01)
+        await admission.acquire(LOOKUP)
+        with pytest.raises(Overloaded) as rejected:
+            await admission.acquire(LOOKUP)
+        return rejected.value.reason, admission.stats()
+
+    reason, stats = asyncio.run(run())
+    assert reason == "timeout"
+    assert stats == {"capacity": 1, "used": 1, "waiting": 0}
+
+
+def test_release_admits_the_next_waiter():
+    async def run():
+        admission = controller(capacity=1)
+        await admission.acquire(LOOKUP)
+        waiter = asyncio.create_task(admission.acquire(LOOKUP))
+        await settle()
+        assert not waiter.done()
+        admission.release(LOOKUP)
+        await waiter
+        return admission.stats()
+
+    assert asyncio.run(run()) == {"capacity": 1, "used": 1, "waiting": 0}
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        admission = controller(capacity=1)
+        await admission.acquire(LOOKUP)
+        waiter = asyncio.create_task(admission.acquire(LOOKUP))
+        await settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        waiting = admission.stats()["waiting"]
+        admission.release(LOOKUP)
+        return waiting, admission.stats()
+
+    waiting, stats = asyncio.run(run())
+    assert waiting == 0
+    assert stats == {"capacity": 1, "used": 0, "waiting": 0}
+
+
+def test_waiter_cancelled_as_it_is_admitted_gives_the_slot_back():
+    async def run():
+        admission = controller(capacity=1)
+        await admission.acquire(LOOKUP)
+        waiter = asyncio.create_task(admission.acquire(LOOKUP))
+        await settle()
+        # Admitted by the release, but cancelled before it could resume
+        admission.release(LOOKUP)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return admission.stats()
+
+    assert asyncio.run(run()) == {"capacity": 1, "used": 0, "waiting": 0}
+
+
+def test_weighted_route_waits_while_lighter_ones_get_through():
+    async def run():
+        admission = controller(capacity=3, weights={HEAVY: 2})
+        await admission.acquire(HEAVY)
+        await admission.acquire(LOOKUP)
+        heavy = asyncio.create_task(admission.acquire(HEAVY))
+        await settle()
+        admission.release(LOOKUP)
+        lookup = asyncio.create_task(admission.acquire(LOOKUP))
+        await settle()
+        # The released unit does not fit the heavy waiter, but fits the lookup
+        assert not heavy.done() and lookup.done()
+        admission.release(HEAVY)
+        admission.release(LOOKUP)
+        await heavy
+        return admission.stats()
+
+    assert asyncio.run(run()) == {"capacity": 3, "used": 2, "waiting": 0}
+
+
+def test_weight_is_capped_at_the_capacity():
+    assert controller(capacity=2, weights={HEAVY: 5}).weight(HEAVY) == 2
+
+
+def test_route_limit_caps_the_connections_of_a_route():
+    async def run():
+        admission = controller(capacity=10, timeout=0.01, limits={HEAVY: 1})
+        await admission.acquire(HEAVY)
+        await admission.acquire(LOOKUP)
+        with pytest.raises(Overloaded):
+            await admission.acquire(HEAVY)
+        return admission.stats()
+
+    assert asyncio.run(run()) == {"capacity": 10, "used": 2, "waiting": 0}
@@ -0,0 +1,42 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.users import UserIds
+from app.utils import batch
+from app.utils.batch import BATCH_MAX_RAW_IDS, MAX_ID_CHARS, check_batch_ids, parse_batch_ids
+
+
+def test_duplicates_are_dropped_in_request_order():
+    assert check_batch_ids([3, 1, 3, 2, 1]) == [3, 1, 2]
+    assert parse_batch_ids("3, 1,3,,2") == [3, 1, 2]
+
+
+@pytest.mark.parametrize("ids", [[], [0], [1, -2]])
+def test_invalid_ids_are_rejected(ids):
+    with pytest.raises(ValueError):
+        check_batch_ids(ids)
+
+
+@pytest.mark.parametrize("value", ["", ",", "1,a", "1.5", "1;2"])
+def test_malformed_values_are_rejected(value):
+    with pytest.raises(ValueError):
+        parse_batch_ids(value)
+
+
+def test_batch_size_limit(monkeypatch):
+    monkeypatch.setattr(batch, "BATCH_MAX_IDS", 3)
+    assert check_batch_ids([1, 2, 3, 3]) == [1, 2, 3]
+    with pytest.raises(ValueError):
+        check_batch_ids([1, 2, 3, 4])
+
+
+def test_oversized_values_are_rejected_before_parsing():
+    assert parse_batch_ids(",".join(["1"] * BATCH_MAX_RAW_IDS)) == [1]
+    with pytest.raises(ValueError):
+        parse_batch_ids("1" * (BATCH_MAX_RAW_IDS * MAX_ID_CHARS + 1))
+
+
+def test_oversized_bodies_are_rejected():
+    assert check_batch_ids(UserIds(ids=[1] * BATCH_MAX_RAW_IDS).ids) == [1]
+    with pytest.raises(ValidationError):
+        UserIds(ids=[1] * (BATCH_MAX_RAW_IDS + 1))
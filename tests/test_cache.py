@@ -0,0 +1,180 @@
+import asyncio
+import time
+from enum import Enum
+
+import pytest
+
+from app.utils import cache
+from app.utils.cache import ResponseCache, normalize_params
+
+
+class Order(Enum):
+    newest = "newest"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Monotonic clock of the cache, moved forward with `advance`.
+    """
+    offset = [0.0]
+    real_monotonic = time.monotonic
+    monkeypatch.setattr(cache.time, "monotonic", lambda: real_monotonic() + offset[0])
+
+    def advance(seconds: float) -> None:
+        offset[0] += seconds
+
+    return advance
+
+
+def loader_of(value, calls: list):
+    async def load():
+        calls.append(value)
+        return value
+    return load
+
+
+def load(response_cache: ResponseCache, endpoint: str, params: dict, value, calls: list):
+    return asyncio.run(response_cache.get_or_load(endpoint, params, loader_of(value, calls)))
+
+
+def test_normalize_params_ignores_order_and_unwraps_values():
+    assert normalize_params({"b": [1, 2], "a": Order.newest}) == (("a", "newest"), ("b", (1, 2)))
+    assert normalize_params({"a": 1, "b": 2}) == normalize_params({"b": 2, "a": 1})
+
+
+def test_hit_after_miss():
+    response_cache, calls = ResponseCache(10, 1024, 60), []
+    assert load(response_cache, "posts", {"id": 1}, [1], calls) == [1]
+    assert load(response_cache, "posts", {"id": 1}, [2], calls) == [1]
+    assert calls == [[1]]
+    assert response_cache.stats()["endpoints"]["posts"] == {"misses": 1, "hits": 1}
+
+
+def test_entries_expire_after_their_ttl(clock):
+    response_cache, calls = ResponseCache(10, 1024, 60), []
+    load(response_cache, "posts", {"id": 1}, [1], calls)
+    clock(59)
+    assert load(response_cache, "posts", {"id": 1}, [2], calls) == [1]
+    clock(2)
+    assert load(response_cache, "posts", {"id": 1}, [2], calls) == [2]
+    assert response_cache.counters[("posts", "expirations")] == 1
+
+
+def test_endpoint_ttl_override(monkeypatch):
+    monkeypatch.setenv("CACHE_TTL_POSTS", "0")
+    response_cache, calls = ResponseCache(10, 1024, 60), []
+    load(response_cache, "posts", {"id": 1}, [1], calls)
+    load(response_cache, "posts", {"id": 1}, [1], calls)
+    assert len(calls) == 2
+    assert response_cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    response_cache, calls = ResponseCache(2, 1024, 60), []
+    load(response_cache, "posts", {"id": 1}, [1], calls)
+    load(response_cache, "posts", {"id": 2}, [2], calls)
+    # Touch the first entry, so that the second one is the least recently used
+    load(response_cache, "posts", {"id": 1}, [1], calls)
+    load(response_cache, "posts", {"id": 3}, [3], calls)
+
+    assert response_cache.counters[("posts", "evictions")] == 1
+    calls.clear()
+    load(response_cache, "posts", {"id": 1}, [1], calls)
+    load(response_cache, "posts", {"id": 2}, [2], calls)
+    assert calls == [[2]]
+
+
+def test_size_bound_evicts_and_skips_large_results():
+    # [1] and [2] are 3 bytes of JSON each
+    response_cache, calls = ResponseCache(10, 5, 60), []
+    load(response_cache, "posts", {"id": 1}, [1], calls)
+    load(response_cache, "posts", {"id": 2}, [2], calls)
+    assert response_cache.stats()["entries"] == 1
+    assert response_cache.stats()["bytes"] == 3
+
+    load(response_cache, "posts", {"id": 3}, [1, 2, 3], calls)
+    assert response_cache.stats()["entries"] == 1
+    load(response_cache, "posts", {"id": 3}, [1, 2, 3], calls)
+    assert calls.count([1, 2, 3]) == 2
+
+
+def test_concurrent_misses_share_one_load():
+    response_cache, calls = ResponseCache(10, 1024, 60), []
+
+    async def run():
+        release = asyncio.Event()
+
+        async def slow_load():
+            calls.append(1)
+            await release.wait()
+            return [1]
+
+        tasks = [asyncio.create_task(response_cache.get_or_load("posts", {"id": 1}, slow_load)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(run()) == [[1], [1], [1]]
+    assert calls == [1]
+
+
+def test_cancelled_load_is_retried_by_the_waiters():
+    response_cache, calls = ResponseCache(10, 1024, 60), []
+
+    async def run():
+        release = asyncio.Event()
+
+        async def slow_load():
+            calls.append(1)
+            await release.wait()
+            return [len(calls)]
+
+        first = asyncio.create_task(response_cache.get_or_load("posts", {"id": 1}, slow_load))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(response_cache.get_or_load("posts", {"id": 1}, slow_load))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == [2]
+    assert len(calls) == 2
+
+
+def test_failed_load_is_not_cached():
+    response_cache, calls = ResponseCache(10, 1024, 60), []
+
+    async def failing_load():
+        calls.append(1)
+        raise RuntimeError("database error")
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            asyncio.run(response_cache.get_or_load("posts", {"id": 1}, failing_load))
+    assert len(calls) == 2
+
+
+def test_invalidate_one_endpoint_or_all():
+    response_cache, calls = ResponseCache(10, 1024, 60), []
+    load(response_cache, "posts", {"id": 1}, [1], calls)
+    load(response_cache, "tags", {"id": 1}, [1], calls)
+
+    assert response_cache.invalidate("posts") == 1
+    assert response_cache.stats()["entries"] == 1
+    assert response_cache.invalidate() == 1
+    assert response_cache.stats()["bytes"] == 0
+
+    calls.clear()
+    load(response_cache, "tags", {"id": 1}, [1], calls)
+    assert calls == [[1]]
+
+
+def test_disabled_cache_always_loads():
+    response_cache, calls = ResponseCache(10, 1024, 60, enabled=False), []
+    load(response_cache, "posts", {"id": 1}, [1], calls)
+    load(response_cache, "posts", {"id": 1}, [1], calls)
+    assert len(calls) == 2
@@ -0,0 +1,55 @@
+from app.db.migrations import NO_TRANSACTION_MARKER, Migration, load_migrations
+
+
+def test_statements_split_on_line_ending_semicolons():
+    migration = Migration(1, "indexes", """-- Indexes of the listings
+CREATE INDEX IF NOT EXISTS posts_creationdate_idx
+    ON posts (creationdate, id);
+
+-- Only a comment;
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS duration interval; -- trailing comment
+SELECT 'a;b' AS inline;
+""")
+    assert migration.statements() == [
+        "-- Indexes of the listings\nCREATE INDEX IF NOT EXISTS posts_creationdate_idx\n    ON posts (creationdate, id)",
+        "ALTER TABLE posts ADD COLUMN IF NOT EXISTS duration interval; -- trailing comment",
+        "SELECT 'a;b' AS inline",
+    ]
+
+
+def test_function_bodies_are_not_split():
+    migration = Migration(2, "function", """CREATE OR REPLACE FUNCTION refresh() RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM summary;
+    INSERT INTO summary SELECT 1;
+END;
+$$;
+
+SELECT refresh();
+""")
+    statements = migration.statements()
+    assert len(statements) == 2
+    assert statements[0].endswith("END;\n$$")
+    assert statements[1] == "SELECT refresh()"
+
+
+def test_comment_only_chunks_are_dropped():
+    assert Migration(3, "empty", "-- nothing to do\n\n-- still nothing\n").statements() == []
+
+
+def test_no_transaction_marker_and_changed_tables():
+    migration = Migration(4, "concurrent", f"""{NO_TRANSACTION_MARKER}
+CREATE INDEX CONCURRENTLY IF NOT EXISTS comments_postid_idx ON comments (postid);
+CREATE UNIQUE INDEX IF NOT EXISTS tags_tagname_idx ON ONLY Tags (tagname);
+ALTER TABLE IF EXISTS posts ADD COLUMN duration interval;
+""")
+    assert not migration.transactional
+    assert Migration(5, "plain", "SELECT 1;").transactional
+    assert migration.changed_tables() == ["comments", "posts", "tags"]
+
+
+def test_shipped_migrations_are_ordered_and_split():
+    migrations = load_migrations()
+    assert [migration.version for migration in migrations] == sorted({migration.version for migration in migrations})
+    assert all(migration.statements() for migration in migrations)
@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.utils.pagination import FIRST_PAGE_ASCENDING, FIRST_PAGE_DESCENDING, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    position = (datetime(2024, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc), 42)
+    token = encode_cursor(*position)
+    assert "=" not in token
+    assert decode_cursor(token, descending=True) == position
+
+
+def test_first_page_positions():
+    assert decode_cursor(None, descending=True) == FIRST_PAGE_DESCENDING
+    assert decode_cursor(None, descending=False) == FIRST_PAGE_ASCENDING
+
+
+@pytest.mark.parametrize("token", [
+    "not a cursor",
+    "e30",  # {}
+    "WyJub3QgYSBkYXRlIiwxXQ",  # ["not a date",1]
+    "WyIyMDI0LTAzLTAxVDEyOjMwOjE1KzAwOjAwIl0",  # ["2024-03-01T12:30:15+00:00"]
+    "WyIyMDI0LTAzLTAxVDEyOjMwOjE1KzAwOjAwIiwiaWQiXQ",  # ["2024-03-01T12:30:15+00:00","id"]
+])
+def test_malformed_cursors_are_rejected(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token, descending=True)
@@ -0,0 +1,72 @@
+import asyncio
+
+import psycopg
+import pytest
+from psycopg_pool import PoolTimeout
+
+from app.db import session
+from app.db.session import PoolMember, PoolRouter, get_db_connection, release_db_connection
+from app.utils.metrics import RequestTimer, _request_timer
+
+ROUTE = "/v2/posts/{post_id}/users"
+
+
+class FakePool:
+    """
+    Pool handing out plain objects, or failing with `error`.
+    """
+
+    def __init__(self, error=None):
+        self.error = error
+        self.timeouts = []
+
+    async def getconn(self, timeout=None):
+        self.timeouts.append(timeout)
+        if self.error is not None:
+            raise self.error
+        return object()
+
+    async def putconn(self, conn):
+        pass
+
+
+@pytest.fixture
+def replica_router(monkeypatch):
+    def install(replica_error):
+        replica = PoolMember("replica", FakePool(replica_error), is_primary=False)
+        replica.healthy = True
+        router = PoolRouter(PoolMember("primary", FakePool(), is_primary=True), [replica], "round_robin")
+        monkeypatch.setattr(session, "pool_router", router)
+        return router
+
+    token = _request_timer.set(RequestTimer(ROUTE))
+    yield install
+    _request_timer.reset(token)
+
+
+def checkout(router):
+    async def run():
+        conn = await get_db_connection()
+        member = session._checked_out[conn][0]
+        await release_db_connection(conn)
+        return member
+
+    return asyncio.run(run())
+
+
+def test_reads_go_to_the_replica_with_its_checkout_timeout(replica_router):
+    router = replica_router(None)
+    assert checkout(router) is router.replicas[0]
+    assert router.replicas[0].pool.timeouts == [session.DB_REPLICA_CHECKOUT_TIMEOUT]
+
+
+def test_busy_replica_stays_in_rotation(replica_router):
+    router = replica_router(PoolTimeout("couldn't get a connection"))
+    assert checkout(router) is router.primary
+    assert router.replicas[0].healthy
+
+
+def test_failing_replica_is_ejected(replica_router):
+    router = replica_router(psycopg.OperationalError("connection refused"))
+    assert checkout(router) is router.primary
+    assert not router.replicas[0].healthy
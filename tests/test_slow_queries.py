@@ -0,0 +1,81 @@
+import asyncio
+
+from app.db import session
+from app.db.session import PoolMember, PoolRouter
+from app.schemas.admin import SlowQueryReport
+from app.utils.metrics import BACKGROUND_ROUTE, RequestTimer, _request_timer, current_route
+from app.utils.slow_queries import SlowQueryLog, explain_statement
+
+ROUTE = "/v2/posts/{post_id}/users"
+
+
+def test_request_queries_are_explained_with_analyze():
+    assert explain_statement("get_posts_users.sql", "/v2/posts/{post_id}/users", False) == \
+        "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)"
+
+
+def test_timed_out_queries_are_explained_without_analyze():
+    assert explain_statement("get_posts_users.sql", "/v2/posts/{post_id}/users", True) == "EXPLAIN (FORMAT JSON)"
+
+
+def test_refreshes_are_never_explained():
+    assert explain_statement("refresh_comment_sequence.sql", BACKGROUND_ROUTE, False) is None
+    assert explain_statement("refresh_tag_weekday_stats.sql", "/v2/tags/{tag_name}/stats", False) is None
+    assert explain_statement("get_posts_users.sql", BACKGROUND_ROUTE, True) is None
+
+
+def test_timed_out_queries_are_recorded_below_the_threshold(monkeypatch):
+    log = SlowQueryLog(threshold_ms=500, explain_rate=0, keep=10)
+    written = []
+    monkeypatch.setattr(log, "_write", written.append)
+
+    log.record("get_posts_users.sql", "SELECT 1", {"post_id": 1}, 100, "/v2/posts/{post_id}/users")
+    log.record("get_posts_users.sql", "SELECT 1", {"post_id": 1}, 200, "/v2/posts/{post_id}/users", timed_out=True)
+
+    assert [record["timed_out"] for record in written] == [True]
+    assert log.worst(10)[0]["duration_ms"] == 200
+
+
+def test_report_keeps_the_timed_out_flag(monkeypatch):
+    log = SlowQueryLog(threshold_ms=500, explain_rate=0, keep=10)
+    monkeypatch.setattr(log, "_write", lambda record: None)
+    log.record("get_posts_users.sql", "SELECT 1", {"post_id": 1}, 200, "/v2/posts/{post_id}/users", timed_out=True)
+    log.record("get_posts_users.sql", "SELECT 1", {"post_id": 2}, 600, "/v2/posts/{post_id}/users")
+
+    report = SlowQueryReport(threshold_ms=500, queries=log.stats(), slowest=log.worst(10))
+    assert [(query.duration_ms, query.timed_out) for query in report.slowest] == [(600, False), (200, True)]
+
+
+def test_explain_runs_as_background_work(monkeypatch):
+    acquired, routes = [], []
+
+    class Pool:
+        async def getconn(self, timeout=None):
+            routes.append(current_route())
+            # The capture fails past the checkout, which is all this test looks at
+            return object()
+
+        async def putconn(self, conn):
+            pass
+
+    router = PoolRouter(PoolMember("primary", Pool(), is_primary=True), [], "round_robin")
+    monkeypatch.setattr(session, "pool_router", router)
+
+    async def acquire(route):
+        acquired.append(route)
+
+    monkeypatch.setattr(session.admission, "acquire", acquire)
+    log = SlowQueryLog(threshold_ms=500, explain_rate=1, keep=10)
+    monkeypatch.setattr(log, "_write", lambda record: None)
+
+    async def run():
+        token = _request_timer.set(RequestTimer(ROUTE))
+        try:
+            log.record("get_posts_users.sql", "SELECT 1", {"post_id": 1}, 600, ROUTE)
+        finally:
+            _request_timer.reset(token)
+        await asyncio.gather(*log._tasks)
+
+    asyncio.run(run())
+    assert routes == [BACKGROUND_ROUTE]
+    assert acquired == []
@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from app.utils.sql import SQL_DIR, has_malformed_placeholder, load_sql_query
+
+
+@pytest.mark.parametrize("sql_query", [
+    "SELECT * FROM posts WHERE id = %(post_id)s",
+    "SELECT * FROM tags WHERE tagname LIKE 'a%%'",
+    "SELECT '%%' || %(query)s || '%%'",
+    "SELECT 1 WHERE 'x' LIKE '%%%%'",
+    "SELECT 1",
+])
+def test_valid_placeholders(sql_query):
+    assert not has_malformed_placeholder(sql_query)
+
+
+@pytest.mark.parametrize("sql_query", [
+    "SELECT * FROM tags WHERE tagname LIKE 'a%'",
+    "SELECT * FROM posts WHERE id = %s",
+    "SELECT * FROM posts WHERE id = %(post_id)d",
+    "SELECT '%%%' || %(query)s",
+    "SELECT * FROM posts WHERE id = %(post id)s",
+])
+def test_malformed_placeholders(sql_query):
+    assert has_malformed_placeholder(sql_query)
+
+
+def test_shipped_queries_are_valid():
+    for filename in sorted(os.listdir(SQL_DIR)):
+        if filename.endswith(".sql"):
+            assert not has_malformed_placeholder(load_sql_query(filename)), filename
@@ -0,0 +1,57 @@
+import pytest
+
+from app.services.tag_dictionary import TagDictionary, parse_like_pattern
+
+
+@pytest.fixture
+def dictionary():
+    tags = TagDictionary()
+    tags.load([
+        (1, "linux", 50), (2, "Linux", 3), (3, "linux-kernel", 20),
+        (4, "c_sharp", 10), (5, "cxsharp", 1), (6, "100%", 2),
+    ])
+    return tags
+
+
+def test_resolve_matches_the_exact_name(dictionary):
+    assert dictionary.resolve("linux") == [1]
+    assert dictionary.resolve("Linux") == [2]
+    assert dictionary.resolve("LINUX") == []
+    assert dictionary.resolve("linux%") == []
+
+
+def test_resolve_pattern_ignores_case(dictionary):
+    assert sorted(dictionary.resolve_pattern("LINUX")) == [1, 2]
+
+
+def test_resolve_pattern_interprets_wildcards(dictionary):
+    assert sorted(dictionary.resolve_pattern("linux%")) == [1, 2, 3]
+    assert sorted(dictionary.resolve_pattern("c_sharp")) == [4, 5]
+    assert dictionary.resolve_pattern("%kernel") == [3]
+    assert len(dictionary.resolve_pattern("%")) == 6
+
+
+def test_resolve_pattern_escapes_wildcards(dictionary):
+    assert dictionary.resolve_pattern(r"c\_sharp") == [4]
+    assert dictionary.resolve_pattern(r"100\%") == [6]
+    assert dictionary.resolve_pattern(r"10\%") == []
+
+
+def test_parse_like_pattern_prefix():
+    assert parse_like_pattern("Linux") == ("linux", None)
+    prefix, expression = parse_like_pattern("lin_x%")
+    assert prefix == "lin"
+    assert expression.fullmatch("linux-kernel") and not expression.fullmatch("lin")
+
+
+def test_complete_ignores_case(dictionary):
+    assert [(tag.name, tag.count) for tag in dictionary.complete("LIN", 10)] == [("Linux", 53), ("linux-kernel", 20)]
+
+
+def test_load_reports_renames(dictionary):
+    assert not dictionary.load([
+        (1, "linux", 51), (2, "Linux", 3), (3, "linux-kernel", 20),
+        (4, "c_sharp", 10), (5, "cxsharp", 1), (6, "100%", 2),
+    ])
+    assert dictionary.load([(1, "gnu-linux", 50)])
+    assert dictionary.names([1, 2]) == ["gnu-linux"]
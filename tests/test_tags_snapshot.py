@@ -0,0 +1,165 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+import pytest
+
+from app.db.snapshot import CURRENT_LINK, MANIFEST_FILENAME, SNAPSHOT_VERSION
+from app.services.tags_snapshot import EPOCH, WEEKDAYS, TagSnapshot, TagSnapshotStore
+
+EXPORTED_AT = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+# Post id -> (day of the week, number of comments); the comment count of a post is its commentcount column
+POSTS = {10: (0, 12), 20: (2, 15), 30: (2, 5), 40: (4, 11), 50: (6, 0)}
+# Tag id -> tagged post ids
+TAGS = {1: [10, 30, 40], 2: [20, 40], 4: [50]}
+
+
+def build_comments(seed: int = 7) -> dict:
+    """
+    Return the comments of each post as (comment id, creation time in microseconds) in creation order.
+
+    The gaps mix whole hundredths, half hundredths (rounded up) and arbitrary microseconds.
+    """
+    rng = np.random.default_rng(seed)
+    comments, comment_id, start = {}, 1000, 1_700_000_000_000_000
+    for post_id, (_, count) in POSTS.items():
+        gaps = rng.choice([5_000, 15_000, 10_000, 1_234_567, 60_000_000, 4_999, 3_600_005_000], size=count)
+        created = start + np.cumsum(gaps)
+        comments[post_id] = [(comment_id + index, int(created_us)) for index, created_us in enumerate(created)]
+        comment_id += count
+        start += 86_400_000_000
+    return comments
+
+
+COMMENTS = build_comments()
+
+
+def write_export(directory: str, name: str = "20240501T000000000000") -> str:
+    """
+    Lay out POSTS, TAGS and COMMENTS as the arrays of an export and make it the current one.
+    """
+    post_ids = sorted(POSTS)
+    rows = {post_id: row for row, post_id in enumerate(post_ids)}
+    tag_ids = sorted(TAGS)
+    offsets, tagged_rows = [0], []
+    for tag_id in tag_ids:
+        tagged_rows.extend(rows[post_id] for post_id in sorted(TAGS[tag_id]))
+        offsets.append(len(tagged_rows))
+    comment_offsets, comment_ids, comment_created_us = [0], [], []
+    for post_id in post_ids:
+        for comment_id, created_us in COMMENTS[post_id]:
+            comment_ids.append(comment_id)
+            comment_created_us.append(created_us)
+        comment_offsets.append(len(comment_ids))
+
+    arrays = {
+        "post_ids": np.array(post_ids, dtype=np.int64),
+        "post_weekdays": np.array([POSTS[post_id][0] for post_id in post_ids], dtype=np.int8),
+        "post_comment_counts": np.array([POSTS[post_id][1] for post_id in post_ids], dtype=np.int32),
+        "tag_ids": np.array(tag_ids, dtype=np.int64),
+        "tag_post_offsets": np.array(offsets, dtype=np.int64),
+        "tag_post_rows": np.array(tagged_rows, dtype=np.int32),
+        "comment_offsets": np.array(comment_offsets, dtype=np.int64),
+        "comment_ids": np.array(comment_ids, dtype=np.int64),
+        "comment_created_us": np.array(comment_created_us, dtype=np.int64),
+    }
+    path = os.path.join(directory, name)
+    os.makedirs(path)
+    for array_name, array in arrays.items():
+        np.save(os.path.join(path, f"{array_name}.npy"), array)
+    with open(os.path.join(path, MANIFEST_FILENAME), 'w') as file:
+        json.dump({"version": SNAPSHOT_VERSION, "exported_at": EXPORTED_AT.isoformat()}, file)
+
+    link = os.path.join(directory, CURRENT_LINK)
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(name, link)
+    return path
+
+
+def round_hundredths(value: Decimal) -> Decimal:
+    return value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def reference_comments_count(tag_ids: list, comments_count: int) -> list:
+    """
+    Walk each tagged post with more than 10 comments as get_tags_comments_count.sql does.
+    """
+    expected = []
+    post_ids = sorted({post_id for tag_id in tag_ids for post_id in TAGS.get(tag_id, [])})
+    for post_id in post_ids:
+        comments = COMMENTS[post_id]
+        if POSTS[post_id][1] <= 10 or len(comments) < comments_count:
+            continue
+        total = Decimal(0)
+        for index in range(comments_count, len(comments)):
+            sequence = index + 1
+            gap_us = comments[index][1] - comments[index - 1][1]
+            response_time = round_hundredths(Decimal(gap_us) / 1_000_000)
+            total += response_time
+            expected.append((
+                post_id, sequence, comments[index][0], EPOCH + timedelta(microseconds=comments[index][1]),
+                float(response_time), float(round_hundredths(total / (sequence - 1)))
+            ))
+    return expected
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    return TagSnapshot(write_export(str(tmp_path)))
+
+
+@pytest.mark.parametrize("tag_ids", [[1], [2], [1, 2], [4]])
+@pytest.mark.parametrize("comments_count", [1, 3, 10, 11, 13, 15])
+def test_comments_count_matches_a_per_post_walk(snapshot, tag_ids, comments_count):
+    rows = [
+        (row.post_id, row.comment_seq, row.comment_id, row.creationdate, row.response_time, row.avg_response_time)
+        for row in snapshot.comments_count(tag_ids, comments_count)
+    ]
+    assert rows == reference_comments_count(tag_ids, comments_count)
+
+
+def test_comments_count_skips_posts_with_few_comments(snapshot):
+    # Post 30 has 5 comments, post 10 has fewer than 13
+    assert {row.post_id for row in snapshot.comments_count([1], 1)} == {10, 40}
+    assert {row.post_id for row in snapshot.comments_count([1], 13)} == set()
+    assert {row.post_id for row in snapshot.comments_count([1, 2], 12)} == {20}
+
+
+def test_tag_stats_percentages(snapshot):
+    stats = snapshot.tag_stats([1, 2])
+    # Post 40 carries both tags and is counted once per tag, as the summary sums the tag counts
+    assert [(row.day, row.percentage) for row in stats] == [
+        ("Monday", 100.0), ("Wednesday", 100.0), ("Friday", 200.0), ("Sunday", 0.0)
+    ]
+    assert [(row.day, row.percentage) for row in snapshot.tag_stats([2])] == [
+        ("Monday", 0.0), ("Wednesday", 50.0), ("Friday", 100.0), ("Sunday", 0.0)
+    ]
+
+
+def test_tag_stats_of_a_missing_tag(snapshot):
+    stats = snapshot.tag_stats([3])
+    assert [row.day for row in stats] == [WEEKDAYS[day] for day in (0, 2, 4, 6)]
+    assert all(row.percentage == 0.0 for row in stats)
+    assert snapshot.comments_count([3], 1) == []
+
+
+def test_store_without_a_current_link(tmp_path):
+    store = TagSnapshotStore(str(tmp_path))
+    assert not store.reload()
+    assert store.current is None
+
+
+def test_store_reloads_a_new_export_once(tmp_path):
+    store = TagSnapshotStore(str(tmp_path))
+    write_export(str(tmp_path))
+    assert store.reload()
+    assert store.current.exported_at == EXPORTED_AT
+    assert not store.reload()
+
+    write_export(str(tmp_path), "20240502T000000000000")
+    assert store.reload()
+    assert store.current.path.endswith("20240502T000000000000")